@@ -142,6 +142,14 @@ LOGGING = {
 
 CTRACK_CATEGORISER = 'SklearnCategoriser'
 CTRACK_CATEGORISER_FILE = os.path.join(BASE_DIR, 'categoriser.pkl')
+# Processes used to analyse recurring transaction clusters on large histories.
+CTRACK_DETECTION_WORKERS = 1
+# Seconds a cached /api/progress/ response is kept; entries are keyed on the
+# data version, so this only bounds how long unreachable ones linger.
+CTRACK_PROGRESS_CACHE_TIMEOUT = 24 * 60 * 60
+# Seconds clustered descriptions from recurring detection are cached, keyed
+# on the data version like the progress responses.
+CTRACK_DETECTION_CACHE_TIMEOUT = 60 * 60
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
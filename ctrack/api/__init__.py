@@ -9,7 +9,7 @@ from ctrack.api.categories import CategorySummary, CategoryViewSet, SuggestCateg
 from ctrack.api.category_groups import CategoryGroupViewSet
 from ctrack.api.categorisor import CategorisorViewSet
 from ctrack.api.period_definition import PeriodDefinitionView
-from ctrack.api.progress import ProgressView
+from ctrack.api.progress import MultiProgressView, ProgressView
 from ctrack.api.recurring_payment import BillViewSet, RecurringPaymentViewSet
 from ctrack.api.transactions import TransactionViewSet
 from ctrack.api.user_settings import UserSettingsViewSet
@@ -30,5 +30,6 @@ urls = [
     re_path(r'^categories/summary/(?P<from>[0-9]+)/(?P<to>[0-9]+)$', CategorySummary.as_view()),
     re_path(r'^periods/$', PeriodDefinitionView.as_view()),
     re_path(r'^progress/$', ProgressView.as_view()),
+    re_path(r'^progress/periods/$', MultiProgressView.as_view()),
     re_path(r'^', include(router.urls)),
 ]
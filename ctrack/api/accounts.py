@@ -1,20 +1,60 @@
 """ctrack REST API
 """
 import logging
-from django.db.models import Max
+
+import numpy as np
+from django.db.models import Max, OuterRef, Subquery
 from rest_framework import (decorators, response, status, viewsets)
 from ctrack.api.serializers.common import LoadDataSerializer, SeriesSerializer
-from ctrack.api.serializers.accounts import AccountSerializer
-from ctrack.models import (Account, Category)
+from ctrack.api.serializers.accounts import AccountSerializer, SeriesQuerySerializer
+from ctrack.forecast import week_ends
+from ctrack.models import Account, DailyBalance
+from ctrack.transaction_import import ImportStats
 
 
 logger = logging.getLogger(__name__)
 
 
+def last_per_period(series, resolution):
+    """Keep the last (closing) point of each week or month of ``series``."""
+    days = series.index.tz_convert(None).values.astype('datetime64[D]')
+    if resolution == 'month':
+        keys = days.astype('datetime64[M]')
+    else:
+        keys = week_ends(days)
+    is_last = np.r_[keys[1:] != keys[:-1], True]
+    return series[is_last]
+
+
+def downsample_min_max(series, max_points):
+    """Reduce ``series`` to at most ``max_points`` points.
+
+    The series is cut into ``max_points // 2`` equal-count buckets and each
+    contributes its minimum and maximum (in time order), so peaks and troughs
+    survive the reduction.
+    """
+    if len(series) <= max_points:
+        return series
+    values = series.to_numpy()
+    n_buckets = max(max_points // 2, 1)
+    edges = np.linspace(0, len(values), n_buckets + 1).astype(int)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = values[start:end]
+        lo = start + int(np.argmin(bucket))
+        hi = start + int(np.argmax(bucket))
+        keep.extend(sorted({lo, hi}))
+    return series.iloc[keep]
+
+
 # ViewSets define the view behavior.
 class AccountViewSet(viewsets.ModelViewSet):
     queryset = Account.objects.annotate(
-        last_transaction=Max('transactions__when')
+        last_transaction=Max('transactions__when'),
+        latest_balance=Subquery(
+            DailyBalance.objects.filter(account=OuterRef('pk'))
+            .order_by('-day').values('balance')[:1]
+        ),
     )
     serializer_class = AccountSerializer
 
@@ -26,35 +66,55 @@ class AccountViewSet(viewsets.ModelViewSet):
             from_date = serializer.validated_data.get('from_date')
             to_date = serializer.validated_data.get('to_date')
             from_latest = from_date is None and to_date is None
+            stats = ImportStats()
+            clf = request.user.usersettings.get_clf_model()
             try:
                 transactions = account.load_transactions(
                     serializer.validated_data['data_file'],
                     from_date=from_date,
                     to_date=to_date,
-                    from_exist_latest=from_latest
+                    from_exist_latest=from_latest,
+                    clf=clf,
+                    stats=stats,
                 )
             except (ValueError, IOError, TypeError):
                 logger.exception("Transaction load error")
                 return response.Response("Unable to load file. Bad format?",
                                          status=status.HTTP_400_BAD_REQUEST)
 
-            clf = request.user.usersettings.get_clf_model()
-            category_map = dict(Category.objects.values_list('name', 'id'))
-            for trans in transactions:
-                cats = trans.suggest_category(clf, category_map=category_map)
-                if len(cats) == 1:
-                    # id is sourced from category_map built moments ago, so
-                    # assign the FK directly and skip the extra Category fetch.
-                    trans.category_id = cats[0]['id']
-                    trans.save(update_fields=['category'])
-            return response.Response({'status': 'loaded'})
+            stats.log(logger, account=account.pk)
+            return response.Response({
+                'status': 'loaded',
+                'count': len(transactions),
+                'stats': stats.as_dict(),
+            })
         else:
             return response.Response(serializer.errors,
                                      status=status.HTTP_400_BAD_REQUEST)
 
     @decorators.action(detail=True, methods=["get"])
     def series(self, request, pk=None):
-        series = self.get_object().daily_balance()
+        """Daily balance series.
+
+        Query Parameters:
+            from_date, to_date: Optional inclusive bounds (YYYY-MM-DD).
+            resolution: ``day`` (default), ``week`` or ``month``; coarser
+                resolutions return the closing balance of each period.
+            max_points: Optional cap on the number of points, applied after
+                ``resolution`` with min/max-preserving downsampling.
+        """
+        params = SeriesQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return response.Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        options = params.validated_data
+
+        series = self.get_object().balance_history(
+            from_date=options.get('from_date'), to_date=options.get('to_date'),
+        )
+        if len(series) and options['resolution'] != 'day':
+            series = last_per_period(series, options['resolution'])
+        if 'max_points' in options:
+            series = downsample_min_max(series, options['max_points'])
         series.index.name = 'dtime'
         serialised = SeriesSerializer(series.to_frame('value').reset_index().to_dict(orient='records'), many=True)
         return response.Response(serialised.data)
@@ -0,0 +1,30 @@
+"""Caching of API results keyed on the data version."""
+
+import hashlib
+
+from django.core.cache import cache
+
+from ctrack.models import DataVersion
+
+_MISSING = object()
+
+
+def cache_key(namespace, *parts):
+    key = "|".join(str(part) for part in parts)
+    return "ctrack:%s:" % namespace + hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def cached(namespace, parts, compute, timeout):
+    """Return ``compute()``, serving and storing it in the cache.
+
+    The key is built from ``namespace``, ``parts`` and the current
+    ``DataVersion``, so any write makes earlier entries unreachable and
+    ``timeout`` only bounds how long they linger. ``compute`` may return
+    None.
+    """
+    key = cache_key(namespace, *parts, DataVersion.current())
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
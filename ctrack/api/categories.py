@@ -5,14 +5,14 @@ import logging
 from dateutil.parser import parse as parse_date
 
 from django.db.models import Sum
-from django.db.models.functions import TruncMonth
 from django.http import Http404
 from rest_framework import (decorators, generics, response, viewsets)
 from ctrack.api.serializers.common import SeriesSerializer
 from ctrack.api.serializers.categories import (
     CategorySerializer, CategorySummarySerializer, ScoredCategorySerializer,
 )
-from ctrack.models import (Category, Transaction, BudgetEntry)
+from ctrack.models import (BudgetEntry, Category, CategoryMonthTotal, Transaction,
+                           utc_day_start)
 
 
 logger = logging.getLogger(__name__)
@@ -25,12 +25,13 @@ class CategoryViewSet(viewsets.ModelViewSet):
     @decorators.action(detail=True, methods=["get"])
     def series(self, request, pk=None):
         category = self.get_object()
-        queryset = category.transaction_set
-        result = (queryset
-            .annotate(dtime=TruncMonth('when'))
-            .values('dtime')
-            .annotate(value=Sum('amount'))
-        )
+        result = [
+            {'dtime': utc_day_start(row['month']), 'value': row['value']}
+            for row in (CategoryMonthTotal.objects.filter(category=category)
+                        .values('month')
+                        .annotate(value=Sum('total'))
+                        .order_by('month'))
+        ]
         serialised = SeriesSerializer(result, many=True)
         return response.Response(serialised.data)
 
@@ -60,19 +61,19 @@ class CategorySummary(generics.ListAPIView):
     serializer_class = CategorySummarySerializer
 
     def get_queryset(self):
-        from_date = parse_date(self.kwargs["from"])
-        to_date = parse_date(self.kwargs["to"])
-        filters = {
-            "when__gte": from_date,
-            "when__lte": to_date,
-        }
+        from_date = parse_date(self.kwargs["from"]).date()
+        to_date = parse_date(self.kwargs["to"]).date()
+        budget_entries = list(
+            BudgetEntry.objects.for_period(to_date).order_by("-amount").prefetch_related("categories")
+        )
+        # Spend per entry, grouped in the database through the entry/category M2M.
+        [totals] = CategoryMonthTotal.totals(
+            [(from_date, to_date)], ["category__budgetentry"],
+            category__budgetentry__in=[budget_entry.pk for budget_entry in budget_entries],
+        )
         result = []
-        for budget_entry in BudgetEntry.objects.for_period(to_date).order_by("-amount"):
-            transactions = Transaction.objects.filter(category__in=budget_entry.categories.values_list("pk", flat=True), **filters)
-            value = 0.0
-            if transactions:
-                value = float(transactions.aggregate(sum=Sum("amount"))["sum"])
-
+        for budget_entry in budget_entries:
+            value = float(totals.get((budget_entry.pk,), 0.0))
             budget = budget_entry.amount_over_period(from_date, to_date)
             result.append({
                 "id": budget_entry.id,
@@ -1,13 +1,93 @@
 """Category Groups REST API"""
 
-from django.db.models import Q
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
 from django.utils.dateparse import parse_date
 from rest_framework import decorators, response, viewsets
-import pandas as pd
 
-from ctrack.models import CategoryGroup, Transaction
+from ctrack.forecast import week_ends
+from ctrack.models import CategoryGroup, Transaction, utc_day_start
 from ctrack.api.serializers.common import SeriesSerializer
-from ctrack.api.serializers.category_groups import CategoryGroupSerializer
+from ctrack.api.serializers.category_groups import (
+    CategoryGroupSerializer, CategoryGroupWeeklySummarySerializer,
+)
+
+
+# Weeks end on a Wednesday (pandas "W-WED"); Monday=0.
+WEEK_END_WEEKDAY = 2
+
+
+def weekly_totals(group_ids, from_date, to_date):
+    """Return ``{group_pk: [{"dtime", "value"}, ...]}`` of weekly spend.
+
+    Each week ends on a Wednesday and is labelled with that day, and the
+    series runs without gaps from the first to the last week with
+    transactions, as ``Series.resample("W-WED").sum()`` would. Daily totals
+    per group come from one query; the weeks are bucketed with numpy.
+    """
+    rows = (
+        Transaction.objects.filter(
+            category__category_groups__in=group_ids,
+            when__gte=from_date, when__lte=to_date, is_split=False,
+        )
+        .annotate(day=TruncDate("when"))
+        .values_list("category__category_groups", "day")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+    result = {group_pk: [] for group_pk in group_ids}
+    if not rows:
+        return result
+
+    group_pks, days, totals = (np.array(column) for column in zip(*rows))
+    cents = np.array([int(total * 100) for total in totals], dtype=np.int64)
+    ends = week_ends(days.astype("datetime64[D]"), WEEK_END_WEEKDAY).astype(np.int64)
+
+    for group_pk in np.unique(group_pks):
+        in_group = group_pks == group_pk
+        group_week_ends = ends[in_group]
+        first = group_week_ends.min()
+        weekly = np.zeros((group_week_ends.max() - first) // 7 + 1, dtype=np.int64)
+        np.add.at(weekly, (group_week_ends - first) // 7, cents[in_group])
+        result[int(group_pk)] = [
+            {
+                "dtime": utc_day_start((np.datetime64(int(first) + 7 * i, "D")).astype(object)),
+                "value": Decimal(int(value)) / 100,
+            }
+            for i, value in enumerate(weekly)
+        ]
+    return result
+
+
+def parse_range(request):
+    """Return ``(from_date, to_date, None)`` or ``(None, None, error response)``."""
+    from_date_str = request.query_params.get("from_date")
+    to_date_str = request.query_params.get("to_date")
+
+    if not from_date_str:
+        return None, None, response.Response(
+            {"error": "from_date parameter is required"}, status=400
+        )
+    if not to_date_str:
+        return None, None, response.Response(
+            {"error": "to_date parameter is required"}, status=400
+        )
+
+    from_date = parse_date(from_date_str)
+    to_date = parse_date(to_date_str)
+
+    if not from_date:
+        return None, None, response.Response(
+            {"error": "from_date must be in YYYY-MM-DD format"}, status=400
+        )
+    if not to_date:
+        return None, None, response.Response(
+            {"error": "to_date must be in YYYY-MM-DD format"}, status=400
+        )
+    return from_date, to_date, None
 
 
 class CategoryGroupViewSet(viewsets.ModelViewSet):
@@ -28,71 +108,42 @@ class CategoryGroupViewSet(viewsets.ModelViewSet):
             Time series with weekly totals starting on Wednesdays
         """
         category_group = self.get_object()
+        from_date, to_date, error = parse_range(request)
+        if error is not None:
+            return error
 
-        # Validate required parameters
-        from_date_str = request.query_params.get("from_date")
-        to_date_str = request.query_params.get("to_date")
+        series = weekly_totals([category_group.pk], from_date, to_date)[category_group.pk]
+        serialised = SeriesSerializer(series, many=True)
+        return response.Response(serialised.data)
 
-        if not from_date_str:
-            return response.Response(
-                {"error": "from_date parameter is required"}, status=400
-            )
-        if not to_date_str:
-            return response.Response(
-                {"error": "to_date parameter is required"}, status=400
-            )
+    @decorators.action(detail=False, methods=["get"], url_path="weekly_summary")
+    def weekly_summaries(self, request):
+        """
+        Get weekly transaction summaries for several category groups at once.
 
-        # Parse dates
-        from_date = parse_date(from_date_str)
-        to_date = parse_date(to_date_str)
+        Query Parameters:
+            ids: Comma separated category group ids (required)
+            from_date: Start date (YYYY-MM-DD format, required)
+            to_date: End date (YYYY-MM-DD format, required)
 
-        if not from_date:
-            return response.Response(
-                {"error": "from_date must be in YYYY-MM-DD format"}, status=400
-            )
-        if not to_date:
+        Returns:
+            One ``{id, name, series}`` entry per group, as ``weekly_summary``
+        """
+        raw_ids = request.query_params.get("ids")
+        if not raw_ids:
+            return response.Response({"error": "ids parameter is required"}, status=400)
+        try:
+            ids = [int(part) for part in raw_ids.split(",")]
+        except ValueError:
             return response.Response(
-                {"error": "to_date must be in YYYY-MM-DD format"}, status=400
+                {"error": "ids must be a comma separated list of integers"}, status=400
             )
-
-        # Get categories in this group
-        categories = category_group.categories.all()
-
-        # Return empty series if no categories
-        if not categories.exists():
-            serialised = SeriesSerializer([], many=True)
-            return response.Response(serialised.data)
-
-        # Build Q object for filtering by multiple categories
-        category_filter = Q(category__in=categories)
-
-        # Get transactions for all categories in the group
-        transactions = Transaction.objects.filter(
-            category_filter, when__gte=from_date, when__lte=to_date, is_split=False
-        ).order_by("when")
-
-        # Return empty series if no transactions
-        if not transactions.exists():
-            serialised = SeriesSerializer([], many=True)
-            return response.Response(serialised.data)
-
-        # Convert to pandas DataFrame
-        df = pd.DataFrame(
-            {
-                "when": [t.when for t in transactions],
-                "amount": [float(t.amount) for t in transactions],
-            }
-        )
-
-        # Set when as index
-        df.set_index("when", inplace=True)
-
-        # Resample by week starting on Wednesday, sum amounts
-        weekly_series = df["amount"].resample("W-WED").sum()
-
-        # Convert to format expected by SeriesSerializer
-        weekly_series.index.name = "dtime"
-        result = weekly_series.to_frame("value").reset_index().to_dict(orient="records")
-
-        serialised = SeriesSerializer(result, many=True)
+        from_date, to_date, error = parse_range(request)
+        if error is not None:
+            return error
+
+        groups = list(self.get_queryset().filter(pk__in=ids).values("id", "name"))
+        series = weekly_totals([group["id"] for group in groups], from_date, to_date)
+        data = [dict(group, series=series[group["id"]]) for group in groups]
+        serialised = CategoryGroupWeeklySummarySerializer(data, many=True)
         return response.Response(serialised.data)
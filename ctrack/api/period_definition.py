@@ -1,8 +1,11 @@
 """ctrack REST API"""
 
+import hashlib
+import json
 import logging
 
-from rest_framework import response, views
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import response, status, views
 from ctrack.api.serializers.period_definition import PeriodDefinitionSerializer
 from ctrack.models import PeriodDefinition
 
@@ -11,11 +14,26 @@ logger = logging.getLogger(__name__)
 
 
 class PeriodDefinitionView(views.APIView):
+    """GET /api/periods/ — current and previous period of every definition.
+
+    The periods only move when the day changes or a definition is edited,
+    so the response carries an ETag of its content and a matching
+    ``If-None-Match`` gets a 304.
+    """
     queryset = PeriodDefinition.objects.all()
     serializer_class = PeriodDefinitionSerializer
 
-    def get(self, formats=None):
+    def get(self, request, format=None):
         data = sum(
             (period.option_specifiers for period in PeriodDefinition.objects.all()), []
         )
-        return response.Response(data)
+        etag = quote_etag(hashlib.md5(
+            json.dumps(data, sort_keys=True).encode("utf-8")
+        ).hexdigest())
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            result = response.Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            result = response.Response(data)
+        result["ETag"] = etag
+        return result
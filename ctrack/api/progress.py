@@ -3,25 +3,117 @@
 import calendar
 import logging
 from datetime import date, timedelta
-from decimal import Decimal
 
 from dateutil.relativedelta import relativedelta
-from django.db.models import Sum
+from django.conf import settings
 from django.utils.dateparse import parse_date
 from rest_framework import response, views
 
-from ctrack.api.serializers.progress import ProgressResponseSerializer
-from ctrack.models import (
-    BudgetEntry,
-    Category,
-    CategoryGroup,
-    PeriodDefinition,
-    RecurringPayment,
-    Transaction,
+from ctrack.api.caching import cached
+from ctrack.api.serializers.progress import (
+    MultiProgressResponseSerializer,
+    ProgressResponseSerializer,
 )
+from ctrack.models import PeriodDefinition
+from ctrack.progress import ProgressSnapshot, build_progress
 
 logger = logging.getLogger(__name__)
 
+# Responses are keyed on today's date as well as the data version.
+DEFAULT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Upper bound on the periods in one /api/progress/periods/ request; each one
+# adds two filtered sums to the spend query.
+MAX_PERIODS = 24
+
+# Upper bound on a period offset; far larger ones run dates off the calendar.
+MAX_OFFSET = 1000
+
+BUILTIN_PERIODS = {
+    # name: (label for offset 1, label for offset 2, unit for older offsets)
+    "week": ("This week", "Last week", "weeks"),
+    "month": ("This month", "Last month", "months"),
+    "quarter": ("This quarter", "Last quarter", "quarters"),
+}
+
+
+def builtin_period(name, today, offset=1):
+    """Return ``(from_date, to_date, label)`` for a named calendar period.
+
+    ``offset`` counts back from the period containing ``today``: 1 is the
+    current period, 2 the one before it and so on.
+    """
+    back = offset - 1
+    if name == "week":
+        monday = today - timedelta(days=today.weekday() + 7 * back)
+        from_date, to_date = monday, monday + timedelta(days=6)
+    elif name == "month":
+        from_date = today.replace(day=1) - relativedelta(months=back)
+        last_day = calendar.monthrange(from_date.year, from_date.month)[1]
+        to_date = from_date.replace(day=last_day)
+    else:
+        q_month = ((today.month - 1) // 3) * 3 + 1
+        from_date = date(today.year, q_month, 1) - relativedelta(months=3 * back)
+        to_date = from_date + relativedelta(months=3) - timedelta(days=1)
+
+    current, previous, unit = BUILTIN_PERIODS[name]
+    if offset == 1:
+        label = current
+    elif offset == 2:
+        label = previous
+    else:
+        label = "%d %s ago" % (back, unit)
+    return from_date, to_date, label
+
+
+def definition_period(pd_obj, offset=1):
+    """Return ``(from_date, to_date, label)`` for a ``PeriodDefinition``.
+
+    ``offset`` follows ``PeriodDefinition.option_specifiers``: 1 is the current
+    period and 2 the previous one. Raises IndexError if the offset is beyond
+    the periods the definition covers.
+    """
+    if offset < 1:
+        raise IndexError(offset)
+    from_date, to_date = pd_obj.date_ranges[-offset]
+    # PeriodDefinition dates may be pandas Timestamps
+    if hasattr(from_date, "date"):
+        from_date = from_date.date()
+    if hasattr(to_date, "date"):
+        to_date = to_date.date()
+    if offset == 1:
+        label = "Current " + pd_obj.label
+    elif offset == 2:
+        label = "Previous " + pd_obj.label
+    else:
+        label = "%s -%d" % (pd_obj.label, offset - 1)
+    return from_date, to_date, label
+
+
+def parse_offsets(raw):
+    """Parse ``"1-3"`` or ``"1,2,4"`` into a list of offsets.
+
+    Raises ValueError for anything else, for offsets outside 1 to
+    ``MAX_OFFSET`` and for more than ``MAX_PERIODS`` offsets.
+    """
+    if "-" in raw:
+        first, last = (int(part) for part in raw.split("-", 1))
+        # Checked before expanding so a huge range is never built.
+        if last - first + 1 > MAX_PERIODS:
+            raise ValueError(raw)
+        offsets = list(range(first, last + 1))
+    else:
+        offsets = [int(part) for part in raw.split(",")]
+    if not offsets or len(offsets) > MAX_PERIODS or not 1 <= min(offsets) <= max(offsets) <= MAX_OFFSET:
+        raise ValueError(raw)
+    return offsets
+
+
+def cached_response(parts, compute):
+    """Return a response with ``compute()``, cached under ``parts``."""
+    timeout = getattr(settings, "CTRACK_PROGRESS_CACHE_TIMEOUT", DEFAULT_CACHE_TIMEOUT)
+    return response.Response(cached("progress", parts, compute, timeout))
+
 
 # ---------------------------------------------------------------------------
 # View
@@ -46,228 +138,15 @@ class ProgressView(views.APIView):
         group_by = request.query_params.get("group_by", "category")
 
         # ------------------------------------------------------------------
-        # Step 2 — Actual spend by category or category_group
-        # ------------------------------------------------------------------
-        if group_by == "category_group":
-            spend_map = self._spend_by_category_group(from_date, to_date)
-        else:
-            spend_map = self._spend_by_category(from_date, to_date)
-
-        # ------------------------------------------------------------------
-        # Step 3 — Budget amounts mapped to rows
-        # ------------------------------------------------------------------
-        budget_entries = BudgetEntry.objects.for_period(to_date)
-        # budget_map: row_id -> budget amount over the period
-        budget_map = {}
-        # category_to_row: category_pk -> row_id  (for bill mapping later)
-        category_to_row = {}
-        # budgeted_category_pks: set of category PKs that have a budget
-        budgeted_category_pks = set()
-
-        for entry in budget_entries:
-            budget_amount = entry.amount_over_period(from_date, to_date)
-            cat_pks = set(entry.categories.values_list("pk", flat=True))
-            n_cats = len(cat_pks)
-            budgeted_category_pks |= cat_pks
-
-            if group_by == "category_group":
-                # Map budget to groups that contain any of the entry's categories
-                matching_groups = list(
-                    CategoryGroup.objects.filter(categories__in=cat_pks).distinct()
-                )
-                n_groups = len(matching_groups) or 1
-                per_group_amount = Decimal(str(budget_amount)) / n_groups
-                for group in matching_groups:
-                    budget_map.setdefault(group.pk, Decimal("0"))
-                    budget_map[group.pk] += per_group_amount
-                    for cpk in cat_pks:
-                        category_to_row[cpk] = group.pk
-            else:
-                # Pro-rate across categories so the total isn't duplicated
-                per_cat_amount = Decimal(str(budget_amount)) / (n_cats or 1)
-                for cpk in cat_pks:
-                    budget_map.setdefault(cpk, Decimal("0"))
-                    budget_map[cpk] += per_cat_amount
-                    category_to_row[cpk] = cpk
-
-        # ------------------------------------------------------------------
-        # Step 4 — Expected remaining spend
-        # ------------------------------------------------------------------
-        remaining_start = max(today + timedelta(days=1), from_date)
-        remaining_days = (to_date - remaining_start).days + 1 if remaining_start <= to_date else 0
-
-        expected_remaining_map = {}
-
-        if remaining_days > 0:
-            # Pro-rata budget for categories WITH a budget
-            for entry in budget_entries:
-                remaining_amount = Decimal(
-                    str(entry.amount_over_period(remaining_start, to_date))
-                )
-                cat_pks = set(entry.categories.values_list("pk", flat=True))
-                n_cats = len(cat_pks)
-
-                if group_by == "category_group":
-                    matching_groups = list(
-                        CategoryGroup.objects.filter(
-                            categories__in=cat_pks
-                        ).distinct()
-                    )
-                    n_groups = len(matching_groups) or 1
-                    per_group_amount = remaining_amount / n_groups
-                    for group in matching_groups:
-                        expected_remaining_map.setdefault(group.pk, Decimal("0"))
-                        expected_remaining_map[group.pk] += per_group_amount
-                else:
-                    per_cat_amount = remaining_amount / (n_cats or 1)
-                    for cpk in cat_pks:
-                        expected_remaining_map.setdefault(cpk, Decimal("0"))
-                        expected_remaining_map[cpk] += per_cat_amount
-
-            # Historical average fallback for categories WITHOUT a budget
-            lookback_start = from_date - timedelta(days=90)
-            lookback_end = from_date - timedelta(days=1)
-            lookback_days = (lookback_end - lookback_start).days or 1
-
-            if group_by == "category_group":
-                for group in CategoryGroup.objects.all():
-                    if group.pk not in budget_map:
-                        hist = (
-                            Transaction.objects.filter(
-                                when__gte=lookback_start,
-                                when__lte=lookback_end,
-                                is_split=False,
-                                category__in=group.categories.all(),
-                            ).aggregate(total=Sum("amount"))["total"]
-                            or Decimal("0")
-                        )
-                        avg_daily = hist / lookback_days
-                        expected_remaining_map[group.pk] = avg_daily * remaining_days
-            else:
-                # Find categories that appeared in spend_map but have no budget
-                unbudgeted_cats = set(spend_map.keys()) - budgeted_category_pks
-                if unbudgeted_cats:
-                    hist_qs = (
-                        Transaction.objects.filter(
-                            when__gte=lookback_start,
-                            when__lte=lookback_end,
-                            is_split=False,
-                            category__in=unbudgeted_cats,
-                        )
-                        .values("category")
-                        .annotate(total=Sum("amount"))
-                    )
-                    for row in hist_qs:
-                        avg_daily = row["total"] / lookback_days
-                        expected_remaining_map[row["category"]] = (
-                            avg_daily * remaining_days
-                        )
-
-        # ------------------------------------------------------------------
-        # Step 5 — Upcoming recurring bills
+        # Step 2 — Serve a cached response if the data hasn't changed,
+        # otherwise load everything up front and map in memory
         # ------------------------------------------------------------------
-        upcoming_map = {}  # row_id -> list of bill dicts
-
-        for payment in RecurringPayment.objects.filter(
-            is_income=False, category__isnull=False
-        ):
-            ndd = payment.next_due_date()
-            if ndd is None:
-                continue
-            # next_due_date may return a pandas Timestamp; normalise to date
-            if hasattr(ndd, "date"):
-                ndd = ndd.date()
-
-            series = payment.bills_as_series()
-            if len(series) < 2:
-                mean_interval = None
-            else:
-                days_between = series.index.to_series().diff().dt.days.dropna()
-                mean_interval = int(days_between.mean()) if len(days_between) else None
-
-            expected_amount = Decimal(str(abs(float(series.iloc[-1])))) if len(series) else Decimal("0")
-
-            # Determine the row this payment maps to
-            cat_pk = payment.category_id
-            if group_by == "category_group":
-                groups = CategoryGroup.objects.filter(categories=cat_pk)
-                row_ids = [g.pk for g in groups]
-            else:
-                row_ids = [cat_pk]
-
-            # Walk through due dates within the period
-            due = ndd
-            while due is not None and due <= to_date:
-                if due > today:
-                    bill_dict = {
-                        "name": payment.name,
-                        "expected_date": due,
-                        "expected_amount": expected_amount,
-                    }
-                    for rid in row_ids:
-                        upcoming_map.setdefault(rid, []).append(bill_dict)
-                # Step forward
-                if mean_interval and mean_interval > 0:
-                    due = due + timedelta(days=mean_interval)
-                else:
-                    break
-
-        # ------------------------------------------------------------------
-        # Step 6 — Assemble response
-        # ------------------------------------------------------------------
-        all_ids = set(spend_map.keys()) | set(budget_map.keys()) | set(
-            expected_remaining_map.keys()
-        ) | set(upcoming_map.keys())
-
-        # Remove None keys (uncategorised transactions)
-        all_ids.discard(None)
-
-        # Build a name lookup
-        if group_by == "category_group":
-            name_lookup = dict(
-                CategoryGroup.objects.filter(pk__in=all_ids).values_list("pk", "name")
-            )
-        else:
-            name_lookup = dict(
-                Category.objects.filter(pk__in=all_ids).values_list("pk", "name")
-            )
+        def compute():
+            snapshot = ProgressSnapshot.load(from_date, to_date, today)
+            data = build_progress(snapshot, group_by=group_by, label=label)
+            return ProgressResponseSerializer(data).data
 
-        rows = []
-        for row_id in sorted(all_ids, key=lambda rid: name_lookup.get(rid, "")):
-            rows.append(
-                {
-                    "id": row_id,
-                    "name": name_lookup.get(row_id, "Unknown"),
-                    "actual_spend": spend_map.get(row_id, Decimal("0")),
-                    "expected_remaining": expected_remaining_map.get(
-                        row_id, Decimal("0")
-                    ),
-                    "budget": budget_map.get(row_id, None),
-                    "upcoming_bills": upcoming_map.get(row_id, []),
-                }
-            )
-
-        total_actual = sum(r["actual_spend"] for r in rows)
-        total_expected = sum(r["expected_remaining"] for r in rows)
-        budget_values = [r["budget"] for r in rows if r["budget"] is not None]
-        total_budget = sum(budget_values) if budget_values else None
-
-        data = {
-            "period": {
-                "from_date": from_date,
-                "to_date": to_date,
-                "label": label,
-            },
-            "rows": rows,
-            "totals": {
-                "actual_spend": total_actual,
-                "expected_remaining": total_expected,
-                "budget": total_budget,
-            },
-        }
-
-        serializer = ProgressResponseSerializer(data)
-        return response.Response(serializer.data)
+        return cached_response((from_date, to_date, label, group_by, today), compute)
 
     # ------------------------------------------------------------------
     # Helpers
@@ -292,75 +171,90 @@ class ProgressView(views.APIView):
         if not period:
             return None, None, None
 
-        if period == "week":
-            monday = today - timedelta(days=today.weekday())
-            sunday = monday + timedelta(days=6)
-            return monday, sunday, "This week"
-
-        if period == "month":
-            first = today.replace(day=1)
-            last_day = calendar.monthrange(today.year, today.month)[1]
-            last = today.replace(day=last_day)
-            return first, last, "This month"
-
-        if period == "quarter":
-            q_month = ((today.month - 1) // 3) * 3 + 1
-            first = date(today.year, q_month, 1)
-            last = first + relativedelta(months=3) - timedelta(days=1)
-            return first, last, "This quarter"
+        if period in BUILTIN_PERIODS:
+            return builtin_period(period, today)
 
         # Numeric — PeriodDefinition pk
         try:
             pd_obj = PeriodDefinition.objects.get(pk=int(period))
-            from_date, to_date = pd_obj.current
-            # PeriodDefinition dates may be pandas Timestamps
-            if hasattr(from_date, "date"):
-                from_date = from_date.date()
-            if hasattr(to_date, "date"):
-                to_date = to_date.date()
-            return from_date, to_date, "Current " + pd_obj.label
+            return definition_period(pd_obj)
         except (ValueError, PeriodDefinition.DoesNotExist):
             return None, None, None
 
-    @staticmethod
-    def _spend_by_category(from_date, to_date):
-        """Return {category_pk: Decimal spend} for the period.
 
-        Excludes uncategorised transactions (category=NULL).
-        """
-        qs = (
-            Transaction.objects.filter(
-                when__gte=from_date, when__lte=to_date,
-                is_split=False, category__isnull=False,
+class MultiProgressView(views.APIView):
+    """GET /api/progress/periods/ — progress for several periods at once.
+
+    Periods are given as ``periods``, a comma separated list of ``week``,
+    ``month``, ``quarter`` or a ``PeriodDefinition`` pk, each optionally
+    followed by ``:<offset>`` (1 is the current period, 2 the previous one),
+    and/or as ``period_definition`` with an ``offsets`` range such as ``1-3``.
+    All periods are loaded together, so the query count does not grow with
+    the number of periods.
+    """
+
+    def get(self, request, format=None):
+        today = date.today()
+        try:
+            periods = self._resolve_periods(request, today)
+        except (ValueError, IndexError, OverflowError, PeriodDefinition.DoesNotExist):
+            periods = None
+        if not periods:
+            return response.Response(
+                {"detail": "Provide 'periods' or 'period_definition' with 'offsets'."},
+                status=400,
+            )
+        if len(periods) > MAX_PERIODS:
+            return response.Response(
+                {"detail": "At most %d periods may be requested." % MAX_PERIODS},
+                status=400,
             )
-            .values("category", "category__name")
-            .annotate(actual_spend=Sum("amount"))
-        )
-        return {row["category"]: row["actual_spend"] or Decimal("0") for row in qs}
+
+        group_by = request.query_params.get("group_by", "category")
+
+        def compute():
+            snapshots = ProgressSnapshot.load_many(
+                [(from_date, to_date) for from_date, to_date, _ in periods], today
+            )
+            data = {"periods": [
+                build_progress(snapshot, group_by=group_by, label=label)
+                for snapshot, (_, _, label) in zip(snapshots, periods)
+            ]}
+            return MultiProgressResponseSerializer(data).data
+
+        return cached_response(("multi", periods, group_by, today), compute)
 
     @staticmethod
-    def _spend_by_category_group(from_date, to_date):
-        """Return {group_pk: Decimal spend} for the period.
+    def _resolve_periods(request, today):
+        """Return a list of (from_date, to_date, label).
 
-        Uses a single query with annotation instead of N+1 per-group queries.
+        Raises ValueError, IndexError or PeriodDefinition.DoesNotExist for
+        unparseable or unknown periods.
         """
-        # Fetch all transactions in the period, grouped by category
-        cat_totals = dict(
-            Transaction.objects.filter(
-                when__gte=from_date, when__lte=to_date,
-                is_split=False, category__isnull=False,
-            )
-            .values_list("category")
-            .annotate(total=Sum("amount"))
-        )
-
-        # Map category totals to groups
-        spend_map = {}
-        for group in CategoryGroup.objects.prefetch_related("categories").all():
-            total = sum(
-                cat_totals.get(cat_pk, Decimal("0"))
-                for cat_pk in group.categories.values_list("pk", flat=True)
-            )
-            if total:
-                spend_map[group.pk] = total
-        return spend_map
+        specs = []
+        raw_periods = request.query_params.get("periods")
+        if raw_periods:
+            for token in raw_periods.split(","):
+                name, _, raw_offset = token.strip().partition(":")
+                specs.append((name, int(raw_offset) if raw_offset else 1))
+
+        definition = request.query_params.get("period_definition")
+        if definition:
+            offsets = parse_offsets(request.query_params.get("offsets", "1"))
+            specs.extend((definition, offset) for offset in offsets)
+
+        definition_pks = {int(name) for name, _ in specs if name not in BUILTIN_PERIODS}
+        definitions = PeriodDefinition.objects.in_bulk(definition_pks) if definition_pks else {}
+
+        periods = []
+        for name, offset in specs:
+            if not 1 <= offset <= MAX_OFFSET:
+                raise ValueError(offset)
+            if name in BUILTIN_PERIODS:
+                periods.append(builtin_period(name, today, offset))
+            else:
+                pk = int(name)
+                if pk not in definitions:
+                    raise PeriodDefinition.DoesNotExist(pk)
+                periods.append(definition_period(definitions[pk], offset))
+        return periods
@@ -2,6 +2,7 @@
 """
 import logging
 
+from ctrack.api.caching import cached
 from ctrack.api.serializers.common import LoadDataSerializer
 from ctrack.api.serializers.recurring_payment import (
     BillSerializer, RecurringPaymentSerializer,
@@ -11,14 +12,29 @@ from ctrack.api.serializers.recurring_detection import (
     DetectRecurringRequestSerializer,
     DetectRecurringResponseSerializer,
 )
+from django.conf import settings
 from django.db import transaction as db_transaction
-from ctrack.models import (Bill, RecurringPayment, Transaction)
+from ctrack.models import (Bill, RecurringPayment, Transaction, payment_schedule)
 from ctrack.recurring_detection import RecurringTransactionDetector
 from django_filters import rest_framework as filters
 from rest_framework import (decorators, response, status, viewsets)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DETECTION_CACHE_TIMEOUT = 60 * 60
+
+
+def cached_clusters(detector, qs, *parts):
+    """Return ``detector.cluster_descriptions(qs)``, reusing a cached result.
+
+    ``parts`` identify the transactions in ``qs``; the detector's text
+    parameters are added to the key, so changing only the regularity or
+    amount settings reuses the clustering.
+    """
+    timeout = getattr(settings, "CTRACK_DETECTION_CACHE_TIMEOUT", DEFAULT_DETECTION_CACHE_TIMEOUT)
+    return cached("clusters", (*parts, *detector.text_params()),
+                  lambda: detector.cluster_descriptions(qs), timeout)
+
 
 class RecurringPaymentViewSet(viewsets.ModelViewSet):
     queryset = (
@@ -72,8 +88,13 @@ class RecurringPaymentViewSet(viewsets.ModelViewSet):
             interval_cv_threshold=serializer.validated_data.get('interval_cv_threshold', 0.35),
             cosine_distance_threshold=serializer.validated_data.get('cosine_distance_threshold', 0.4),
             amount_tolerance=serializer.validated_data.get('amount_tolerance', 0.10),
+            lsh_bands=serializer.validated_data.get('lsh_bands'),
+            lsh_rows=serializer.validated_data.get('lsh_rows', 4),
+            workers=getattr(settings, 'CTRACK_DETECTION_WORKERS', 1),
         )
-        groups = detector.detect(qs)
+        account = serializer.validated_data.get('account')
+        clusters = cached_clusters(detector, qs, account.pk if account else None, from_date, to_date)
+        groups = detector.analyze(clusters)
 
         result = {
             "status": "ok",
@@ -89,51 +110,61 @@ class RecurringPaymentViewSet(viewsets.ModelViewSet):
         serializer = CreateFromDetectionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
+        groups = serializer.validated_data['groups']
+
         # Validate all transaction IDs upfront before creating anything
-        for group_data in serializer.validated_data['groups']:
-            tx_ids = group_data['transaction_ids']
-            found_count = Transaction.objects.filter(id__in=tx_ids).count()
-            if found_count != len(tx_ids):
-                found_ids = set(Transaction.objects.filter(id__in=tx_ids).values_list('id', flat=True))
-                missing = set(tx_ids) - found_ids
-                return response.Response(
-                    {"detail": f"Transaction IDs not found: {sorted(missing)}"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        tx_ids = {tx_id for group_data in groups for tx_id in group_data['transaction_ids']}
+        transactions = Transaction.objects.only('id', 'when', 'amount', 'description').in_bulk(tx_ids)
+        missing = tx_ids - set(transactions)
+        if missing:
+            return response.Response(
+                {"detail": f"Transaction IDs not found: {sorted(missing)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        created_payments = []
+        group_transactions = [
+            sorted((transactions[tx_id] for tx_id in set(group_data['transaction_ids'])),
+                   key=lambda txn: (txn.when, txn.pk))
+            for group_data in groups
+        ]
         with db_transaction.atomic():
-            for group_data in serializer.validated_data['groups']:
-                tx_ids = group_data['transaction_ids']
-                transactions = Transaction.objects.filter(id__in=tx_ids).order_by('when')
-
-                payment = RecurringPayment.objects.create(
+            # The payments are new, so their schedules follow from these
+            # transactions alone and are stored with the rows.
+            payments = RecurringPayment.objects.bulk_create([
+                RecurringPayment(
                     name=group_data['name'],
                     is_income=group_data.get('is_income', False),
                     category=group_data.get('category'),
+                    **payment_schedule([(txn.when.date(), abs(txn.amount)) for txn in txns]),
                 )
-
-                for txn in transactions:
-                    # Bill.description has max_length=100; truncate if needed
-                    desc = (txn.description or payment.name)[:100]
-                    bill = Bill.objects.create(
-                        description=desc,
-                        due_date=txn.when.date(),
-                        due_amount=abs(txn.amount),
-                        series=payment,
-                    )
-                    bill.paying_transactions.add(txn)
-
-                created_payments.append(payment)
-
+                for group_data, txns in zip(groups, group_transactions)
+            ])
+            Bill.bulk_create_paid([
+                (payment, txn)
+                for payment, txns in zip(payments, group_transactions)
+                for txn in txns
+            ])
+
+        created_payments = (
+            RecurringPayment.objects
+            .filter(pk__in=[payment.pk for payment in payments])
+            .prefetch_related('bills', 'bills__paying_transactions')
+            .order_by('pk')
+        )
         result = RecurringPaymentSerializer(
             created_payments, many=True, context={'request': request}
         )
         return response.Response(result.data, status=status.HTTP_201_CREATED)
 
 
+class BillFilter(filters.FilterSet):
+    class Meta:
+        model = Bill
+        fields = ('due_date', 'series', 'is_paid')
+
+
 class BillViewSet(viewsets.ModelViewSet):
     queryset = Bill.objects.prefetch_related('paying_transactions').order_by('-due_date')
     serializer_class = BillSerializer
     filter_backends = (filters.backends.DjangoFilterBackend,)
-    filter_fields = ('due_date', 'series')
+    filterset_class = BillFilter
@@ -10,3 +10,23 @@ class AccountSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = Account
         fields = ('url', 'id', 'name', 'balance', 'last_transaction')
+
+
+class SeriesQuerySerializer(serializers.Serializer):
+    """Query parameters for the account balance ``series`` action."""
+    RESOLUTIONS = ('day', 'week', 'month')
+
+    from_date = serializers.DateField(required=False)
+    to_date = serializers.DateField(required=False)
+    resolution = serializers.ChoiceField(choices=RESOLUTIONS, default='day')
+    max_points = serializers.IntegerField(
+        required=False, min_value=2,
+        help_text="Downsample to at most this many points, keeping each bucket's min and max.",
+    )
+
+    def validate(self, attrs):
+        from_date = attrs.get('from_date')
+        to_date = attrs.get('to_date')
+        if from_date and to_date and from_date > to_date:
+            raise serializers.ValidationError("from_date must not be after to_date.")
+        return attrs
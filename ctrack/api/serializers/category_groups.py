@@ -1,6 +1,7 @@
 """Serializers for the category-groups API."""
 from rest_framework import serializers
 
+from ctrack.api.serializers.common import SeriesSerializer
 from ctrack.models import CategoryGroup
 
 
@@ -9,3 +10,9 @@ class CategoryGroupSerializer(serializers.HyperlinkedModelSerializer):
         model = CategoryGroup
         fields = ("url", "id", "name", "categories")
         extra_kwargs = {"categories": {"required": False}}
+
+
+class CategoryGroupWeeklySummarySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    series = SeriesSerializer(many=True)
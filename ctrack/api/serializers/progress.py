@@ -33,3 +33,7 @@ class ProgressResponseSerializer(serializers.Serializer):
     period = ProgressPeriodSerializer()
     rows = ProgressRowSerializer(many=True)
     totals = ProgressTotalsSerializer()
+
+
+class MultiProgressResponseSerializer(serializers.Serializer):
+    periods = ProgressResponseSerializer(many=True)
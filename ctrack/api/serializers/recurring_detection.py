@@ -11,6 +11,14 @@ class DetectRecurringRequestSerializer(serializers.Serializer):
     interval_cv_threshold = serializers.FloatField(default=0.35, min_value=0.1, max_value=1.0)
     cosine_distance_threshold = serializers.FloatField(default=0.4, min_value=0.1, max_value=0.9)
     amount_tolerance = serializers.FloatField(default=0.10, min_value=0.01, max_value=0.5)
+    lsh_bands = serializers.IntegerField(
+        required=False, min_value=1, max_value=64,
+        help_text="Enable MinHash LSH blocking with this many bands; more bands find more pairs",
+    )
+    lsh_rows = serializers.IntegerField(
+        default=4, min_value=1, max_value=8,
+        help_text="MinHash rows per LSH band; more rows compare fewer pairs",
+    )
     account = serializers.PrimaryKeyRelatedField(
         queryset=Account.objects.all(), required=False
     )
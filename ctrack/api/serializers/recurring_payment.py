@@ -5,12 +5,11 @@ from ctrack.models import Bill, RecurringPayment
 
 
 class BillSerializer(serializers.ModelSerializer):
-    is_paid = serializers.ReadOnlyField()
 
     class Meta:
         model = Bill
         fields = ('url', 'id', 'description', 'due_date', 'due_amount', 'fixed_amount', 'var_amount',
-                  'document', 'series', 'paying_transactions', 'is_paid')
+                  'document', 'series', 'paying_transactions', 'paid_amount', 'is_paid')
 
 
 class RecurringPaymentSerializer(serializers.ModelSerializer):
@@ -18,4 +17,5 @@ class RecurringPaymentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = RecurringPayment
-        fields = ('url', 'id', 'name', 'is_income', 'bills', 'next_due_date', 'category')
+        fields = ('url', 'id', 'name', 'is_income', 'bills', 'category', 'last_due_date',
+                  'last_amount', 'mean_interval', 'next_due_date')
@@ -8,7 +8,7 @@ from rest_framework import (decorators, pagination, response,
                             status, viewsets)
 from django_filters import rest_framework as filters
 import django_filters
-from ctrack.models import Transaction
+from ctrack.models import CategoryMonthTotal, Transaction, month_span
 from ctrack.api.serializers.transactions import (
     SplitTransSerializer, SummarySerializer, TransactionSerializer,
 )
@@ -65,7 +65,42 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
     @decorators.action(detail=False, methods=["get"])
     def summary(self, request):
-        queryset = self.filter_queryset(self.get_queryset().order_by())
-        result = queryset.values('category', 'category__name').annotate(total=Sum('amount')).order_by('total')
+        result = self._summary_from_month_totals(request)
+        if result is None:
+            queryset = self.filter_queryset(self.get_queryset().order_by())
+            result = queryset.values('category', 'category__name').annotate(total=Sum('amount')).order_by('total')
         serialised = SummarySerializer(result, many=True)
         return response.Response(serialised.data)
+
+    def _summary_from_month_totals(self, request):
+        """Answer ``summary`` from ``CategoryMonthTotal`` where possible.
+
+        Returns None unless the filters span whole months and only use
+        fields the monthly totals are grouped by.
+        """
+        filterset = self.filterset_class(request.query_params, queryset=self.get_queryset(),
+                                         request=request)
+        if not filterset.is_valid():
+            return None
+        params = filterset.form.cleaned_data
+        from_date, to_date = params.get('from_date'), params.get('to_date')
+        if params.get('description') or not from_date or not to_date:
+            return None
+        if month_span(from_date, to_date) is None:
+            return None
+
+        filters = {'is_split': False}
+        if params.get('account') is not None:
+            filters['account'] = params['account']
+        if params.get('category') is not None:
+            filters['category'] = params['category']
+        if params.get('has_category') is not None:
+            filters['category__isnull'] = not params['has_category']
+        [totals] = CategoryMonthTotal.totals(
+            [(from_date, to_date)], ['category', 'category__name'], **filters
+        )
+        return sorted(
+            ({'category': category, 'category__name': name, 'total': total}
+             for (category, name), total in totals.items()),
+            key=lambda row: row['total'],
+        )
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CtrackConfig(AppConfig):
     name = 'ctrack'
     default_auto_field = 'django.db.models.BigAutoField'
+
+    def ready(self):
+        from ctrack import signals  # noqa: F401
@@ -0,0 +1,137 @@
+"""Bulk loader for legacy CSV dumps of transactions.
+
+Expects the following columns, with the date as the first (index) column:
+    1. date
+    2. description
+    3. category
+    4. amount
+    5. accountname
+
+The file is read in chunks. Categories and accounts are resolved with one
+set-based lookup per chunk (creating any missing rows in bulk) and the
+transactions for each chunk are written with a single ``bulk_create``.
+Rows whose amount is blank or not a number are skipped, counted and logged
+with their line numbers.
+"""
+import logging
+import time
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+from django.db import transaction as db_transaction
+
+from ctrack.models import Account, Category, Transaction
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def _resolve_names(model, names, cache):
+    """Return ``{name: pk}`` for ``names``, creating any that do not exist.
+
+    ``cache`` is updated in place so subsequent chunks skip the lookup for
+    names that have already been resolved. Where several rows share a name
+    the lowest pk wins, matching what ``get_or_create`` would have returned
+    for the first row created.
+    """
+    wanted = set(names) - set(cache)
+    if not wanted:
+        return cache
+
+    for name, pk in (model.objects.filter(name__in=wanted)
+                     .order_by('-pk').values_list('name', 'pk')):
+        cache[name] = pk
+
+    missing = sorted(wanted - set(cache))
+    if missing:
+        model.objects.bulk_create([model(name=name) for name in missing])
+        cache.update(model.objects.filter(name__in=missing).values_list('name', 'pk'))
+    return cache
+
+
+def _parse_amount(raw):
+    """Return ``raw`` as a Decimal, or None if it is blank or not a number."""
+    try:
+        amount = Decimal(raw.strip())
+    except InvalidOperation:
+        return None
+    return amount if amount.is_finite() else None
+
+
+def _read_chunks(data_file, chunk_size):
+    return pd.read_csv(
+        data_file,
+        index_col=0,
+        parse_dates=True,
+        dayfirst=True,
+        dtype={'description': str, 'category': str, 'amount': str, 'accountname': str},
+        keep_default_na=False,
+        chunksize=chunk_size,
+    )
+
+
+def load_csv(data_file, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Load transactions from the CSV ``data_file``.
+
+    ``progress`` is an optional callable invoked with the running stats dict
+    after each chunk is written.
+
+    Returns a dict with ``rows`` (loaded), ``skipped``, ``chunks``,
+    ``seconds`` and ``rows_per_sec``.
+    """
+    category_cache = {}
+    account_cache = {}
+    stats = {'rows': 0, 'skipped': 0, 'chunks': 0, 'seconds': 0.0, 'rows_per_sec': 0.0}
+    start = time.perf_counter()
+    rows_read = 0
+
+    for chunk in _read_chunks(data_file, chunk_size):
+        if chunk.empty:
+            continue
+        amounts = chunk['amount'].map(_parse_amount)
+        invalid = amounts.isna().to_numpy()
+        if invalid.any():
+            # Line 1 is the header.
+            lines = (rows_read + invalid.nonzero()[0] + 2).tolist()
+            logger.warning("Skipping %d rows with a blank or invalid amount on lines %s",
+                           len(lines), ", ".join(str(line) for line in lines))
+            stats['skipped'] += len(lines)
+        rows_read += len(chunk)
+        chunk, amounts = chunk[~invalid], amounts[~invalid]
+        if chunk.empty:
+            continue
+        when = pd.DatetimeIndex(chunk.index)
+        if when.tz is None:
+            when = when.tz_localize('UTC')
+        categories = chunk['category'].str.strip()
+        accounts = chunk['accountname'].str.strip()
+
+        with db_transaction.atomic():
+            _resolve_names(Category, categories[categories != ''].unique(), category_cache)
+            _resolve_names(Account, accounts.unique(), account_cache)
+            Transaction.objects.bulk_create([
+                Transaction(
+                    when=row_when,
+                    description=description,
+                    amount=amount,
+                    category_id=category_cache.get(category),
+                    account_id=account_cache[account],
+                )
+                for row_when, description, category, amount, account in zip(
+                    when.to_pydatetime(), chunk['description'], categories,
+                    amounts, accounts,
+                )
+            ], batch_size=chunk_size)
+
+        stats['rows'] += len(chunk)
+        stats['chunks'] += 1
+        stats['seconds'] = time.perf_counter() - start
+        stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+        if progress is not None:
+            progress(stats)
+
+    logger.info("Loaded %d transactions in %.2fs (%.0f rows/sec), skipped %d",
+                stats['rows'], stats['seconds'], stats['rows_per_sec'], stats['skipped'])
+    return stats
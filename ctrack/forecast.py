@@ -0,0 +1,116 @@
+"""Expected-spend forecasting for progress rows.
+
+``SpendForecaster.load`` fetches daily spend per category over the last few
+months with one query and holds it as a ``categories x days`` matrix. From
+that it derives, for every category at once, the mean spend on each day of
+the week and on each day of the month; ``expected`` blends the two profiles
+over the days being forecast, so a weekly shop or a rent payment on the 1st
+lands on the days it usually happens rather than being spread evenly.
+"""
+from decimal import Decimal
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+from ctrack.models import Transaction
+
+
+# Months of history the profiles are estimated from.
+HISTORY_MONTHS = 3
+
+# Share of the day-of-week profile in the blend; the rest is day-of-month.
+WEEKDAY_WEIGHT = 0.5
+
+
+def weekdays(days):
+    """Monday=0 weekday numbers for a ``datetime64[D]`` array."""
+    # 1970-01-01 was a Thursday.
+    return (days.astype(np.int64) + 3) % 7
+
+
+def week_ends(days, weekday=6):
+    """Last day of the week containing each of the ``datetime64[D]`` ``days``.
+
+    Weeks end on ``weekday`` (Monday=0), so the default gives Monday to
+    Sunday weeks.
+    """
+    return days + (weekday - weekdays(days)) % 7
+
+
+def days_of_month(days):
+    """Zero-based day of the month for a ``datetime64[D]`` array."""
+    return (days - days.astype("datetime64[M]")).astype(np.int64)
+
+
+class SpendForecaster:
+    """Day-of-week and day-of-month spend profiles for all categories."""
+
+    def __init__(self, start, categories, matrix):
+        # First day of the history; column ``i`` of ``matrix`` is start + i.
+        self.start = start
+        # Category pks, one per row of ``matrix``.
+        self.categories = list(categories)
+        # Daily spend in cents, shape (len(categories), days).
+        self.matrix = matrix
+
+        days = np.datetime64(start, "D") + np.arange(matrix.shape[1])
+        self.by_weekday = self._profile(weekdays(days), 7)
+        self.by_day_of_month = self._profile(days_of_month(days), 31)
+
+    @classmethod
+    def load(cls, today, months=HISTORY_MONTHS):
+        """Load the ``months`` of history up to and including yesterday."""
+        start = today - relativedelta(months=months)
+        rows = list(
+            Transaction.objects.filter(
+                when__gte=start, when__lt=today,
+                is_split=False, category__isnull=False,
+            )
+            .annotate(day=TruncDate("when"))
+            .values("category", "day")
+            .annotate(total=Sum("amount"))
+            .values_list("category", "day", "total")
+            .order_by()
+        )
+        categories = sorted({cat_pk for cat_pk, _, _ in rows})
+        matrix = np.zeros((len(categories), (today - start).days))
+        if rows:
+            cat_pks, days, totals = zip(*rows)
+            row_index = np.searchsorted(categories, cat_pks)
+            col_index = (np.array(days, dtype="datetime64[D]") - np.datetime64(start, "D")).astype(np.int64)
+            cents = np.array([int(total * 100) for total in totals], dtype=np.float64)
+            np.add.at(matrix, (row_index, col_index), cents)
+        return cls(start, categories, matrix)
+
+    def _profile(self, keys, size):
+        """Mean daily spend per category for each value of ``keys``.
+
+        Returns a ``(categories, size)`` array. Values that never occur in the
+        history fall back to the category's overall daily mean.
+        """
+        counts = np.bincount(keys, minlength=size)
+        indicator = np.zeros((len(keys), size))
+        indicator[np.arange(len(keys)), keys] = 1
+        sums = self.matrix @ indicator
+        overall = self.matrix.mean(axis=1) if self.matrix.shape[1] else np.zeros(len(self.categories))
+        fallback = np.repeat(overall[:, np.newaxis], size, axis=1)
+        return np.divide(sums, counts, out=fallback, where=counts > 0)
+
+    def expected(self, from_date, to_date):
+        """Return ``{category_pk: Decimal}`` expected spend over the days.
+
+        Only categories with spend in the history are included; an empty
+        range gives an empty dict.
+        """
+        if from_date > to_date or not self.categories:
+            return {}
+        days = np.arange(np.datetime64(from_date, "D"), np.datetime64(to_date, "D") + 1)
+        by_weekday = self.by_weekday @ np.bincount(weekdays(days), minlength=7)
+        by_day_of_month = self.by_day_of_month @ np.bincount(days_of_month(days), minlength=31)
+        cents = WEEKDAY_WEIGHT * by_weekday + (1 - WEEKDAY_WEIGHT) * by_day_of_month
+        return {
+            cat_pk: Decimal(int(round(value))) / 100
+            for cat_pk, value in zip(self.categories, cents)
+        }
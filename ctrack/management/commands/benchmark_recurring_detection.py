@@ -0,0 +1,59 @@
+"""Benchmark recurring detection on synthetic histories of increasing size."""
+import json
+
+from django.core.management.base import BaseCommand
+
+from ctrack.recurring_benchmark import DEFAULT_SIZES, benchmark
+
+
+class Command(BaseCommand):
+    help = ("Run recurring transaction detection on synthetic histories and report run time, "
+            "peak memory and precision/recall against the planted series.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('sizes', nargs='*', type=int, default=list(DEFAULT_SIZES),
+                            help="Transactions in each generated history.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the histories.")
+        parser.add_argument('--repeat', type=int, default=1, help="Timed runs per size; the best is kept.")
+        parser.add_argument('--no-memory', action='store_true',
+                            help="Skip the traced run that measures peak memory.")
+        parser.add_argument('--json', action='store_true', help="Write one JSON object per size.")
+        parser.add_argument('--min-cluster-size', type=int, default=3)
+        parser.add_argument('--cosine-distance-threshold', type=float, default=0.4)
+        parser.add_argument('--interval-cv-threshold', type=float, default=0.35)
+        parser.add_argument('--amount-tolerance', type=float, default=0.10)
+        parser.add_argument('--lsh-bands', type=int, default=None)
+        parser.add_argument('--lsh-rows', type=int, default=4)
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Analysis processes; above one, the speed-up over serial is reported.")
+
+    def handle(self, *args, **options):
+        def report(result):
+            if options['json']:
+                self.stdout.write(json.dumps(result))
+                return
+            self.stdout.write(
+                "{transactions:>8} {series:>6} {groups:>6} {text_seconds:>8.2f} {analysis_seconds:>9.2f} "
+                "{seconds:>8.2f} {speedup:>8} {peak:>8} {precision:>9.3f} {recall:>6.3f}".format(
+                    peak="-" if result['peak_mib'] is None else "{:.1f}".format(result['peak_mib']),
+                    speedup=("-" if result['speedup'] is None
+                             else "{:.2f}x".format(result['speedup'])),
+                    **{key: value for key, value in result.items() if key != 'speedup'}
+                )
+            )
+
+        if not options['json']:
+            self.stdout.write("{:>8} {:>6} {:>6} {:>8} {:>9} {:>8} {:>8} {:>8} {:>9} {:>6}".format(
+                "txns", "series", "groups", "text s", "analyse s", "total s", "speedup", "peak MiB",
+                "precision", "recall"
+            ))
+        benchmark(
+            options['sizes'], seed=options['seed'], repeat=options['repeat'],
+            measure_memory=not options['no_memory'], progress=report,
+            min_cluster_size=options['min_cluster_size'],
+            cosine_distance_threshold=options['cosine_distance_threshold'],
+            interval_cv_threshold=options['interval_cv_threshold'],
+            amount_tolerance=options['amount_tolerance'],
+            lsh_bands=options['lsh_bands'], lsh_rows=options['lsh_rows'],
+            workers=options['workers'],
+        )
@@ -0,0 +1,29 @@
+"""Bulk import a legacy CSV dump of transactions."""
+from django.core.management.base import BaseCommand
+
+from ctrack.csv_import import DEFAULT_CHUNK_SIZE, load_csv
+
+
+class Command(BaseCommand):
+    help = "Import transactions from a CSV dump (date, description, category, amount, accountname)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('data_file', help="Path to the CSV file to load.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Rows read and written per batch.")
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+
+        def report(stats):
+            if verbosity > 1:
+                self.stdout.write("  {rows} rows ({rows_per_sec:.0f} rows/sec)".format(**stats))
+
+        stats = load_csv(options['data_file'], chunk_size=options['chunk_size'], progress=report)
+        self.stdout.write(self.style.SUCCESS(
+            "Loaded {rows} transactions in {seconds:.2f}s ({rows_per_sec:.0f} rows/sec)".format(**stats)
+        ))
+        if stats['skipped']:
+            self.stdout.write(self.style.WARNING(
+                "Skipped {skipped} rows with a blank or invalid amount".format(**stats)
+            ))
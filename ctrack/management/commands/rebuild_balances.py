@@ -0,0 +1,20 @@
+"""Recompute the materialised daily balance rows."""
+from django.core.management.base import BaseCommand
+
+from ctrack.models import Account, DailyBalance
+
+
+class Command(BaseCommand):
+    help = "Rebuild the stored daily balance series for all (or the given) accounts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('account_ids', nargs='*', type=int,
+                            help="Only rebuild these accounts.")
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.order_by('pk')
+        if options['account_ids']:
+            accounts = accounts.filter(pk__in=options['account_ids'])
+        for account_id in accounts.values_list('pk', flat=True):
+            DailyBalance.rebuild(account_id)
+        self.stdout.write(self.style.SUCCESS("Rebuilt daily balances for {} accounts".format(accounts.count())))
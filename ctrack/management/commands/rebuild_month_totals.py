@@ -0,0 +1,14 @@
+"""Recompute the monthly category rollup rows."""
+from django.core.management.base import BaseCommand
+
+from ctrack.models import CategoryMonthTotal
+
+
+class Command(BaseCommand):
+    help = "Rebuild the stored monthly category totals from the transactions."
+
+    def handle(self, *args, **options):
+        CategoryMonthTotal.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            "Rebuilt {} monthly category totals".format(CategoryMonthTotal.objects.count())
+        ))
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.14 on 2026-10-19 02:58
+
+from datetime import datetime, time
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+import numpy as np
+import pandas as pd
+import pytz
+
+
+# Copies of ctrack.models.daily_closing and fill_daily as they were when
+# this migration was written, so later changes there do not alter it.
+def daily_closing(rows, init_cents=0):
+    rows = list(rows)
+    if not rows:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int64)
+    whens, amounts = zip(*rows)
+    days = pd.DatetimeIndex(whens).tz_convert(None).values.astype('datetime64[D]')
+    cents = np.rint(np.array(amounts, dtype=np.float64) * 100).astype(np.int64)
+    day_starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    return days[day_starts], np.cumsum(np.add.reduceat(cents, day_starts)) + init_cents
+
+
+def fill_daily(txn_days, closing, init_cents, all_days):
+    levels = np.r_[init_cents, closing]
+    return levels[np.searchsorted(txn_days, all_days, side='right')]
+
+
+def populate_daily_balances(apps, schema_editor):
+    Account = apps.get_model('ctrack', 'Account')
+    BalancePoint = apps.get_model('ctrack', 'BalancePoint')
+    DailyBalance = apps.get_model('ctrack', 'DailyBalance')
+    Transaction = apps.get_model('ctrack', 'Transaction')
+
+    for account_id in Account.objects.values_list('pk', flat=True):
+        point = BalancePoint.objects.filter(account_id=account_id).order_by('-ref_date').first()
+        if point is not None:
+            init_cents = int(round(point.balance * 100))
+            start = pytz.utc.localize(datetime.combine(point.ref_date, time(0, 0)))
+        else:
+            init_cents = 0
+            start = pytz.utc.localize(datetime(1990, 1, 1))
+        txn_days, closing = daily_closing(
+            Transaction.objects.filter(account_id=account_id, when__gt=start, is_split=False)
+            .order_by('when').values_list('when', 'amount'),
+            init_cents,
+        )
+        if not len(txn_days):
+            continue
+        all_days = np.arange(txn_days[0], txn_days[-1] + 1)
+        balance = fill_daily(txn_days, closing, init_cents, all_days)
+        DailyBalance.objects.bulk_create([
+            DailyBalance(account_id=account_id, day=day, balance=Decimal(int(cents)) / 100)
+            for day, cents in zip(all_days.tolist(), balance)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctrack', '0020_alter_categorisormodel_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to='ctrack.account')),
+            ],
+            options={
+                'ordering': ['account', 'day'],
+                'constraints': [models.UniqueConstraint(fields=('account', 'day'), name='ctrack_dailybalance_account_day')],
+            },
+        ),
+        migrations.RunPython(populate_daily_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.14 on 2026-10-19 03:06
+
+from django.db import migrations, models
+
+
+def create_data_version(apps, schema_editor):
+    DataVersion = apps.get_model('ctrack', 'DataVersion')
+    DataVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctrack', '0021_dailybalance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_data_version, migrations.RunPython.noop),
+    ]
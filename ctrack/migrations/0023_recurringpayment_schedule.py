@@ -0,0 +1,66 @@
+# Generated by Django 5.2.14 on 2026-10-19 03:19
+
+from datetime import datetime, time, timedelta
+
+from django.db import migrations, models
+import numpy as np
+
+
+# Copy of ctrack.models.payment_schedule as it was when this migration was
+# written, so later changes there do not alter it.
+def payment_schedule(bills):
+    schedule = {'last_due_date': None, 'last_amount': None,
+                'mean_interval': None, 'next_due_date': None}
+    if not bills:
+        return schedule
+    schedule['last_due_date'], schedule['last_amount'] = bills[-1]
+    if len(bills) < 2:
+        return schedule
+    dates = np.array([due for due, _ in bills], dtype='datetime64[D]')
+    mean_days = float(np.mean(np.diff(dates).astype(np.int64)))
+    schedule['mean_interval'] = mean_days
+    schedule['next_due_date'] = (
+        datetime.combine(schedule['last_due_date'], time(0, 0)) + timedelta(days=mean_days)
+    ).date()
+    return schedule
+
+
+def populate_schedules(apps, schema_editor):
+    Bill = apps.get_model('ctrack', 'Bill')
+    RecurringPayment = apps.get_model('ctrack', 'RecurringPayment')
+
+    for payment_id in RecurringPayment.objects.values_list('pk', flat=True):
+        bills = list(Bill.objects.filter(series_id=payment_id)
+                     .order_by('due_date').values_list('due_date', 'due_amount'))
+        RecurringPayment.objects.filter(pk=payment_id).update(**payment_schedule(bills))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctrack', '0022_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recurringpayment',
+            name='last_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='recurringpayment',
+            name='last_due_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recurringpayment',
+            name='mean_interval',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recurringpayment',
+            name='next_due_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_schedules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.14 on 2026-10-19 03:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def populate_month_totals(apps, schema_editor):
+    CategoryMonthTotal = apps.get_model('ctrack', 'CategoryMonthTotal')
+    Transaction = apps.get_model('ctrack', 'Transaction')
+
+    rows = (
+        Transaction.objects
+        .annotate(month=TruncMonth('when', output_field=models.DateField()))
+        .values('account', 'category', 'month', 'is_split')
+        .annotate(total=models.Sum('amount'), count=models.Count('pk'))
+        .order_by()
+    )
+    CategoryMonthTotal.objects.bulk_create([
+        CategoryMonthTotal(account_id=row['account'], category_id=row['category'], month=row['month'],
+                           is_split=row['is_split'], total=row['total'], count=row['count'])
+        for row in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctrack', '0023_recurringpayment_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryMonthTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('is_split', models.BooleanField(default=False)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('count', models.PositiveIntegerField()),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='month_totals', to='ctrack.account')),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='month_totals', to='ctrack.category')),
+            ],
+            options={
+                'ordering': ['account', 'month'],
+                'indexes': [models.Index(fields=['month', 'category'], name='ctrack_cate_month_861c26_idx')],
+            },
+        ),
+        migrations.RunPython(populate_month_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.14 on 2026-10-19 04:09
+
+from django.db import migrations, models
+
+
+def populate_paid_amounts(apps, schema_editor):
+    Bill = apps.get_model('ctrack', 'Bill')
+
+    paid = (
+        Bill.paying_transactions.through.objects
+        .filter(bill=models.OuterRef('pk'))
+        .values('bill')
+        .annotate(total=models.Sum('transaction__amount'))
+        .values('total')
+    )
+    Bill.objects.update(paid_amount=-models.Subquery(paid))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctrack', '0024_categorymonthtotal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='paid_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunPython(populate_paid_amounts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.14 on 2026-10-19 05:01
+
+from django.db import migrations, models
+
+
+def populate_is_paid(apps, schema_editor):
+    Bill = apps.get_model('ctrack', 'Bill')
+    Bill.objects.filter(paid_amount=models.F('due_amount')).update(is_paid=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctrack', '0025_bill_paid_amount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='is_paid',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.RunPython(populate_is_paid, migrations.RunPython.noop),
+    ]
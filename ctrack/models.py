@@ -1,15 +1,79 @@
+from collections import Counter
 from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 import importlib
+import threading
 
 from dateutil.relativedelta import relativedelta
-from django.db import models
+from django.db import models, transaction as db_transaction
+from django.db.models.functions import TruncMonth
+from django.db.models.lookups import Exact
 from django.contrib.auth.models import User
 import numpy as np
 import pandas as pd
 import pytz
 
 from ctrack import categories
-from ctrack.transaction_import import TransactionFileFormat, TransactionImporter
+from ctrack.transaction_import import ImportStats, TransactionFileFormat, TransactionImporter
+
+# Transaction fields that move a row between ``CategoryMonthTotal`` groups.
+ROLLUP_FIELDS = {'when', 'amount', 'is_split', 'account', 'account_id', 'category', 'category_id'}
+
+# Transaction fields whose change moves an account's balance.
+BALANCE_FIELDS = ('when', 'amount', 'is_split', 'account')
+BALANCE_ATTNAMES = ('when', 'amount', 'is_split', 'account_id')
+
+
+class VersionedQuerySet(models.QuerySet):
+    """Bumps ``DataVersion`` on bulk writes.
+
+    ``bulk_create`` and ``bulk_update`` skip ``post_save``, which is where
+    single saves of versioned models bump it (see ``ctrack.signals``).
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(list(objs), *args, **kwargs)
+        if created:
+            DataVersion.bump()
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        if objs:
+            DataVersion.bump()
+        return updated
+
+
+class TransactionQuerySet(VersionedQuerySet):
+    """Keeps ``CategoryMonthTotal``, ``DailyBalance`` and ``Bill.paid_amount``
+    current across bulk writes.
+
+    ``bulk_create`` and ``bulk_update`` skip ``post_save``, so the months and
+    days they touch are refreshed here instead.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        CategoryMonthTotal.refresh_months(CategoryMonthTotal.months_for(created))
+        for account_id, day in DailyBalance.days_for(created).items():
+            DailyBalance.mark_dirty(account_id, day)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        if ROLLUP_FIELDS & set(fields):
+            CategoryMonthTotal.refresh_months(CategoryMonthTotal.months_for(objs))
+        if set(BALANCE_FIELDS + BALANCE_ATTNAMES) & set(fields):
+            for account_id, day in DailyBalance.days_for(objs).items():
+                DailyBalance.mark_dirty(account_id, day)
+        if 'amount' in fields:
+            Bill.refresh_paid_amounts(
+                Bill.objects.filter(paying_transactions__in=[obj.pk for obj in objs]).values('pk')
+            )
+        return updated
+
 
 class Transaction(models.Model):
     """A single one-way transaction."""
@@ -20,6 +84,24 @@ class Transaction(models.Model):
     category = models.ForeignKey("Category", on_delete=models.CASCADE, null=True)
     description = models.CharField(max_length=500, null=True)
 
+    objects = TransactionQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Keep the stored values so signal handlers can see what a save
+        # changed (e.g. the day a transaction was moved from).
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save handlers have run; what is saved now is the new baseline.
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
+
     def __str__(self):
         return "Transaction on {} of ${:.2f} at {}".format(
             self.account,
@@ -105,8 +187,23 @@ class Account(models.Model):
     def __str__(self):
         return self.name
 
-    def load_transactions(self, fname, from_date=None, to_date=None, from_exist_latest=True):
-        """Load an OFX file into the DB."""
+    def load_transactions(self, fname, from_date=None, to_date=None, from_exist_latest=True,
+                          clf=None, stats=None):
+        """Load an OFX/QIF file into the DB.
+
+        Transactions already stored for this account (matched on date, amount
+        and description) are skipped. When ``clf`` is given, each new
+        transaction is assigned a category before insertion if the classifier
+        makes exactly one suggestion. New transactions continuing an existing
+        recurring payment series are attached to it as bills (see
+        ``ctrack.recurring_matching``). Per-stage timings are recorded on
+        ``stats`` (an ``ImportStats``) when supplied.
+
+        Returns the list of created transactions.
+        """
+        if stats is None:
+            stats = ImportStats()
+
         if from_exist_latest:
             try:
                 latest_trans = self.transactions.latest('when')
@@ -114,54 +211,334 @@ class Account(models.Model):
             except Transaction.DoesNotExist:
                 from_date = None
 
-        loaded_transactions = TransactionImporter().load_from_file(
+        loaded_transactions = TransactionImporter(stats=stats).load_from_file(
             fname,
             from_date=from_date,
             to_date=to_date
         )
 
-        for trans in loaded_transactions:
-            trans = Transaction.objects.create(
+        with stats.stage('dedupe') as stage:
+            stage['rows_in'] = len(loaded_transactions)
+            loaded_transactions = self._drop_existing(loaded_transactions)
+            stage['rows_out'] = len(loaded_transactions)
+
+        new_transactions = [
+            Transaction(
                 when=trans.when,
                 account=self,
                 description=trans.description,
                 amount=trans.amount,
             )
-            yield trans
+            for trans in loaded_transactions
+        ]
 
+        if clf is not None:
+            with stats.stage('predict') as stage:
+                category_map = dict(Category.objects.values_list('name', 'id'))
+                for trans in new_transactions:
+                    cats = trans.suggest_category(clf, category_map=category_map)
+                    if len(cats) == 1:
+                        trans.category_id = cats[0]['id']
+                stage['rows_out'] = len(new_transactions)
+
+        with stats.stage('insert') as stage:
+            created = Transaction.objects.bulk_create(new_transactions)
+            stage['rows_out'] = len(created)
+
+        with stats.stage('match_recurring') as stage:
+            from ctrack.recurring_matching import match_transactions
+            stage['rows_in'] = len(created)
+            stage['rows_out'] = len(match_transactions(created))
+        return created
+
+    def _drop_existing(self, loaded_transactions):
+        """Remove loaded transactions that are already stored for this account.
+
+        Matching is on (date, amount, description) and respects multiplicity,
+        so two identical purchases on the same day are only skipped if both
+        are already present.
+        """
+        if not loaded_transactions:
+            return loaded_transactions
+
+        dates = [utc_day(trans.when) for trans in loaded_transactions]
+        existing = Counter(
+            (when.date(), amount, description)
+            for when, amount, description in self.transactions.filter(
+                when__date__gte=min(dates), when__date__lte=max(dates),
+            ).values_list('when', 'amount', 'description')
+        )
+        if not existing:
+            return loaded_transactions
 
-    def daily_balance(self):
-        """Get series of daily balance."""
+        result = []
+        for tdate, trans in zip(dates, loaded_transactions):
+            key = (tdate, trans.amount, trans.description)
+            if existing[key] > 0:
+                existing[key] -= 1
+                continue
+            result.append(trans)
+        return result
+
+    def _balance_start(self):
+        """Return ``(opening_cents, start)`` from the latest ``BalancePoint``.
+
+        Only transactions strictly after ``start`` count towards the balance.
+        """
         try:
             balance_point = self.balance_points.latest()
-            init_balance = float(balance_point.balance)
+            init_cents = int(round(balance_point.balance * 100))
             start = pytz.utc.localize(datetime.combine(balance_point.ref_date, time(0, 0)))
         except BalancePoint.DoesNotExist:
-            init_balance = 0.0
+            init_cents = 0
             start = pytz.utc.localize(datetime(1990, 1, 1))
-        transactions = (
-            self.transactions
-            .filter(when__gt=start, is_split=False)
-            .order_by('when')
+        return init_cents, start
+
+    def daily_balance(self, from_date=None, to_date=None):
+        """Get series of end-of-day balance.
+
+        The series starts from the latest ``BalancePoint`` (or 1990) and, by
+        default, runs from the first to the last transaction day. ``from_date``
+        and ``to_date`` restrict the returned range and are pushed into the
+        query: transactions before ``from_date`` are reduced to an opening
+        balance with a single aggregate and those after ``to_date`` are never
+        fetched.
+
+        This always reads the raw transactions; ``balance_history`` reads the
+        materialised ``DailyBalance`` rows instead.
+        """
+        init_cents, start = self._balance_start()
+
+        transactions = self.transactions.filter(when__gt=start, is_split=False)
+        if from_date is not None:
+            from_date = max(from_date, start.date())
+            from_dt = pytz.utc.localize(datetime.combine(from_date, time(0, 0)))
+            opening = transactions.filter(when__lt=from_dt).aggregate(
+                total=models.Sum('amount'))['total']
+            if opening is not None:
+                init_cents += int(round(opening * 100))
+            transactions = transactions.filter(when__gte=from_dt)
+        if to_date is not None:
+            to_dt = pytz.utc.localize(datetime.combine(to_date + timedelta(days=1), time(0, 0)))
+            transactions = transactions.filter(when__lt=to_dt)
+
+        txn_days, closing = daily_closing(
+            transactions.order_by('when').values_list('when', 'amount'), init_cents
         )
-        if len(transactions) <= 0:
+
+        # Without from_date the range starts at the first transaction day,
+        # so there is nothing to return if none falls on or before to_date.
+        if from_date is None and not len(txn_days):
+            return pd.Series(dtype='float64')
+        first = np.datetime64(from_date, 'D') if from_date is not None else txn_days[0]
+        if to_date is not None:
+            last = np.datetime64(to_date, 'D')
+        else:
+            last = txn_days[-1] if len(txn_days) else first
+        if last < first:
+            return pd.Series(dtype='float64')
+
+        all_days = np.arange(first, last + 1)
+        balance = fill_daily(txn_days, closing, init_cents, all_days)
+        return _balance_series(all_days, balance)
+
+    def balance_history(self, from_date=None, to_date=None):
+        """Get series of end-of-day balance from the materialised rows.
+
+        Same shape as ``daily_balance`` without bounds, but read from
+        ``DailyBalance`` so no transactions are touched.
+        """
+        rows = self.daily_balances.order_by('day')
+        if from_date is not None:
+            rows = rows.filter(day__gte=from_date)
+        if to_date is not None:
+            rows = rows.filter(day__lte=to_date)
+        rows = list(rows.values_list('day', 'balance'))
+        if not rows:
             return pd.Series(dtype='float64')
-        series = pd.DataFrame({obj.id: {
-            'when': obj.when,
-            'amount': float(obj.amount)
-        } for obj in transactions}).T
-        series = series.groupby('when').sum()['amount']
-        series = series.cumsum() + init_balance
-        series = series.resample('D').ffill()
-        return series
+        days, balances = zip(*rows)
+        return _balance_series(
+            np.array(days, dtype='datetime64[D]'),
+            np.rint(np.array(balances, dtype=np.float64) * 100).astype(np.int64),
+        )
 
     @property
     def balance(self) -> float | None:
-        """Get the latest balance for the account."""
-        try:
-            return self.daily_balance().iloc[-1]
-        except IndexError:
-            return None
+        """Get the latest balance for the account.
+
+        Uses the ``latest_balance`` annotation when the queryset provides it
+        (see ``AccountViewSet``), otherwise the newest ``DailyBalance`` row.
+        """
+        if hasattr(self, 'latest_balance'):
+            value = self.latest_balance
+        else:
+            value = self.daily_balances.order_by('-day').values_list('balance', flat=True).first()
+        return float(value) if value is not None else None
+
+
+def utc_day(when):
+    """Return the UTC calendar day of a ``when`` value (datetime or date)."""
+    if isinstance(when, datetime):
+        if when.tzinfo is not None:
+            when = when.astimezone(pytz.utc)
+        return when.date()
+    return when
+
+
+def utc_day_start(day):
+    """Return midnight UTC at the start of ``day``."""
+    return pytz.utc.localize(datetime.combine(day, time(0, 0)))
+
+
+def month_span(from_date, to_date):
+    """Return ``(first_month, last_month)`` if the range is whole months.
+
+    The range must start on the first of a month and end on the last day of
+    a month; otherwise None is returned.
+    """
+    if from_date.day != 1 or from_date > to_date:
+        return None
+    if (to_date + timedelta(days=1)).day != 1:
+        return None
+    return from_date, to_date.replace(day=1)
+
+
+def daily_closing(rows, init_cents=0):
+    """Reduce time-ordered ``(when, amount)`` rows to per-day closing balances.
+
+    Returns ``(days, closing)``: a ``datetime64[D]`` array of the (UTC) days
+    that have transactions and an int64 array of the closing balance in cents
+    on each of those days.
+    """
+    rows = list(rows)
+    if not rows:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int64)
+    whens, amounts = zip(*rows)
+    days = pd.DatetimeIndex(whens).tz_convert(None).values.astype('datetime64[D]')
+    cents = np.rint(np.array(amounts, dtype=np.float64) * 100).astype(np.int64)
+    # Rows are sorted, so each day is a contiguous run.
+    day_starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    return days[day_starts], np.cumsum(np.add.reduceat(cents, day_starts)) + init_cents
+
+
+def fill_daily(txn_days, closing, init_cents, all_days):
+    """Expand per-transaction-day closing balances onto every day in ``all_days``.
+
+    The closing balance of the latest transaction day is carried forward;
+    days before any transaction take ``init_cents``.
+    """
+    levels = np.r_[init_cents, closing]
+    return levels[np.searchsorted(txn_days, all_days, side='right')]
+
+
+def _balance_series(days, cents):
+    index = pd.DatetimeIndex(days, freq='D' if len(days) > 1 else None).tz_localize('UTC')
+    return pd.Series(cents / 100.0, index=index)
+
+
+class DailyBalance(models.Model):
+    """Materialised end-of-day balance of an account.
+
+    Rows cover every day from the first to the last transaction day after the
+    latest ``BalancePoint``. Writes to transactions or balance points drop the
+    rows from the earliest affected day (see ``ctrack.signals``) and
+    ``refresh`` then recomputes only that tail.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="daily_balances")
+    day = models.DateField()
+    balance = models.DecimalField(decimal_places=2, max_digits=12)
+
+    class Meta:
+        ordering = ["account", "day"]
+        constraints = [
+            models.UniqueConstraint(fields=["account", "day"], name="ctrack_dailybalance_account_day"),
+        ]
+
+    def __str__(self):
+        return "{} == ${:.02f} on {}".format(self.account_id, self.balance, self.day)
+
+    @classmethod
+    def invalidate(cls, account_id, from_day=None):
+        """Drop stored rows from ``from_day`` (or all rows) for the account."""
+        rows = cls.objects.filter(account_id=account_id)
+        if from_day is not None:
+            rows = rows.filter(day__gte=from_day)
+        rows.delete()
+
+    @staticmethod
+    def days_for(transactions):
+        """Return ``{account_id: earliest day}`` whose balance saving ``transactions`` moved.
+
+        Includes the account and day each transaction was loaded with, so a
+        transaction moved between days or accounts invalidates both.
+        """
+        days = {}
+        for trans in transactions:
+            rows = [(trans.account_id, trans.when)]
+            loaded = getattr(trans, '_loaded_values', None)
+            if loaded and 'when' in loaded and 'account_id' in loaded:
+                rows.append((loaded['account_id'], loaded['when']))
+            for account_id, when in rows:
+                day = utc_day(when)
+                days[account_id] = min(days.get(account_id, day), day)
+        return days
+
+    @classmethod
+    def mark_dirty(cls, account_id, from_day=None):
+        """Invalidate from ``from_day`` and refresh once the transaction commits."""
+        cls.invalidate(account_id, from_day)
+        db_transaction.on_commit(lambda: cls.refresh(account_id))
+
+    @classmethod
+    def refresh(cls, account_id):
+        """Extend the stored rows to the account's last transaction day.
+
+        Resumes from the newest stored row, so only days after it (i.e. those
+        dropped by ``invalidate`` or never computed) touch the transactions.
+        """
+        account = Account.objects.filter(pk=account_id).first()
+        if account is None:
+            return
+        init_cents, start = account._balance_start()
+        transactions = account.transactions.filter(when__gt=start, is_split=False)
+
+        # Forward-filled rows past the last transaction day outlive a delete
+        # of that transaction; trim them so the series ends where it should.
+        last_when = transactions.aggregate(last=models.Max('when'))['last']
+        stale = cls.objects.filter(account_id=account_id)
+        if last_when is not None:
+            stale = stale.filter(day__gt=utc_day(last_when))
+        stale.delete()
+        if last_when is None:
+            return
+
+        last = cls.objects.filter(account_id=account_id).order_by('-day').first()
+        first_day = None
+        if last is not None:
+            init_cents = int(round(last.balance * 100))
+            first_day = last.day + timedelta(days=1)
+            transactions = transactions.filter(
+                when__gte=pytz.utc.localize(datetime.combine(first_day, time(0, 0)))
+            )
+
+        txn_days, closing = daily_closing(
+            transactions.order_by('when').values_list('when', 'amount'), init_cents
+        )
+        if not len(txn_days):
+            return
+        first = np.datetime64(first_day, 'D') if first_day is not None else txn_days[0]
+        all_days = np.arange(first, txn_days[-1] + 1)
+        balance = fill_daily(txn_days, closing, init_cents, all_days)
+        cls.objects.bulk_create([
+            cls(account_id=account_id, day=day, balance=Decimal(int(cents)) / 100)
+            for day, cents in zip(all_days.tolist(), balance)
+        ], ignore_conflicts=True)
+
+    @classmethod
+    def rebuild(cls, account_id):
+        """Recompute every stored row for the account."""
+        cls.invalidate(account_id)
+        cls.refresh(account_id)
 
 
 class Category(models.Model):
@@ -204,6 +581,175 @@ class CategoryGroup(models.Model):
         verbose_name_plural = "category groups"
 
 
+class CategoryMonthTotal(models.Model):
+    """Monthly transaction totals per (category, account).
+
+    ``is_split`` is part of the key so that both split parents and the
+    transactions that replace them can be answered from the table, matching
+    whichever the raw query would have included. Months are UTC calendar
+    months and ``month`` is their first day.
+
+    Rows are recomputed per (account, month) whenever transactions change:
+    by ``ctrack.signals`` for saves and deletes and by
+    ``TransactionQuerySet`` for bulk writes. ``totals`` answers summaries
+    over whole months from here.
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True,
+                                 related_name="month_totals")
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="month_totals")
+    month = models.DateField()
+    is_split = models.BooleanField(default=False)
+    total = models.DecimalField(decimal_places=2, max_digits=14)
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["account", "month"]
+        indexes = [models.Index(fields=["month", "category"])]
+
+    def __str__(self):
+        return "{} in {:%Y-%m}: ${:.02f} over {} transactions".format(
+            self.category_id, self.month, self.total, self.count,
+        )
+
+    @staticmethod
+    def months_for(transactions):
+        """Return ``{account_id: {month, ...}}`` touched by saving ``transactions``.
+
+        Includes the account and month each transaction was loaded with, so a
+        transaction moved between months or accounts refreshes both.
+        """
+        months = {}
+        for trans in transactions:
+            rows = [(trans.account_id, trans.when)]
+            loaded = getattr(trans, '_loaded_values', None)
+            if loaded and 'when' in loaded and 'account_id' in loaded:
+                rows.append((loaded['account_id'], loaded['when']))
+            for account_id, when in rows:
+                months.setdefault(account_id, set()).add(utc_day(when).replace(day=1))
+        return months
+
+    @classmethod
+    def refresh(cls, account_id, first_month, last_month=None):
+        """Recompute the account's rows from ``first_month`` to ``last_month``."""
+        last_month = last_month or first_month
+        rows = (
+            Transaction.objects.filter(
+                account_id=account_id,
+                when__gte=utc_day_start(first_month),
+                when__lt=utc_day_start(last_month + relativedelta(months=1)),
+            )
+            .annotate(month=TruncMonth('when', output_field=models.DateField()))
+            .values('category', 'month', 'is_split')
+            .annotate(total=models.Sum('amount'), count=models.Count('pk'))
+            .order_by()
+        )
+        with db_transaction.atomic():
+            cls.objects.filter(
+                account_id=account_id, month__gte=first_month, month__lte=last_month,
+            ).delete()
+            cls.objects.bulk_create([
+                cls(account_id=account_id, category_id=row['category'], month=row['month'],
+                    is_split=row['is_split'], total=row['total'], count=row['count'])
+                for row in rows
+            ])
+
+    @classmethod
+    def refresh_months(cls, months):
+        """Refresh ``{account_id: {month, ...}}`` as returned by ``months_for``."""
+        for account_id, account_months in months.items():
+            cls.refresh(account_id, min(account_months), max(account_months))
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every row from the transactions."""
+        rows = (
+            Transaction.objects
+            .annotate(month=TruncMonth('when', output_field=models.DateField()))
+            .values('account', 'category', 'month', 'is_split')
+            .annotate(total=models.Sum('amount'), count=models.Count('pk'))
+            .order_by()
+        )
+        with db_transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create([
+                cls(account_id=row['account'], category_id=row['category'], month=row['month'],
+                    is_split=row['is_split'], total=row['total'], count=row['count'])
+                for row in rows.iterator()
+            ], batch_size=1000)
+
+    @classmethod
+    def totals(cls, windows, fields, **filters):
+        """Grouped transaction totals for each ``(from_date, to_date)`` window.
+
+        Returns one ``{(field value, ...): total}`` dict per window, matching
+        ``Transaction.objects.filter(when__gte=from_date, when__lte=to_date,
+        **filters).values(*fields).annotate(total=Sum('amount'))``. ``fields``
+        and ``filters`` must name fields both models share, such as
+        ``category``, ``account`` and ``is_split``.
+
+        Windows of whole months (see ``month_span``) are read from this table
+        with one conditional aggregation; any others come from one over the
+        transactions. ``when__lte=to_date`` stops at midnight on ``to_date``
+        while a rolled-up month runs to its end, so transactions later on that
+        day are taken back off using the same transactions query.
+        """
+        fields = list(fields)
+        windows = list(windows)
+        spans = {i: month_span(*window) for i, window in enumerate(windows)}
+        spans = {i: span for i, span in spans.items() if span is not None}
+
+        def key(row):
+            return tuple(row[field] for field in fields)
+
+        groups = [{} for _ in windows]
+        if spans:
+            aggregates = {}
+            for i, (first, last) in spans.items():
+                in_window = models.Q(month__gte=first, month__lte=last)
+                aggregates['total_%d' % i] = models.Sum('total', filter=in_window)
+                aggregates['count_%d' % i] = models.Sum('count', filter=in_window)
+            for row in (cls.objects.filter(
+                            month__gte=min(first for first, _ in spans.values()),
+                            month__lte=max(last for _, last in spans.values()),
+                            **filters)
+                        .values(*fields).annotate(**aggregates).order_by()):
+                for i in spans:
+                    if row['count_%d' % i]:
+                        groups[i][key(row)] = [row['total_%d' % i], row['count_%d' % i]]
+
+        aggregates = {}
+        # Only the days each window needs, so rolled-up windows read no more
+        # than their last day rather than everything between the windows.
+        needed = models.Q()
+        for i, (from_date, to_date) in enumerate(windows):
+            if i in spans:
+                start, end = utc_day_start(to_date), utc_day_start(to_date + timedelta(days=1))
+                late = models.Q(when__gt=start, when__lt=end)
+                aggregates['late_total_%d' % i] = models.Sum('amount', filter=late)
+                aggregates['late_count_%d' % i] = models.Count('pk', filter=late)
+                needed |= late
+            else:
+                start, end = utc_day_start(from_date), utc_day_start(to_date)
+                in_window = models.Q(when__gte=start, when__lte=end)
+                aggregates['total_%d' % i] = models.Sum('amount', filter=in_window)
+                needed |= in_window
+        for row in (Transaction.objects.filter(needed, **filters)
+                    .values(*fields).annotate(**aggregates).order_by()):
+            for i in range(len(windows)):
+                if i in spans:
+                    if row['late_count_%d' % i]:
+                        group = groups[i].setdefault(key(row), [0, 0])
+                        group[0] -= row['late_total_%d' % i]
+                        group[1] -= row['late_count_%d' % i]
+                elif row['total_%d' % i] is not None:
+                    groups[i][key(row)] = [row['total_%d' % i], 1]
+
+        return [
+            {group_key: total for group_key, (total, count) in window_groups.items() if count > 0}
+            for window_groups in groups
+        ]
+
+
 class PeriodDefinition(models.Model):
     """
         A flexible set of time periods for summarising transactions.
@@ -225,41 +771,71 @@ class PeriodDefinition(models.Model):
     anchor_date = models.DateField(null=True, blank=True)
     frequency = models.CharField(max_length=10)
 
+    # Periods computed today, shared by every instance in the process and
+    # keyed by (pk, frequency, anchor_date, today). Saving or deleting a
+    # definition forgets its entries; entries from earlier days are dropped
+    # when the first entry for a new day is stored.
+    _period_cache = {}
+    # Guards _period_cache, which threads of one server process share.
+    _period_cache_lock = threading.Lock()
+
     def __init__(self, *args, **kwargs):
         super(PeriodDefinition, self).__init__(*args, **kwargs)
-        self._index = None
-        self._ranges = None
+        self._periods = None
 
     def __str__(self):
         return self.label
 
+    @classmethod
+    def forget_periods(cls, pk):
+        """Drop the cached periods of the definition ``pk``."""
+        with cls._period_cache_lock:
+            for key in [key for key in cls._period_cache if key[0] == pk]:
+                del cls._period_cache[key]
+
+    def _cached_periods(self):
+        """Return this definition's cache entry for today, computing its index if needed."""
+        if self._periods is None:
+            today = date.today()
+            key = (self.pk, self.frequency, self.anchor_date, today)
+            with self._period_cache_lock:
+                periods = self._period_cache.get(key)
+            if periods is None:
+                periods = {'index': self._build_index(today)}
+                if self.pk is not None:
+                    with self._period_cache_lock:
+                        if any(cached[3] != today for cached in self._period_cache):
+                            self._period_cache.clear()
+                        periods = self._period_cache.setdefault(key, periods)
+            self._periods = periods
+        return self._periods
+
+    def _build_index(self, today):
+        offset = pd.tseries.frequencies.to_offset(self.frequency)
+        end_date = today + offset
+        start_date = end_date - relativedelta(years=1) - offset
+
+        if self.anchor_date is None:
+            return pd.date_range(start_date, end_date, freq=self.frequency)
+
+        if pd.Timestamp(self.anchor_date) > start_date:
+            raise ValueError("unable to anchor periods")
+
+        dates = pd.date_range(self.anchor_date, end_date, freq=self.frequency)
+        return dates[dates >= np.datetime64(start_date)]
+
     @property
     def index(self):
-        if self._index is None:
-            offset = pd.tseries.frequencies.to_offset(self.frequency)
-            end_date = date.today() + offset
-            start_date = end_date - relativedelta(years=1) - offset
-
-            if self.anchor_date is None:
-                dates = pd.date_range(start_date, end_date,
-                                      freq=self.frequency)
-            else:
-                if pd.Timestamp(self.anchor_date) > start_date:
-                    raise ValueError("unable to anchor periods")
-
-                dates = pd.date_range(self.anchor_date, end_date,
-                                        freq=self.frequency)
-                dates = dates[dates >= np.datetime64(start_date)]
-            self._index = dates
-        return self._index
+        return self._cached_periods()['index']
 
     @property
     def date_ranges(self):
-        if self._ranges is None:
-            dates = self.index
-            self._ranges = [(start, start_next - relativedelta(days=1))
-                            for start, start_next in zip(dates[:-1], dates[1:])]
-        return self._ranges
+        periods = self._cached_periods()
+        if 'ranges' not in periods:
+            dates = periods['index']
+            periods['ranges'] = [(start, start_next - relativedelta(days=1))
+                                 for start, start_next in zip(dates[:-1], dates[1:])]
+        return periods['ranges']
 
     @property
     def current(self):
@@ -269,14 +845,50 @@ class PeriodDefinition(models.Model):
     def previous(self):
         return self.date_ranges[-2]
 
-    def summarise(self, queryset):
-        for start, end in self.date_ranges:
-            yield queryset.filter(
-                when__gte=start, when__lte=end
-            ).values('category', 'category__name').annotate(total=models.Sum('amount'))
+    def summarise(self, queryset=None):
+        """Yield per-category totals for each period in ``date_ranges``.
+
+        Without a ``queryset`` all transactions are summarised, using
+        ``CategoryMonthTotal`` for periods that are whole months. A given
+        ``queryset`` is summarised with one query that labels each transaction
+        with the index of its period and groups by (period, category).
+        """
+        if queryset is None:
+            windows = [(start.date(), end.date()) for start, end in self.date_ranges]
+            for totals in CategoryMonthTotal.totals(windows, ['category', 'category__name']):
+                yield [
+                    {'category': category, 'category__name': name, 'total': total}
+                    for (category, name), total in totals.items()
+                ]
+            return
+        bounds = [(utc_day_start(start.date()), utc_day_start(end.date()))
+                  for start, end in self.date_ranges]
+        periods = [[] for _ in bounds]
+        if bounds:
+            period = models.Case(
+                *[models.When(when__gte=start, when__lte=end, then=models.Value(i))
+                  for i, (start, end) in enumerate(bounds)],
+                output_field=models.IntegerField(),
+            )
+            rows = (queryset.filter(when__gte=bounds[0][0], when__lte=bounds[-1][1])
+                    .annotate(period=period).filter(period__isnull=False)
+                    .values('period', 'category', 'category__name')
+                    .annotate(total=models.Sum('amount')).order_by())
+            for row in rows:
+                periods[row.pop('period')].append(row)
+        yield from periods
 
     @property
     def option_specifiers(self):
+        periods = self._cached_periods()
+        # The label is not part of the cache key, so keep it with the options.
+        label, options = periods.get('options', (None, None))
+        if label != self.label:
+            options = self._build_option_specifiers()
+            periods['options'] = (self.label, options)
+        return [dict(option) for option in options]
+
+    def _build_option_specifiers(self):
         fmt = '%Y-%m-%d'
         return [
             {
@@ -308,15 +920,77 @@ class Bill(models.Model):
     document = models.FileField(null=True, upload_to='uploaded/bills')
     series = models.ForeignKey('RecurringPayment', on_delete=models.CASCADE, related_name="bills")
 
-    @property
-    def is_paid(self) -> bool:
-        # Sum over the related manager rather than .aggregate() so that a
-        # prefetched paying_transactions cache is reused (aggregate() always
-        # hits the DB, defeating prefetch_related on list endpoints).
-        payments = self.paying_transactions.all()
-        if not payments:
-            return False
-        return sum(txn.amount for txn in payments) == -self.due_amount
+    objects = VersionedQuerySet.as_manager()
+
+    # Negated sum of the paying transactions' amounts, or None without any;
+    # kept current by signal handlers.
+    paid_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                      editable=False)
+    # Whether paid_amount equals due_amount; stored so it can be indexed.
+    is_paid = models.BooleanField(default=False, db_index=True, editable=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored series so moving a bill refreshes both schedules.
+        instance._loaded_series_id = dict(zip(field_names, values)).get('series_id')
+        return instance
+
+    @classmethod
+    def refresh_paid_amounts(cls, bill_ids):
+        """Recompute the stored ``paid_amount`` and ``is_paid`` of the given bills in one query.
+
+        ``bill_ids`` may be a list or a ``values('pk')`` queryset.
+        """
+        paid = -models.Subquery(
+            cls.paying_transactions.through.objects
+            .filter(bill=models.OuterRef('pk'))
+            .values('bill')
+            .annotate(total=models.Sum('transaction__amount'))
+            .values('total')
+        )
+        cls.objects.filter(pk__in=bill_ids).update(
+            paid_amount=paid,
+            # NULL (no payments) compares as unknown, so falls to the default.
+            is_paid=models.Case(
+                models.When(Exact(paid, models.F('due_amount')), then=models.Value(True)),
+                default=models.Value(False),
+            ),
+        )
+
+    @classmethod
+    def bulk_create_paid(cls, pairs):
+        """Create one bill paid by each transaction of ``(series, transaction)`` pairs.
+
+        ``series`` may be anything with ``pk`` and ``name``; the name stands
+        in for a missing description. The bills and their paying transaction
+        links are inserted in bulk. Returns the created bills.
+        """
+        with db_transaction.atomic():
+            bills = cls.objects.bulk_create([
+                cls(
+                    # Bill.description has max_length=100; truncate if needed
+                    description=(trans.description or series.name)[:100],
+                    due_date=utc_day(trans.when),
+                    due_amount=abs(trans.amount),
+                    # The through rows below are bulk inserted, skipping the
+                    # m2m_changed handler that would set these.
+                    paid_amount=-trans.amount,
+                    # A credit pays a negative amount, never the due amount.
+                    is_paid=trans.amount <= 0,
+                    series_id=series.pk,
+                )
+                for series, trans in pairs
+            ])
+            cls.paying_transactions.through.objects.bulk_create([
+                cls.paying_transactions.through(bill_id=bill.pk, transaction_id=trans.pk)
+                for bill, (_, trans) in zip(bills, pairs)
+            ])
+        return bills
+
+    def save(self, *args, **kwargs):
+        self.is_paid = self.paid_amount is not None and self.paid_amount == Decimal(str(self.due_amount))
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return "{} bill of ${:.2f} due on {}".format(
@@ -330,31 +1004,64 @@ class Bill(models.Model):
         indexes = [models.Index(fields=["due_date"])]
 
 
+def payment_schedule(bills):
+    """Summarise a payment's ``(due_date, due_amount)`` pairs, sorted by date.
+
+    Returns a dict of ``RecurringPayment`` schedule fields: ``last_due_date``
+    and ``last_amount`` from the latest bill, ``mean_interval`` as the mean
+    number of days between bills and ``next_due_date`` as the last due date
+    plus that interval. The last two are None with fewer than two bills.
+    """
+    schedule = {'last_due_date': None, 'last_amount': None,
+                'mean_interval': None, 'next_due_date': None}
+    if not bills:
+        return schedule
+    schedule['last_due_date'], schedule['last_amount'] = bills[-1]
+    if len(bills) < 2:
+        return schedule
+    dates = np.array([due for due, _ in bills], dtype='datetime64[D]')
+    mean_days = float(np.mean(np.diff(dates).astype(np.int64)))
+    schedule['mean_interval'] = mean_days
+    schedule['next_due_date'] = (
+        datetime.combine(schedule['last_due_date'], time(0, 0)) + timedelta(days=mean_days)
+    ).date()
+    return schedule
+
+
 class RecurringPayment(models.Model):
-    """A recurring bill series."""
+    """A recurring bill series.
+
+    The schedule fields summarise the series' bills and are kept up to date
+    by ``refresh_schedule`` whenever a bill is saved or deleted.
+    """
     name = models.CharField(max_length=100)
     is_income = models.BooleanField(default=False)
     category = models.ForeignKey('Category', null=True, blank=True, on_delete=models.SET_NULL)
+    last_due_date = models.DateField(null=True, blank=True, editable=False)
+    last_amount = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, editable=False)
+    mean_interval = models.FloatField(null=True, blank=True, editable=False)
+    next_due_date = models.DateField(null=True, blank=True, editable=False)
+
+    objects = VersionedQuerySet.as_manager()
+
+    @classmethod
+    def refresh_schedule(cls, payment_id):
+        """Recompute the stored schedule fields from the payment's bills."""
+        bills = list(Bill.objects.filter(series_id=payment_id)
+                     .order_by('due_date').values_list('due_date', 'due_amount'))
+        cls.objects.filter(pk=payment_id).update(**payment_schedule(bills))
 
     def bills_as_series(self):
         """Convert related Bill objects to time series."""
-        arr = np.array(self.bills.order_by('due_date').values_list('due_date', 'due_amount'))
+        if 'bills' in getattr(self, '_prefetched_objects_cache', {}):
+            bills = sorted((bill.due_date, bill.due_amount) for bill in self.bills.all())
+        else:
+            bills = self.bills.order_by('due_date').values_list('due_date', 'due_amount')
+        arr = np.array(bills)
         if len(arr) == 0:
             return pd.Series()
         return pd.Series(arr[:, 1], index=pd.DatetimeIndex(arr[:, 0])).astype(float)
 
-    def next_due_date(self) -> date | None:
-        """Calculate the due date of the next bill."""
-        data = self.bills_as_series()
-        if len(data) == 0:
-            return None
-        days_between = data.index.to_series().diff().dt.days.values[1:]
-        mean_days = np.mean(days_between)
-        if not np.isfinite(mean_days):
-            return None
-        last_due = data.index[-1]
-        return last_due + timedelta(days=mean_days)
-
     def __str__(self):
         if self.is_income:
             return "Income: {}".format(self.name)
@@ -465,11 +1172,15 @@ class BudgetEntry(models.Model):
             return self.valid_from.strftime("%d %b") + " - " + self.valid_to.strftime("%d %b %Y")
 
     def name_from_categories(self):
-        """Determine a name from the selected categories."""
-        if self.categories.count() == 1:
-            return self.categories.first().name
+        """Determine a name from the selected categories.
+
+        Reads ``categories.all()`` so a ``prefetch_related('categories')``
+        is reused.
+        """
+        names = [category.name for category in sorted(self.categories.all(), key=lambda c: c.pk)]
+        if len(names) == 1:
+            return names[0]
 
-        names = self.categories.values_list("name", flat=True)
         name_parts = [name.split(' - ') for name in names]
         first_same = len(set([parts[0] == name_parts[0][0] for parts in name_parts])) == 1
         if first_same:
@@ -490,6 +1201,32 @@ class BudgetEntry(models.Model):
         ordering = ["-valid_to"]
         verbose_name_plural = "budget entries"
 
+class DataVersion(models.Model):
+    """Counter bumped whenever data behind cached summaries changes.
+
+    A single row, kept in the database so every worker process sees the
+    same version. Cached responses include the version in their key, so a
+    bump makes them unreachable rather than having to find and delete them.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+    SINGLETON_PK = 1
+
+    @classmethod
+    def current(cls) -> int:
+        version = cls.objects.filter(pk=cls.SINGLETON_PK).values_list('version', flat=True).first()
+        return version or 0
+
+    @classmethod
+    def bump(cls):
+        updated = cls.objects.filter(pk=cls.SINGLETON_PK).update(version=models.F('version') + 1)
+        if not updated:
+            cls.objects.get_or_create(pk=cls.SINGLETON_PK, defaults={'version': 1})
+
+    def __str__(self):
+        return "Data version {}".format(self.version)
+
+
 class CategorisorModel(models.Model):
     name = models.CharField(max_length=20)
     implementation = models.CharField(max_length=200)
@@ -0,0 +1,247 @@
+"""Progress tracking engine — actual vs budget vs expected spend.
+
+``ProgressSnapshot.load`` fetches everything a progress calculation needs
+with a fixed number of queries (budgets and their categories, group
+memberships, stored recurring payment schedules and aggregated spend);
+``build_progress`` then maps it onto rows entirely in memory.
+``ProgressSnapshot.load_many`` does the same for several periods at once,
+sharing every query between them.
+Expected spend for rows without a budget comes from ``SpendForecaster``.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from ctrack.forecast import SpendForecaster
+from ctrack.models import (
+    BudgetEntry,
+    Category,
+    CategoryGroup,
+    CategoryMonthTotal,
+    RecurringPayment,
+)
+
+
+def _spend_by_window(windows):
+    """Return a ``{category_pk: Decimal}`` spend dict for each ``(from, to)``.
+
+    Whole-month windows are read from ``CategoryMonthTotal`` and the rest
+    aggregated from the transactions, one query each for all windows. A
+    category only appears in a window's dict if it has transactions in that
+    window. Excludes uncategorised and split-parent transactions.
+    """
+    return [
+        {cat_pk: total for (cat_pk,), total in totals.items()}
+        for totals in CategoryMonthTotal.totals(
+            windows, ["category"], is_split=False, category__isnull=False,
+        )
+    ]
+
+
+class ProgressSnapshot:
+    """In-memory copy of the data behind one progress response."""
+
+    def __init__(self, from_date, to_date, today, budgets, group_members,
+                 group_names, category_names, spend, forecaster, payments):
+        self.from_date = from_date
+        self.to_date = to_date
+        self.today = today
+        # [(BudgetEntry, {category_pk, ...})] in BudgetEntry order
+        self.budgets = budgets
+        # {group_pk: [category_pk, ...]}
+        self.group_members = group_members
+        self.group_names = group_names
+        self.category_names = category_names
+        # {category_pk: Decimal}
+        self.spend = spend
+        # SpendForecaster over the history up to ``today``
+        self.forecaster = forecaster
+        # [(name, category_pk, next_due_date, mean_interval, last_amount)]
+        self.payments = payments
+
+        self.groups_by_category = defaultdict(list)
+        for group_pk, cat_pks in group_members.items():
+            for cat_pk in cat_pks:
+                self.groups_by_category[cat_pk].append(group_pk)
+
+    @classmethod
+    def load(cls, from_date, to_date, today):
+        """Load a snapshot for the period with a constant number of queries."""
+        return cls.load_many([(from_date, to_date)], today)[0]
+
+    @classmethod
+    def load_many(cls, ranges, today):
+        """Load a snapshot for each ``(from_date, to_date)`` in ``ranges``.
+
+        Budgets, groups, names, bills and the spend history are fetched once
+        for all periods, and spend for every period comes from conditional
+        aggregations shared between them, so the query count does not depend
+        on the number of periods.
+        """
+        ranges = list(ranges)
+        period_ends = [to_date for _, to_date in ranges]
+        entries = list(BudgetEntry.objects.filter(
+            valid_from__lte=max(period_ends), valid_to__gte=min(period_ends)
+        ))
+        entry_categories = defaultdict(set)
+        for entry_pk, cat_pk in BudgetEntry.categories.through.objects.filter(
+            budgetentry__in=[entry.pk for entry in entries]
+        ).values_list("budgetentry_id", "category_id"):
+            entry_categories[entry_pk].add(cat_pk)
+
+        group_names = dict(CategoryGroup.objects.values_list("pk", "name"))
+        group_members = {group_pk: [] for group_pk in group_names}
+        for group_pk, cat_pk in CategoryGroup.categories.through.objects.values_list(
+            "categorygroup_id", "category_id"
+        ).order_by("categorygroup_id", "category_id"):
+            group_members[group_pk].append(cat_pk)
+
+        payments = list(RecurringPayment.objects.filter(
+            is_income=False, category__isnull=False, next_due_date__isnull=False,
+        ).values_list("name", "category_id", "next_due_date", "mean_interval", "last_amount"))
+
+        category_names = dict(Category.objects.values_list("pk", "name"))
+
+        spend = _spend_by_window(ranges)
+        forecaster = SpendForecaster.load(today)
+
+        snapshots = []
+        for i, (from_date, to_date) in enumerate(ranges):
+            budgets = [
+                (entry, entry_categories[entry.pk])
+                for entry in entries
+                if entry.valid_from <= to_date <= entry.valid_to
+            ]
+            snapshots.append(cls(
+                from_date, to_date, today,
+                budgets=budgets,
+                group_members=group_members,
+                group_names=group_names,
+                category_names=category_names,
+                spend=spend[i],
+                forecaster=forecaster,
+                payments=payments,
+            ))
+        return snapshots
+
+
+def build_progress(snapshot, group_by="category", label=""):
+    """Compute the progress response data for ``snapshot``.
+
+    ``group_by`` is ``"category"`` or ``"category_group"``. No queries are
+    issued.
+    """
+    by_group = group_by == "category_group"
+    from_date, to_date, today = snapshot.from_date, snapshot.to_date, snapshot.today
+
+    def rows_for_categories(cat_pks):
+        """Row ids a budget over ``cat_pks`` is spread across."""
+        if not by_group:
+            return sorted(cat_pks)
+        return sorted({
+            group_pk
+            for cat_pk in cat_pks
+            for group_pk in snapshot.groups_by_category.get(cat_pk, ())
+        })
+
+    # Actual spend
+    if by_group:
+        spend_map = {}
+        for group_pk, cat_pks in snapshot.group_members.items():
+            total = sum(snapshot.spend.get(cat_pk, Decimal("0")) for cat_pk in cat_pks)
+            if total:
+                spend_map[group_pk] = total
+    else:
+        spend_map = dict(snapshot.spend)
+
+    # Budget amounts, pro-rated across the rows each entry covers
+    budget_map = {}
+    budgeted_category_pks = set()
+    for entry, cat_pks in snapshot.budgets:
+        budgeted_category_pks |= cat_pks
+        row_ids = rows_for_categories(cat_pks)
+        share = Decimal(str(entry.amount_over_period(from_date, to_date))) / (len(row_ids) or 1)
+        for row_id in row_ids:
+            budget_map[row_id] = budget_map.get(row_id, Decimal("0")) + share
+
+    # Expected remaining spend
+    remaining_start = max(today + timedelta(days=1), from_date)
+    remaining_days = (to_date - remaining_start).days + 1 if remaining_start <= to_date else 0
+
+    expected_remaining_map = {}
+    if remaining_days > 0:
+        # Pro-rata budget for rows WITH a budget
+        for entry, cat_pks in snapshot.budgets:
+            row_ids = rows_for_categories(cat_pks)
+            remaining_amount = Decimal(str(entry.amount_over_period(remaining_start, to_date)))
+            share = remaining_amount / (len(row_ids) or 1)
+            for row_id in row_ids:
+                expected_remaining_map[row_id] = (
+                    expected_remaining_map.get(row_id, Decimal("0")) + share
+                )
+
+        # Forecast from spending history for rows WITHOUT a budget
+        forecast = snapshot.forecaster.expected(remaining_start, to_date)
+        if by_group:
+            for group_pk, cat_pks in snapshot.group_members.items():
+                if group_pk not in budget_map:
+                    expected_remaining_map[group_pk] = sum(
+                        (forecast.get(cat_pk, Decimal("0")) for cat_pk in cat_pks),
+                        Decimal("0"),
+                    )
+        else:
+            for cat_pk in set(spend_map) - budgeted_category_pks:
+                if cat_pk in forecast:
+                    expected_remaining_map[cat_pk] = forecast[cat_pk]
+
+    # Upcoming recurring bills
+    upcoming_map = {}
+    for name, cat_pk, due, mean_interval, last_amount in snapshot.payments:
+        step = int(mean_interval)
+        expected_amount = Decimal(str(abs(float(last_amount))))
+        row_ids = snapshot.groups_by_category.get(cat_pk, []) if by_group else [cat_pk]
+
+        while due <= to_date:
+            if due > today:
+                bill_dict = {
+                    "name": name,
+                    "expected_date": due,
+                    "expected_amount": expected_amount,
+                }
+                for row_id in row_ids:
+                    upcoming_map.setdefault(row_id, []).append(bill_dict)
+            if step > 0:
+                due = due + timedelta(days=step)
+            else:
+                break
+
+    # Assemble
+    all_ids = set(spend_map) | set(budget_map) | set(expected_remaining_map) | set(upcoming_map)
+    all_ids.discard(None)
+    names = snapshot.group_names if by_group else snapshot.category_names
+
+    rows = []
+    for row_id in sorted(all_ids, key=lambda rid: names.get(rid, "")):
+        rows.append({
+            "id": row_id,
+            "name": names.get(row_id, "Unknown"),
+            "actual_spend": spend_map.get(row_id, Decimal("0")),
+            "expected_remaining": expected_remaining_map.get(row_id, Decimal("0")),
+            "budget": budget_map.get(row_id, None),
+            "upcoming_bills": upcoming_map.get(row_id, []),
+        })
+
+    budget_values = [r["budget"] for r in rows if r["budget"] is not None]
+    return {
+        "period": {
+            "from_date": from_date,
+            "to_date": to_date,
+            "label": label,
+        },
+        "rows": rows,
+        "totals": {
+            "actual_spend": sum(r["actual_spend"] for r in rows),
+            "expected_remaining": sum(r["expected_remaining"] for r in rows),
+            "budget": sum(budget_values) if budget_values else None,
+        },
+    }
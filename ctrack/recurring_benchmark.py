@@ -0,0 +1,234 @@
+"""Benchmark recurring detection on synthetic histories.
+
+``synthetic_history`` builds a transaction history with known recurring
+series (weekly to annual, fixed and variable amounts) mixed with irregular
+spending, some of it at the same shops again and again. ``benchmark`` runs
+``RecurringTransactionDetector`` over histories of increasing size and
+records the run time of each stage, peak memory and how well the detected
+groups recover the planted series, so changes to detection can be judged on
+speed and quality together.
+
+Histories are generated in memory and passed to ``cluster_rows``, so the
+database is not touched and the times exclude the transaction query.
+"""
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytz
+from dateutil.relativedelta import relativedelta
+
+from ctrack.recurring_detection import RecurringTransactionDetector
+
+
+DEFAULT_SIZES = (1000, 5000, 20000)
+
+# Length of the generated histories; long enough for three annual payments.
+HISTORY_DAYS = 3 * 365 + 30
+
+# Share of the transactions belonging to recurring series.
+RECURRING_FRACTION = 0.3
+
+# (name, step) for the planted series, with steps as relativedelta so
+# monthly payments keep their day of the month.
+FREQUENCIES = [
+    ("weekly", relativedelta(weeks=1)),
+    ("fortnightly", relativedelta(weeks=2)),
+    ("monthly", relativedelta(months=1)),
+    ("quarterly", relativedelta(months=3)),
+    ("semi_annual", relativedelta(months=6)),
+    ("annual", relativedelta(years=1)),
+]
+
+# Spread of variable amounts around the series' usual amount.
+VARIABLE_AMOUNT_SPREAD = 0.25
+
+# A detected group recovers a series when at least MATCH_PURITY of its
+# transactions belong to the series and it covers at least MATCH_COVERAGE
+# of the series' transactions.
+MATCH_PURITY = 0.8
+MATCH_COVERAGE = 0.5
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "zu", "pe", "gra", "bel",
+             "cor", "dan", "fen", "hol", "jor", "lin", "mar", "nor", "ost", "pin", "quo", "sel"]
+SUFFIXES = ["LTD", "PTY", "CO", "ONLINE", "STORE", "MARKET", "SERVICES", "AU"]
+
+
+def merchant_name(rnd, used):
+    """A made-up merchant name not already in ``used``."""
+    while True:
+        words = [
+            "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 3))).upper()
+            for _ in range(rnd.randint(1, 2))
+        ]
+        name = " ".join(words + [rnd.choice(SUFFIXES)])
+        if name not in used:
+            used.add(name)
+            return name
+
+
+def synthetic_history(size, seed=0, recurring_fraction=RECURRING_FRACTION):
+    """Generate about ``size`` transactions with planted recurring series.
+
+    Returns ``(rows, series)``. ``rows`` are ``(id, when, amount,
+    description, category id, category name)`` tuples in date order, as
+    ``RecurringTransactionDetector.cluster_rows`` takes them. ``series`` is
+    a list of ``(frequency, is_variable, frozenset of ids)`` for the planted
+    series.
+    """
+    rnd = random.Random(seed)
+    start = datetime(2021, 1, 1, tzinfo=pytz.utc)
+    end = start + timedelta(days=HISTORY_DAYS)
+    used = set()
+    # (when, amount, description, series number or None)
+    planned = []
+
+    n_series = 0
+    recurring_target = int(size * recurring_fraction)
+    while len(planned) < recurring_target:
+        frequency, step = rnd.choice(FREQUENCIES)
+        name = merchant_name(rnd, used)
+        is_variable = rnd.random() < 0.3
+        amount = round(rnd.uniform(5, 400), 2)
+        is_income = rnd.random() < 0.05
+        day = start + timedelta(days=rnd.randint(0, 27), hours=rnd.randint(0, 23))
+        occurrence = 0
+        while True:
+            # A day's slack either way, as when payments move off weekends.
+            when = day + occurrence * step + timedelta(days=rnd.choice([0, 0, 0, -1, 1]))
+            if when >= end:
+                break
+            value = amount * (1 + rnd.uniform(-VARIABLE_AMOUNT_SPREAD, VARIABLE_AMOUNT_SPREAD)) \
+                if is_variable else amount
+            # Bank references change from one payment to the next.
+            description = "{} REF{:06d}".format(name, rnd.randint(0, 999999)) \
+                if rnd.random() < 0.5 else name
+            planned.append((when, value if is_income else -value, description, (n_series, frequency, is_variable)))
+            occurrence += 1
+        n_series += 1
+
+    # Irregular spending: most at a pool of shops visited at random times.
+    shops = [merchant_name(rnd, used) for _ in range(max(10, size // 50))]
+    while len(planned) < size:
+        if rnd.random() < 0.7:
+            description = rnd.choice(shops)
+        else:
+            description = "{} {}".format(merchant_name(rnd, used), rnd.randint(1000, 9999))
+        when = start + timedelta(seconds=rnd.randint(0, HISTORY_DAYS * 86400 - 1))
+        planned.append((when, -round(rnd.uniform(2, 250), 2), description, None))
+
+    planned.sort(key=lambda plan: plan[0])
+    rows = []
+    members = {}
+    for tx_id, (when, amount, description, series_key) in enumerate(planned, start=1):
+        category = rnd.randint(1, 10)
+        rows.append((tx_id, when, Decimal("{:.2f}".format(amount)), description,
+                     category, "Category {}".format(category)))
+        if series_key is not None:
+            members.setdefault(series_key, []).append(tx_id)
+    series = [
+        (frequency, is_variable, frozenset(ids))
+        for (_, frequency, is_variable), ids in sorted(members.items())
+    ]
+    return rows, series
+
+
+def score(groups, series):
+    """Return ``(precision, recall)`` of detected ``groups`` against ``series``.
+
+    Precision is the share of groups recovering a planted series and recall
+    the share of series recovered by at least one group.
+    """
+    series_of = {}
+    for index, (_, _, ids) in enumerate(series):
+        for tx_id in ids:
+            series_of[tx_id] = index
+    recovered = set()
+    matching_groups = 0
+    for group in groups:
+        counts = {}
+        for tx_id in group['transaction_ids']:
+            if tx_id in series_of:
+                counts[series_of[tx_id]] = counts.get(series_of[tx_id], 0) + 1
+        if not counts:
+            continue
+        index, overlap = max(counts.items(), key=lambda item: item[1])
+        if (overlap >= MATCH_PURITY * len(group['transaction_ids'])
+                and overlap >= MATCH_COVERAGE * len(series[index][2])):
+            matching_groups += 1
+            recovered.add(index)
+    precision = matching_groups / len(groups) if groups else 1.0
+    recall = len(recovered) / len(series) if series else 1.0
+    return precision, recall
+
+
+def run_detector(detector, rows):
+    """Run both detection stages, returning ``(groups, text seconds, analysis seconds)``."""
+    start = time.perf_counter()
+    clusters = detector.cluster_rows(rows)
+    text_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    groups = detector.analyze(clusters)
+    return groups, text_seconds, time.perf_counter() - start
+
+
+def benchmark(sizes=DEFAULT_SIZES, seed=0, repeat=1, measure_memory=True, progress=None,
+              **detector_kwargs):
+    """Benchmark detection on a synthetic history of each size.
+
+    Times are the best of ``repeat`` runs. When ``workers`` in
+    ``detector_kwargs`` makes the analysis stage run across processes (see
+    ``RecurringTransactionDetector.runs_parallel``) it is also timed
+    serially on the same clusters and ``speedup`` is the serial time over
+    the parallel one; otherwise it is None. Peak memory comes from one extra run under
+    ``tracemalloc``, as tracing slows the code down; it covers Python and
+    numpy allocations in this process only, so work done in worker
+    processes is not counted. Returns one dict per size, each also passed
+    to ``progress`` if given.
+    """
+    results = []
+    for size in sizes:
+        rows, series = synthetic_history(size, seed=seed)
+        detector = RecurringTransactionDetector(**detector_kwargs)
+        runs = [run_detector(detector, rows) for _ in range(max(1, repeat))]
+        groups = runs[0][0]
+        text_seconds = min(run[1] for run in runs)
+        analysis_seconds = min(run[2] for run in runs)
+        speedup = None
+        clusters = detector.cluster_rows(rows) if detector.workers > 1 else None
+        if clusters is not None and detector.runs_parallel(clusters[1]):
+            serial = RecurringTransactionDetector(**dict(detector_kwargs, workers=1))
+            serial_seconds = []
+            for _ in range(max(1, repeat)):
+                start = time.perf_counter()
+                serial.analyze(clusters)
+                serial_seconds.append(time.perf_counter() - start)
+            speedup = min(serial_seconds) / analysis_seconds if analysis_seconds else None
+        peak_mib = None
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                run_detector(detector, rows)
+                peak_mib = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            finally:
+                tracemalloc.stop()
+        precision, recall = score(groups, series)
+        result = {
+            'transactions': len(rows),
+            'series': len(series),
+            'groups': len(groups),
+            'text_seconds': text_seconds,
+            'analysis_seconds': analysis_seconds,
+            'seconds': min(run[1] + run[2] for run in runs),
+            'workers': detector.workers,
+            'speedup': speedup,
+            'peak_mib': peak_mib,
+            'precision': precision,
+            'recall': recall,
+        }
+        if progress is not None:
+            progress(result)
+        results.append(result)
+    return results
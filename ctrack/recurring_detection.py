@@ -1,15 +1,164 @@
 """Recurring transaction detection using TF-IDF clustering."""
 import logging
-from collections import Counter
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 
 import numpy as np
+import pandas as pd
+from scipy import sparse
 from sklearn.cluster import DBSCAN
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.neighbors import sort_graph_by_row_values
 
 
 logger = logging.getLogger(__name__)
 
+# Rows of the TF-IDF matrix compared against all others at a time when
+# building the neighbourhood graph.
+NEIGHBOUR_CHUNK_SIZE = 2000
+
+
+def cosine_radius_graph(tfidf_matrix, eps, chunk_size=NEIGHBOUR_CHUNK_SIZE):
+    """Sparse cosine distance graph holding only pairs within ``eps``.
+
+    ``tfidf_matrix`` rows must be L2 normalised, so the distance between two
+    rows is one minus their dot product. The sparse product only visits rows
+    sharing a token, and descriptions sharing none are at distance 1, beyond
+    any ``eps`` below 1, so no neighbours are lost. Every row is its own
+    neighbour at distance 0, stored explicitly, matching the zero diagonal
+    of ``cosine_distances``. The result can be passed to DBSCAN with
+    ``metric='precomputed'``.
+    """
+    n = tfidf_matrix.shape[0]
+    rows, cols, dists = [np.arange(n)], [np.arange(n)], [np.zeros(n)]
+    transposed = tfidf_matrix.T.tocsc()
+    for start in range(0, n, chunk_size):
+        similarity = (tfidf_matrix[start:start + chunk_size] @ transposed).tocoo()
+        distance = np.clip(1.0 - similarity.data, 0.0, 2.0)
+        row = similarity.row + start
+        keep = (distance <= eps) & (row != similarity.col)
+        rows.append(row[keep])
+        cols.append(similarity.col[keep])
+        dists.append(distance[keep])
+    graph = sparse.csr_matrix(
+        (np.concatenate(dists), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(n, n),
+    )
+    return sort_graph_by_row_values(graph, warn_when_not_sorted=False)
+
+
+# Below this many clustered transactions the post-clustering stage runs in
+# the calling process even when workers are configured; starting a pool
+# costs more than it saves.
+PARALLEL_MIN_TRANSACTIONS = 5000
+
+
+def shard_clusters(labels, shards):
+    """Split the clusters in ``labels`` into contiguous id ranges.
+
+    Returns up to ``shards`` arrays of row indices, each holding whole
+    clusters, balanced by transaction count and in cluster order.
+    """
+    clustered = np.flatnonzero(labels != -1)
+    rows = clustered[np.argsort(labels[clustered], kind='stable')]
+    sizes = np.bincount(labels[clustered])
+    # Cluster boundaries nearest to each equal share of the rows.
+    cluster_ends = np.cumsum(sizes)
+    cuts = np.searchsorted(cluster_ends, len(rows) * np.arange(1, shards) / shards)
+    bounds = np.unique(np.concatenate([[0], cluster_ends[cuts], [len(rows)]]))
+    return [np.sort(rows[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def take_rows(columns, rows):
+    """The given rows of the detector's columns; the description table is shared."""
+    ids, micros, whens, amounts, desc_codes, descriptions, cat_ids, cat_names = columns
+    return (
+        ids[rows], micros[rows], [whens[i] for i in rows], amounts[rows],
+        desc_codes[rows], descriptions, cat_ids[rows], [cat_names[i] for i in rows],
+    )
+
+
+# Modulus of the MinHash permutations; a Mersenne prime above any vocabulary size.
+MINHASH_PRIME = (1 << 31) - 1
+
+
+def minhash_signatures(tfidf_matrix, num_perm, seed=0):
+    """MinHash signatures of each row's token set, shape ``(num_perm, n)``.
+
+    Tokens are the matrix columns, and each permutation is the universal
+    hash ``(a * token + b) mod MINHASH_PRIME``. Rows without tokens get
+    ``MINHASH_PRIME`` in every position.
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, MINHASH_PRIME, size=(num_perm, 1), dtype=np.int64)
+    b = rng.randint(0, MINHASH_PRIME, size=(num_perm, 1), dtype=np.int64)
+    csr = tfidf_matrix.tocsr()
+    token_hashes = (a * csr.indices[np.newaxis, :].astype(np.int64) + b) % MINHASH_PRIME
+
+    signatures = np.full((num_perm, csr.shape[0]), MINHASH_PRIME, dtype=np.int64)
+    has_tokens = np.diff(csr.indptr) > 0
+    if has_tokens.any():
+        signatures[:, has_tokens] = np.minimum.reduceat(
+            token_hashes, csr.indptr[:-1][has_tokens], axis=1
+        )
+    return signatures
+
+
+def lsh_candidate_pairs(tfidf_matrix, bands, rows_per_band, seed=0):
+    """Pairs of rows sharing a MinHash band, as ``(first, second)`` arrays.
+
+    Signatures of ``bands * rows_per_band`` hashes are cut into ``bands``
+    bands and rows whose band values are equal land in the same bucket; a
+    pair is a candidate if it shares a bucket in any band. Two token sets
+    with Jaccard similarity ``s`` become candidates with probability
+    ``1 - (1 - s ** rows_per_band) ** bands``, so more bands raise recall
+    and more rows per band cut the pairs compared. Each pair is returned
+    once with ``first < second``.
+    """
+    n = tfidf_matrix.shape[0]
+    signatures = minhash_signatures(tfidf_matrix, bands * rows_per_band, seed)
+    has_tokens = signatures[0] != MINHASH_PRIME
+    pair_keys = []
+    for band in range(bands):
+        band_values = signatures[band * rows_per_band:(band + 1) * rows_per_band, has_tokens]
+        _, buckets = np.unique(band_values, axis=1, return_inverse=True)
+        buckets = buckets.ravel()
+        members = np.flatnonzero(has_tokens)[np.argsort(buckets, kind='stable')]
+        sizes = np.bincount(buckets)
+        for start, size in zip(np.cumsum(sizes) - sizes, sizes):
+            if size > 1:
+                first, second = np.triu_indices(size, 1)
+                bucket = members[start:start + size]
+                pair_keys.append(bucket[first] * n + bucket[second])
+    if not pair_keys:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    pair_keys = np.unique(np.concatenate(pair_keys))
+    return pair_keys // n, pair_keys % n
+
+
+def cosine_pair_graph(tfidf_matrix, first, second, eps):
+    """Sparse cosine distance graph over the given candidate pairs only.
+
+    As ``cosine_radius_graph``, but distances are computed just for the
+    ``(first, second)`` pairs, and pairs within ``eps`` are stored in both
+    directions alongside the zero diagonal.
+    """
+    n = tfidf_matrix.shape[0]
+    csr = tfidf_matrix.tocsr()
+    similarity = np.asarray(csr[first].multiply(csr[second]).sum(axis=1)).ravel()
+    distance = np.clip(1.0 - similarity, 0.0, 2.0)
+    keep = distance <= eps
+    first, second, distance = first[keep], second[keep], distance[keep]
+    graph = sparse.csr_matrix(
+        (np.concatenate([np.zeros(n), distance, distance]),
+         (np.concatenate([np.arange(n), first, second]),
+          np.concatenate([np.arange(n), second, first]))),
+        shape=(n, n),
+    )
+    return sort_graph_by_row_values(graph, warn_when_not_sorted=False)
+
 
 class RecurringTransactionDetector:
     """Detect recurring transactions from history using description clustering
@@ -18,6 +167,22 @@ class RecurringTransactionDetector:
     Uses TF-IDF vectorization of transaction descriptions followed by DBSCAN
     clustering with cosine distance, then sub-groups by amount within each
     description cluster, and finally filters by timing regularity.
+
+    With ``lsh_bands`` set, descriptions are first blocked by MinHash LSH
+    (see ``lsh_candidate_pairs``) and only pairs sharing a bucket are
+    compared. This is faster on large histories but may miss a few similar
+    pairs; leave it unset for exact neighbourhoods.
+
+    With ``workers`` above one, the clusters found by the text step are
+    split into shards that are sub-grouped and analysed in a process pool.
+    Clusters keep their ids and results are merged in cluster order, so the
+    output is the same as running serially. ``timings`` holds the seconds
+    spent in each stage of the last ``detect``.
+
+    ``detect`` is ``cluster_descriptions`` followed by ``analyze``. The text
+    stage dominates the run time and depends only on ``TEXT_PARAMS``, so
+    callers may keep its result and re-analyse it with a detector using
+    other regularity or amount settings.
     """
 
     FREQUENCY_RANGES = [
@@ -31,7 +196,7 @@ class RecurringTransactionDetector:
 
     def __init__(self, min_cluster_size=3, interval_cv_threshold=0.35,
                  cosine_distance_threshold=0.4, amount_tolerance=0.10,
-                 **kwargs):
+                 lsh_bands=None, lsh_rows=4, workers=1, **kwargs):
         self.min_cluster_size = min_cluster_size
         self.interval_cv_threshold = interval_cv_threshold
         # Accept legacy 'similarity_threshold' kwarg for backwards compat
@@ -42,6 +207,12 @@ class RecurringTransactionDetector:
         # E.g. 0.10 means amounts within 10% of the median are grouped together,
         # allowing for gradual price increases over time.
         self.amount_tolerance = amount_tolerance
+        # MinHash LSH blocking: number of bands (None disables it) and
+        # signature rows per band.
+        self.lsh_bands = lsh_bands
+        self.lsh_rows = lsh_rows
+        self.workers = workers
+        self.timings = {}
 
     def _classify_frequency(self, mean_days):
         """Classify a mean interval in days to a frequency label."""
@@ -50,20 +221,52 @@ class RecurringTransactionDetector:
                 return label
         return "irregular"
 
-    def _classify_amount_type(self, amounts):
-        """Classify amount variability."""
-        abs_amounts = np.abs(amounts)
-        mean = np.mean(abs_amounts)
-        if mean == 0:
-            return "fixed"
-        cv = np.std(abs_amounts) / mean
-        if cv < 0.05:
-            return "fixed"
-        elif cv < 0.3:
-            return "variable_low"
-        return "variable_high"
-
-    def _sub_group_by_amount(self, cluster_txs):
+    def _classify_amount_types(self, abs_means, abs_stds):
+        """Classify amount variability of each group from its absolute amounts."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cv = np.where(abs_means == 0, 0.0, abs_stds / abs_means)
+        return np.select([cv < 0.05, cv < 0.3], ["fixed", "variable_low"], "variable_high")
+
+    @staticmethod
+    def _group_stats(values, starts):
+        """Mean and population std of each group of ``values``.
+
+        Groups are the non-empty runs of ``values`` beginning at ``starts``.
+        Runs of the same length are stacked into one matrix and reduced
+        along its rows, so there is one ``np.mean``/``np.std`` call per
+        distinct length rather than per group. Each row is summed exactly
+        as ``np.mean`` sums a single run; ``np.add.reduceat`` or a pandas
+        groupby sum in a different order, which can change the last bit
+        and flip a rounded amount.
+        """
+        sizes = np.diff(np.append(starts, len(values)))
+        means = np.empty(len(starts))
+        stds = np.empty(len(starts))
+        for size in np.unique(sizes).tolist():
+            groups = np.flatnonzero(sizes == size)
+            block = values[starts[groups, np.newaxis] + np.arange(size)]
+            means[groups] = block.mean(axis=1)
+            stds[groups] = block.std(axis=1)
+        return means, stds
+
+    def _interval_stats(self, micros, starts):
+        """Mean interval in days and its coefficient of variation per group.
+
+        ``micros`` holds transaction times in microseconds, sorted within
+        each group, and every group must have at least two transactions.
+        A group whose mean interval is zero or not finite gets a NaN CV.
+        """
+        # Same rounding as timedelta.total_seconds() / 86400
+        intervals = np.diff(micros) / 1e6 / 86400
+        within = np.ones(len(intervals), dtype=bool)
+        within[starts[1:] - 1] = False
+        means, stds = self._group_stats(intervals[within], starts - np.arange(len(starts)))
+        usable = (means != 0) & np.isfinite(means)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cv = np.where(usable, stds / means, np.nan)
+        return means, cv
+
+    def _sub_group_by_amount(self, abs_amounts):
         """Split a description cluster into sub-groups by similar amounts.
 
         Uses DBSCAN on absolute amounts with eps derived from the median
@@ -71,182 +274,221 @@ class RecurringTransactionDetector:
         payment series that share the same description but have distinct
         amounts (e.g. two gym memberships billed on the same day).
 
-        Returns a list of transaction lists (sub-groups).
+        Returns an array with each transaction's sub-group, numbered in
+        order of first appearance, and -1 for transactions left out.
         """
-        abs_amounts = np.array([abs(t['amount']) for t in cluster_txs])
         median_amount = np.median(abs_amounts)
 
         # If all amounts are very close, no need to sub-group
         if median_amount == 0:
-            return [cluster_txs]
+            return np.zeros(len(abs_amounts), dtype=np.int64)
 
         # Use DBSCAN on 1D absolute amounts.
         # The tolerance-based eps handles gradual price increases
         # (e.g. $113.07 → $115.78) while still separating distinct series
         # (e.g. $100 vs $113).
         eps = max(median_amount * self.amount_tolerance, 0.01)
-        amount_features = abs_amounts.reshape(-1, 1)
         clustering = DBSCAN(eps=eps, min_samples=self.min_cluster_size)
-        labels = clustering.fit_predict(amount_features)
-
-        sub_groups = {}
-        noise = []
-        for i, label in enumerate(labels):
-            if label == -1:
-                noise.append(cluster_txs[i])
-            else:
-                sub_groups.setdefault(label, []).append(cluster_txs[i])
-
-        result = list(sub_groups.values())
+        labels = clustering.fit_predict(abs_amounts.reshape(-1, 1))
 
+        found, first_seen = np.unique(labels[labels != -1], return_index=True)
         # If DBSCAN found no sub-groups (all noise), fall back to the
         # original cluster as a single group
-        if not result:
-            return [cluster_txs]
+        if not len(found):
+            return np.zeros(len(abs_amounts), dtype=np.int64)
 
-        return result
+        sub_ids = np.full(labels.max() + 1, -1, dtype=np.int64)
+        sub_ids[found[np.argsort(first_seen)]] = np.arange(len(found))
+        return np.where(labels == -1, -1, sub_ids[labels])
 
-    def _is_regular(self, txs):
-        """Quick regularity check on a group of transactions.
+    @staticmethod
+    def _top_values(group_of_row, codes, n_groups, limit):
+        """The ``limit`` most common ``codes`` in each group, most common first.
 
-        Returns True if the group's interval CV is within the threshold,
-        meaning it already has a clear periodic pattern.
+        Rows must be in group order; ties go to the code seen first, as with
+        ``Counter.most_common``. Returns one list of codes per group.
         """
-        sorted_txs = sorted(txs, key=lambda t: t['when'])
-        dates = [t['when'] for t in sorted_txs]
-        if len(dates) < 2:
-            return False
-
-        intervals = []
-        for i in range(1, len(dates)):
-            delta = (dates[i] - dates[i - 1]).total_seconds() / 86400
-            intervals.append(delta)
-
-        intervals = np.array(intervals)
-        mean_interval = np.mean(intervals)
-        if mean_interval == 0 or not np.isfinite(mean_interval):
-            return False
-
-        cv = np.std(intervals) / mean_interval
-        return cv <= self.interval_cv_threshold
-
-    def _analyze_group(self, txs, cluster_id, sub_id=None):
-        """Analyze a group of transactions for regularity and build result dict.
-
-        Returns the group dict if it passes regularity checks, else None.
+        n_codes = int(codes.max()) + 1 if len(codes) else 1
+        keys, first_seen, counts = np.unique(
+            group_of_row * n_codes + codes, return_index=True, return_counts=True
+        )
+        key_groups = keys // n_codes
+        order = np.lexsort((first_seen, -counts, key_groups))
+        top = [[] for _ in range(n_groups)]
+        for group, code in zip(key_groups[order].tolist(), (keys[order] % n_codes).tolist()):
+            if len(top[group]) < limit:
+                top[group].append(code)
+        return top
+
+    def _analyze_clusters(self, columns, labels):
+        """Sub-group each description cluster by amount and analyse every group.
+
+        ``columns`` holds one array per transaction field in time order and
+        ``labels`` the description cluster of each transaction (-1 for
+        noise). Interval and amount statistics are computed for all groups
+        at once. Returns the result dicts of the groups that are regular
+        enough, ordered by cluster and sub-group.
         """
-        txs.sort(key=lambda t: t['when'])
-
-        dates = [t['when'] for t in txs]
-        if len(dates) < 2:
-            return None
-
-        intervals = []
-        for i in range(1, len(dates)):
-            delta = (dates[i] - dates[i - 1]).total_seconds() / 86400
-            intervals.append(delta)
-
-        intervals = np.array(intervals)
-        mean_interval = np.mean(intervals)
-        if mean_interval == 0 or not np.isfinite(mean_interval):
-            return None
-
-        std_interval = np.std(intervals)
-        interval_cv = std_interval / mean_interval
-
-        # Filter by regularity
-        if interval_cv > self.interval_cv_threshold:
-            return None
-
-        # Amount analysis
-        amounts = np.array([t['amount'] for t in txs])
-        amount_mean = float(np.mean(amounts))
-        amount_std = float(np.std(amounts))
-        amount_type = self._classify_amount_type(amounts)
-
-        # Representative description
-        desc_counter = Counter(t['description'] for t in txs)
-        description_pattern = desc_counter.most_common(1)[0][0]
-        sample_descriptions = [
-            desc for desc, _ in desc_counter.most_common(5)
-        ]
+        ids, micros, whens, amounts, desc_codes, descriptions, cat_ids, cat_names = columns
+        abs_amounts = np.abs(amounts)
+        n_clusters = labels.max() + 1
+        if n_clusters <= 0:
+            return []
 
-        # Category inference: most common non-null category
-        cat_counter = Counter(
-            (t['category_id'], t['category_name'])
-            for t in txs
-            if t['category_id'] is not None
+        # Whole clusters first: only sub-group by amount if the cluster
+        # doesn't already pass the regularity test as a whole. This avoids
+        # over-splitting series where the same payee has slight amount
+        # variations.
+        clustered = np.flatnonzero(labels != -1)
+        cluster_rows = clustered[np.argsort(labels[clustered], kind='stable')]
+        sizes = np.bincount(labels[clustered], minlength=n_clusters)
+        starts = np.cumsum(sizes) - sizes
+        regular = np.zeros(n_clusters, dtype=bool)
+        testable = np.flatnonzero(sizes >= 2)
+        if len(testable):
+            in_testable = np.repeat(sizes >= 2, sizes)
+            testable_sizes = sizes[testable]
+            _, cv = self._interval_stats(
+                micros[cluster_rows[in_testable]],
+                np.cumsum(testable_sizes) - testable_sizes,
+            )
+            regular[testable] = cv <= self.interval_cv_threshold
+
+        sub_ids = np.zeros(len(labels), dtype=np.int64)
+        split = np.zeros(n_clusters, dtype=bool)
+        for cluster_id in np.flatnonzero(~regular & (sizes > 0)):
+            rows = cluster_rows[starts[cluster_id]:starts[cluster_id] + sizes[cluster_id]]
+            cluster_sub_ids = self._sub_group_by_amount(abs_amounts[rows])
+            sub_ids[rows] = cluster_sub_ids
+            split[cluster_id] = cluster_sub_ids.max() > 0
+
+        # Groups of at least min_cluster_size, in (cluster, sub-group) order
+        n = len(labels)
+        keys = labels * (n + 1) + sub_ids
+        in_group = (labels != -1) & (sub_ids != -1)
+        group_keys, group_sizes = np.unique(keys[in_group], return_counts=True)
+        group_keys = group_keys[group_sizes >= max(self.min_cluster_size, 2)]
+        in_group &= np.isin(keys, group_keys)
+        rows = np.flatnonzero(in_group)
+        if not len(rows):
+            return []
+        row_groups = np.searchsorted(group_keys, keys[rows])
+        order = np.argsort(row_groups, kind='stable')
+        rows, row_groups = rows[order], row_groups[order]
+        counts = np.bincount(row_groups, minlength=len(group_keys))
+        starts = np.cumsum(counts) - counts
+
+        mean_intervals, interval_cvs = self._interval_stats(micros[rows], starts)
+        amount_means, amount_stds = self._group_stats(amounts[rows], starts)
+        amount_types = self._classify_amount_types(*self._group_stats(abs_amounts[rows], starts))
+        top_descriptions = self._top_values(row_groups, desc_codes[rows], len(group_keys), 5)
+        categorised = cat_ids[rows] != -1
+        top_categories = self._top_values(
+            row_groups[categorised], cat_ids[rows][categorised], len(group_keys), 1
         )
-        if cat_counter:
-            (cat_id, cat_name), _ = cat_counter.most_common(1)[0]
-        else:
-            cat_id, cat_name = None, None
-
-        # Frequency classification
-        frequency = self._classify_frequency(mean_interval)
-
-        # Regularity score
-        regularity_score = max(0.0, 1.0 - interval_cv)
-
-        # Build group ID: if sub-grouped, use "cluster_id.sub_id"
-        group_id = cluster_id if sub_id is None else cluster_id * 100 + sub_id
-
-        return {
-            'cluster_id': int(group_id),
-            'description_pattern': description_pattern,
-            'sample_descriptions': sample_descriptions,
-            'frequency': frequency,
-            'mean_interval_days': round(float(mean_interval), 1),
-            'interval_cv': round(float(interval_cv), 3),
-            'regularity_score': round(float(regularity_score), 3),
-            'amount_mean': round(amount_mean, 2),
-            'amount_std': round(amount_std, 2),
-            'amount_type': amount_type,
-            'is_income': amount_mean > 0,
-            'transaction_count': len(txs),
-            'transaction_ids': [t['id'] for t in txs],
-            'first_date': txs[0]['when'].date() if hasattr(txs[0]['when'], 'date') else txs[0]['when'],
-            'last_date': txs[-1]['when'].date() if hasattr(txs[-1]['when'], 'date') else txs[-1]['when'],
-            'category': cat_id,
-            'category_name': cat_name,
-        }
-
-    def detect(self, transactions_qs):
-        """Detect recurring transaction groups from a queryset.
+        category_names = dict(zip(cat_ids.tolist(), cat_names))
 
-        Args:
-            transactions_qs: A Transaction queryset (should already be filtered
-                for date range, is_split=False, description not null/empty).
+        groups = []
+        for group, key in enumerate(group_keys.tolist()):
+            cluster_id, sub_id = divmod(key, n + 1)
+            interval_cv = interval_cvs[group]
+            # Filter by regularity
+            if not interval_cv <= self.interval_cv_threshold:
+                continue
+            start, end = starts[group], starts[group] + counts[group]
+            first_when, last_when = whens[rows[start]], whens[rows[end - 1]]
+            if top_categories[group]:
+                cat_id = top_categories[group][0]
+                cat_name = category_names[cat_id]
+            else:
+                cat_id, cat_name = None, None
+            amount_mean = float(amount_means[group])
+            # Build group ID: if sub-grouped, use "cluster_id.sub_id"
+            group_id = cluster_id * 100 + sub_id if split[cluster_id] else cluster_id
+            groups.append({
+                'cluster_id': int(group_id),
+                'description_pattern': descriptions[top_descriptions[group][0]],
+                'sample_descriptions': [descriptions[code] for code in top_descriptions[group]],
+                'frequency': self._classify_frequency(mean_intervals[group]),
+                'mean_interval_days': round(float(mean_intervals[group]), 1),
+                'interval_cv': round(float(interval_cv), 3),
+                'regularity_score': round(float(max(0.0, 1.0 - interval_cv)), 3),
+                'amount_mean': round(amount_mean, 2),
+                'amount_std': round(float(amount_stds[group]), 2),
+                'amount_type': str(amount_types[group]),
+                'is_income': amount_mean > 0,
+                'transaction_count': int(counts[group]),
+                'transaction_ids': ids[rows[start:end]].tolist(),
+                'first_date': first_when.date() if hasattr(first_when, 'date') else first_when,
+                'last_date': last_when.date() if hasattr(last_when, 'date') else last_when,
+                'category': cat_id,
+                'category_name': cat_name,
+            })
+        return groups
 
-        Returns:
-            List of dicts, each representing a detected recurring group.
+    def runs_parallel(self, labels):
+        """Whether the analysis of clusters ``labels`` uses a process pool."""
+        return self.workers > 1 and np.count_nonzero(labels != -1) >= PARALLEL_MIN_TRANSACTIONS
+
+    def _analyze_sharded(self, columns, labels):
+        """Run ``_analyze_clusters``, across a process pool if configured."""
+        if not self.runs_parallel(labels):
+            return self._analyze_clusters(columns, labels)
+
+        shards = shard_clusters(labels, self.workers)
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            results = executor.map(
+                self._analyze_clusters,
+                [take_rows(columns, rows) for rows in shards],
+                [labels[rows] for rows in shards],
+            )
+            return [group for shard_groups in results for group in shard_groups]
+
+    # Parameters that change the output of ``cluster_descriptions``.
+    TEXT_PARAMS = ('min_cluster_size', 'cosine_distance_threshold', 'lsh_bands', 'lsh_rows')
+
+    def text_params(self):
+        """The parameters the description clustering depends on, for cache keys."""
+        return tuple(getattr(self, name) for name in self.TEXT_PARAMS)
+
+    def cluster_descriptions(self, transactions_qs):
+        """Run the text stage: cluster transactions by description.
+
+        Returns ``(columns, labels)`` for ``analyze``, or None when there are
+        too few transactions or no usable description tokens. The result
+        depends only on the transactions and ``text_params``, so it can be
+        kept and re-analysed with other regularity and amount settings.
         """
+        start = time.perf_counter()
         transactions = list(
             transactions_qs.values_list(
                 'id', 'when', 'amount', 'description', 'category', 'category__name'
             ).order_by('when')
         )
+        clusters = self.cluster_rows(transactions)
+        self.timings['text'] = time.perf_counter() - start
+        return clusters
+
+    def cluster_rows(self, transactions):
+        """``cluster_descriptions`` on already fetched transactions.
 
+        ``transactions`` are ``(id, when, amount, description, category id,
+        category name)`` tuples in date order.
+        """
         if len(transactions) < self.min_cluster_size:
-            return []
+            return None
 
         # Extract descriptions, filtering out any remaining empties
-        tx_data = []
-        for tx_id, when, amount, desc, cat_id, cat_name in transactions:
-            if desc and desc.strip():
-                tx_data.append({
-                    'id': tx_id,
-                    'when': when,
-                    'amount': float(amount),
-                    'description': desc.strip(),
-                    'category_id': cat_id,
-                    'category_name': cat_name,
-                })
-
-        if len(tx_data) < self.min_cluster_size:
-            return []
+        rows = [
+            (tx_id, when, float(amount), desc.strip(), cat_id, cat_name)
+            for tx_id, when, amount, desc, cat_id, cat_name in transactions
+            if desc and desc.strip()
+        ]
 
-        descriptions = [t['description'] for t in tx_data]
+        if len(rows) < self.min_cluster_size:
+            return None
+
+        ids, whens, amounts, descriptions, cat_ids, cat_names = zip(*rows)
 
         # Step 1: TF-IDF vectorization
         # Use max_df=1.0 because recurring transactions often have identical
@@ -255,52 +497,92 @@ class RecurringTransactionDetector:
         vectorizer = TfidfVectorizer(
             lowercase=True,
             token_pattern=r'(?u)\b\w+\b',
-            min_df=min(2, len(tx_data)),
+            min_df=min(2, len(rows)),
             max_df=1.0 if n_unique < 20 else 0.95,
         )
+        # Descriptions with the same tokens have the same TF-IDF vector, so
+        # only the distinct ones are clustered, each weighted by how many
+        # transactions share it. Identical vectors are always neighbours, so
+        # core points and, with distinct descriptions in order of first
+        # appearance, the cluster numbering match clustering every row.
+        analyzer = vectorizer.build_analyzer()
+        distinct = {}
+        inverse = np.array([
+            distinct.setdefault(tuple(analyzer(desc)), len(distinct))
+            for desc in descriptions
+        ])
+        first_seen = np.unique(inverse, return_index=True)[1]
+        multiplicity = np.bincount(inverse)
         try:
-            tfidf_matrix = vectorizer.fit_transform(descriptions)
+            # Fit on every row so document frequencies count duplicates.
+            vectorizer.fit(descriptions)
+            tfidf_matrix = vectorizer.transform([descriptions[i] for i in first_seen])
         except ValueError:
             # No features extracted (all descriptions are stop words, etc.)
-            return []
+            return None
 
         # Step 2: DBSCAN clustering by description similarity
-        from sklearn.metrics.pairwise import cosine_distances
-        dist_matrix = cosine_distances(tfidf_matrix)
+        # Only pairs within eps are stored, so memory grows with the number
+        # of similar pairs rather than with n squared.
+        if self.lsh_bands:
+            first, second = lsh_candidate_pairs(tfidf_matrix, self.lsh_bands, self.lsh_rows)
+            dist_matrix = cosine_pair_graph(
+                tfidf_matrix, first, second, self.cosine_distance_threshold
+            )
+        else:
+            dist_matrix = cosine_radius_graph(tfidf_matrix, self.cosine_distance_threshold)
         clustering = DBSCAN(
             eps=self.cosine_distance_threshold,
             min_samples=self.min_cluster_size,
             metric='precomputed',
         )
-        labels = clustering.fit_predict(dist_matrix)
+        labels = clustering.fit_predict(dist_matrix, sample_weight=multiplicity)[inverse]
+
+        # Columns for step 3
+        desc_values, desc_codes = np.unique(descriptions, return_inverse=True)
+        columns = (
+            np.array(ids, dtype=np.int64),
+            pd.to_datetime(list(whens), utc=True).as_unit('us').asi8,
+            whens,
+            np.array(amounts),
+            desc_codes.ravel(),
+            [str(desc) for desc in desc_values],
+            np.array([-1 if cat_id is None else cat_id for cat_id in cat_ids], dtype=np.int64),
+            cat_names,
+        )
+        return columns, labels
 
-        # Step 3: For each description cluster, sub-group by amount,
-        # then analyze each sub-group for regularity
-        groups = []
-        unique_labels = set(labels)
-        unique_labels.discard(-1)  # Remove noise label
-
-        for cluster_id in sorted(unique_labels):
-            cluster_indices = [i for i, lbl in enumerate(labels) if lbl == cluster_id]
-            cluster_txs = [tx_data[i] for i in cluster_indices]
-
-            # Only sub-group by amount if the cluster doesn't already pass
-            # the regularity test as a whole. This avoids over-splitting
-            # series where the same payee has slight amount variations.
-            if self._is_regular(cluster_txs):
-                sub_groups = [cluster_txs]
-            else:
-                sub_groups = self._sub_group_by_amount(cluster_txs)
+    def analyze(self, clusters):
+        """Run the analysis stage on the output of ``cluster_descriptions``.
 
-            for sub_id, sub_txs in enumerate(sub_groups):
-                if len(sub_txs) < self.min_cluster_size:
-                    continue
+        Returns the detected groups, most regular first.
+        """
+        if clusters is None:
+            return []
+        start = time.perf_counter()
+        columns, labels = clusters
 
-                use_sub_id = sub_id if len(sub_groups) > 1 else None
-                result = self._analyze_group(sub_txs, cluster_id, use_sub_id)
-                if result is not None:
-                    groups.append(result)
+        # Step 3: For each description cluster, sub-group by amount,
+        # then analyze each sub-group for regularity
+        groups = self._analyze_sharded(columns, labels)
+        self.timings.update(analysis=time.perf_counter() - start, workers=self.workers)
+        logger.info("Recurring detection on %d transactions: text %.2fs, analysis %.2fs "
+                    "with %d worker(s)", len(labels), self.timings.get('text', 0.0),
+                    self.timings['analysis'], self.workers)
 
         # Sort by regularity score descending
         groups.sort(key=lambda g: g['regularity_score'], reverse=True)
         return groups
+
+    def detect(self, transactions_qs):
+        """Detect recurring transaction groups from a queryset.
+
+        Args:
+            transactions_qs: A Transaction queryset (should already be filtered
+                for date range, is_split=False, description not null/empty).
+
+        Returns:
+            List of dicts, each representing a detected recurring group.
+        """
+        self.timings = {}
+        return self.analyze(self.cluster_descriptions(transactions_qs))
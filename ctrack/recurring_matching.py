@@ -0,0 +1,165 @@
+"""Attach newly imported transactions to existing recurring payment series.
+
+``detect_recurring`` finds series by clustering a whole history. Once a
+series exists, later payments to it can be recognised one at a time: the
+payment has the same description signature as the series' past payments,
+an amount close to the last bill and falls near the next expected due date.
+``RecurringSeriesIndex`` holds that information for every series, keyed by
+signature, so a batch of new transactions is matched without reclustering.
+"""
+import re
+from datetime import timedelta
+
+from django.db import transaction as db_transaction
+
+from ctrack.models import Bill, RecurringPayment, utc_day
+
+
+# Fraction of the last bill amount a payment may differ by.
+AMOUNT_TOLERANCE = 0.10
+
+# Half-width of the due window as a fraction of the mean interval, and the
+# smallest half-width in days.
+DUE_WINDOW_FRACTION = 0.25
+MIN_DUE_WINDOW_DAYS = 3
+
+TOKEN_RE = re.compile(r'(?u)\b\w+\b')
+
+
+def description_signature(description):
+    """Normalised signature of a description for matching series.
+
+    The sorted set of lower-case tokens, leaving out tokens containing
+    digits (receipt numbers, dates, card suffixes) that change between
+    otherwise identical payments.
+    """
+    tokens = {
+        token for token in TOKEN_RE.findall((description or '').lower())
+        if not any(char.isdigit() for char in token)
+    }
+    return ' '.join(sorted(tokens))
+
+
+class SeriesState:
+    """Schedule of one series as needed for matching, updated as bills are added."""
+
+    def __init__(self, pk, name, is_income, last_due_date, last_amount, mean_interval):
+        self.pk = pk
+        self.name = name
+        self.is_income = is_income
+        self.last_due_date = last_due_date
+        self.last_amount = abs(float(last_amount))
+        self.mean_interval = mean_interval
+
+    def expected_due(self, day):
+        """The due date nearest ``day`` after the last bill, or None if ``day`` is not later."""
+        if day <= self.last_due_date:
+            return None
+        periods = max(1, round((day - self.last_due_date).days / self.mean_interval))
+        return self.last_due_date + timedelta(days=round(periods * self.mean_interval))
+
+    def match(self, day, amount):
+        """Return how far ``day`` is from the expected due date, or None if no match."""
+        amount = float(amount)
+        if (amount > 0) != self.is_income:
+            return None
+        if abs(abs(amount) - self.last_amount) > self.last_amount * AMOUNT_TOLERANCE:
+            return None
+        expected = self.expected_due(day)
+        if expected is None:
+            return None
+        distance = abs((day - expected).days)
+        window = max(MIN_DUE_WINDOW_DAYS, DUE_WINDOW_FRACTION * self.mean_interval)
+        return distance if distance <= window else None
+
+    def add(self, day, amount):
+        self.last_due_date = day
+        self.last_amount = abs(float(amount))
+
+
+class RecurringSeriesIndex:
+    """Recurring series with a schedule, indexed by payment description signature."""
+
+    def __init__(self, series):
+        # {signature: [SeriesState, ...]}
+        self.series = series
+
+    @classmethod
+    def load(cls):
+        """Load every series with at least two bills in two queries."""
+        states = {
+            pk: SeriesState(pk, name, is_income, last_due_date, last_amount, mean_interval)
+            for pk, name, is_income, last_due_date, last_amount, mean_interval in (
+                RecurringPayment.objects
+                .filter(mean_interval__gt=0, last_due_date__isnull=False, last_amount__isnull=False)
+                .values_list('pk', 'name', 'is_income', 'last_due_date', 'last_amount', 'mean_interval')
+            )
+        }
+        series = {}
+        descriptions = (
+            Bill.paying_transactions.through.objects
+            .filter(bill__series__in=list(states))
+            .values_list('bill__series', 'transaction__description')
+            .distinct()
+        )
+        for series_pk, description in descriptions:
+            signature = description_signature(description)
+            if not signature:
+                # Would match every payment with a missing or numeric description.
+                continue
+            candidates = series.setdefault(signature, [])
+            if states[series_pk] not in candidates:
+                candidates.append(states[series_pk])
+        return cls(series)
+
+    def match(self, trans):
+        """The series ``trans`` continues, or None.
+
+        Among series with the same signature, amount band and due window,
+        the one whose expected due date is nearest wins.
+        """
+        signature = description_signature(trans.description)
+        if not signature:
+            return None
+        day = utc_day(trans.when)
+        matches = []
+        for state in self.series.get(signature, []):
+            distance = state.match(day, trans.amount)
+            if distance is not None:
+                amount_gap = abs(abs(float(trans.amount)) - state.last_amount)
+                matches.append((distance, amount_gap, state.pk, state))
+        if not matches:
+            return None
+        return min(matches, key=lambda match: match[:3])[-1]
+
+
+def match_transactions(transactions, index=None):
+    """Attach each of ``transactions`` that continues a series as a new bill.
+
+    Transactions are taken in date order and a match moves its series'
+    last due date on, so a batch covering several periods fills each one.
+    Bills, their paying transaction links and the schedules are written in
+    bulk. Returns the created bills.
+    """
+    if not transactions:
+        return []
+    if index is None:
+        index = RecurringSeriesIndex.load()
+    if not index.series:
+        return []
+
+    matched = []
+    for trans in sorted(transactions, key=lambda trans: (trans.when, trans.pk)):
+        state = index.match(trans)
+        if state is not None:
+            state.add(utc_day(trans.when), trans.amount)
+            matched.append((state, trans))
+    if not matched:
+        return []
+
+    with db_transaction.atomic():
+        bills = Bill.bulk_create_paid(matched)
+        # bulk_create skips the signals that keep schedules current.
+        for series_pk in {state.pk for state, _ in matched}:
+            RecurringPayment.refresh_schedule(series_pk)
+    return bills
@@ -0,0 +1,170 @@
+"""Signal handlers keeping denormalised data in step with its sources."""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from ctrack.models import (
+    BalancePoint,
+    Bill,
+    BudgetEntry,
+    Category,
+    CategoryMonthTotal,
+    CategoryGroup,
+    DailyBalance,
+    DataVersion,
+    PeriodDefinition,
+    RecurringPayment,
+    SplitTransaction,
+    Transaction,
+    BALANCE_ATTNAMES,
+    BALANCE_FIELDS,
+    ROLLUP_FIELDS,
+    utc_day,
+)
+
+
+def transaction_balance_changes(instance, update_fields=None):
+    """Return ``{account_id: earliest_day}`` whose balance a save affected."""
+    if update_fields is not None and not set(update_fields) & set(BALANCE_FIELDS + BALANCE_ATTNAMES):
+        return {}
+
+    changes = {instance.account_id: utc_day(instance.when)}
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded:
+        if all(loaded.get(name) == getattr(instance, name) for name in BALANCE_ATTNAMES):
+            return {}
+        old_account, old_day = loaded['account_id'], utc_day(loaded['when'])
+        changes[old_account] = min(changes.get(old_account, old_day), old_day)
+    return changes
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=SplitTransaction)
+def transaction_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    for account_id, day in transaction_balance_changes(instance, update_fields).items():
+        DailyBalance.mark_dirty(account_id, day)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=SplitTransaction)
+def transaction_deleted(sender, instance, **kwargs):
+    DailyBalance.mark_dirty(instance.account_id, utc_day(instance.when))
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=SplitTransaction)
+def transaction_saved_rollup(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not ROLLUP_FIELDS & set(update_fields):
+        return
+    CategoryMonthTotal.refresh_months(CategoryMonthTotal.months_for([instance]))
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=SplitTransaction)
+def transaction_deleted_rollup(sender, instance, **kwargs):
+    CategoryMonthTotal.refresh_months(CategoryMonthTotal.months_for([instance]))
+
+
+@receiver(post_save, sender=BalancePoint)
+@receiver(post_delete, sender=BalancePoint)
+def balance_point_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    DailyBalance.mark_dirty(instance.account_id)
+
+
+@receiver(post_save, sender=Bill)
+@receiver(post_delete, sender=Bill)
+def bill_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    series_ids = {instance.series_id, getattr(instance, '_loaded_series_id', None)}
+    for series_id in series_ids - {None}:
+        RecurringPayment.refresh_schedule(series_id)
+    instance._loaded_series_id = instance.series_id
+
+
+@receiver(post_save, sender=Bill)
+def bill_saved_paid_state(sender, instance, created=False, raw=False, **kwargs):
+    # A new bill has no payments yet; an edited one may hold a stale
+    # paid_amount or a new due_amount, so recompute from the links.
+    if raw or created:
+        return
+    Bill.refresh_paid_amounts([instance.pk])
+
+
+@receiver(m2m_changed, sender=Bill.paying_transactions.through)
+def bill_payments_changed(sender, instance, action, reverse, pk_set=None, **kwargs):
+    if reverse:
+        # ``instance`` is a transaction and ``pk_set`` holds bills; a clear
+        # only says which bills it touched beforehand.
+        if action == 'pre_clear':
+            instance._cleared_bill_ids = list(instance.pays_bill.values_list('pk', flat=True))
+        elif action in ('post_add', 'post_remove'):
+            Bill.refresh_paid_amounts(list(pk_set))
+        elif action == 'post_clear':
+            Bill.refresh_paid_amounts(getattr(instance, '_cleared_bill_ids', []))
+        return
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        Bill.refresh_paid_amounts([instance.pk])
+        instance.paid_amount, instance.is_paid = (
+            Bill.objects.values_list('paid_amount', 'is_paid').get(pk=instance.pk)
+        )
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved_bills(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw or created:
+        return
+    if update_fields is not None and 'amount' not in update_fields:
+        return
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded and loaded.get('amount') == instance.amount:
+        return
+    Bill.refresh_paid_amounts(Bill.objects.filter(paying_transactions=instance.pk).values('pk'))
+
+
+@receiver(pre_delete, sender=Transaction)
+def transaction_deleting_bills(sender, instance, **kwargs):
+    # The links to the bills are deleted along with the transaction.
+    instance._paid_bill_ids = list(instance.pays_bill.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted_bills(sender, instance, **kwargs):
+    if instance._paid_bill_ids:
+        Bill.refresh_paid_amounts(instance._paid_bill_ids)
+
+
+@receiver(post_save, sender=PeriodDefinition)
+@receiver(post_delete, sender=PeriodDefinition)
+def period_definition_changed(sender, instance, **kwargs):
+    PeriodDefinition.forget_periods(instance.pk)
+    instance._periods = None
+
+
+# Models whose writes change cached summaries such as /api/progress/.
+VERSIONED_MODELS = (Transaction, SplitTransaction, Category, CategoryGroup,
+                    BudgetEntry, Bill, RecurringPayment)
+
+
+def bump_data_version(sender, raw=False, **kwargs):
+    if raw:
+        return
+    DataVersion.bump()
+
+
+def bump_data_version_m2m(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        DataVersion.bump()
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_data_version, sender=model, dispatch_uid=f'data_version_save_{model.__name__}')
+    post_delete.connect(bump_data_version, sender=model, dispatch_uid=f'data_version_delete_{model.__name__}')
+for through in (BudgetEntry.categories.through, CategoryGroup.categories.through):
+    m2m_changed.connect(bump_data_version_m2m, sender=through,
+                        dispatch_uid=f'data_version_m2m_{through.__name__}')
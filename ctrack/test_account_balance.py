@@ -0,0 +1,263 @@
+"""Tests for ``Account.daily_balance`` and the materialised ``DailyBalance`` rows."""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytz
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.test import TestCase
+
+from ctrack import models
+
+
+class DailyBalanceTestCase(TestCase):
+    def setUp(self):
+        self.account = models.Account.objects.create(name="Everyday")
+        with self.captureOnCommitCallbacks(execute=True):
+            for day, hour, amount in [
+                (1, 0, "100.00"),
+                (1, 15, "-20.50"),
+                (3, 0, "-9.50"),
+                (6, 12, "50.00"),
+            ]:
+                models.Transaction.objects.create(
+                    when=datetime(2024, 3, day, hour, tzinfo=pytz.utc),
+                    account=self.account,
+                    amount=Decimal(amount),
+                    description="txn",
+                )
+
+    def test_empty_account(self):
+        other = models.Account.objects.create(name="Empty")
+        self.assertEqual(len(other.daily_balance()), 0)
+        self.assertIsNone(other.balance)
+        self.assertEqual(len(other.daily_balance(to_date=date(2024, 3, 4))), 0)
+
+    def test_to_date_before_first_transaction(self):
+        self.assertEqual(len(self.account.daily_balance(to_date=date(2024, 2, 1))), 0)
+
+    def test_end_of_day_balance(self):
+        series = self.account.daily_balance()
+        self.assertEqual(list(series.index.date), [date(2024, 3, day) for day in range(1, 7)])
+        self.assertEqual(list(series), [79.5, 79.5, 70.0, 70.0, 70.0, 120.0])
+        self.assertEqual(self.account.balance, 120.0)
+
+    def test_starts_from_balance_point(self):
+        models.BalancePoint.objects.create(
+            account=self.account, ref_date=date(2024, 3, 2), balance=Decimal("1000.00"),
+        )
+        series = self.account.daily_balance()
+        self.assertEqual(series.index[0].date(), date(2024, 3, 3))
+        self.assertEqual(list(series), [990.5, 990.5, 990.5, 1040.5])
+
+    def test_excludes_split_transactions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Transaction.objects.create(
+                when=datetime(2024, 3, 6, tzinfo=pytz.utc), account=self.account,
+                amount=Decimal("-500.00"), is_split=True,
+            )
+        self.assertEqual(self.account.balance, 120.0)
+
+    def test_bounds(self):
+        series = self.account.daily_balance(from_date=date(2024, 3, 2), to_date=date(2024, 3, 4))
+        self.assertEqual(list(series.index.date), [date(2024, 3, 2), date(2024, 3, 3), date(2024, 3, 4)])
+        self.assertEqual(list(series), [79.5, 70.0, 70.0])
+
+    def test_bounds_without_transactions_in_range(self):
+        series = self.account.daily_balance(from_date=date(2024, 4, 1), to_date=date(2024, 4, 2))
+        self.assertEqual(list(series), [120.0, 120.0])
+
+
+class MaterialisedBalanceTestCase(TestCase):
+    def setUp(self):
+        self.account = models.Account.objects.create(name="Everyday")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.transactions = [
+                models.Transaction.objects.create(
+                    when=datetime(2024, 3, day, tzinfo=pytz.utc),
+                    account=self.account,
+                    amount=Decimal("10.00"),
+                    description="txn",
+                )
+                for day in (1, 3, 5)
+            ]
+
+    def assertMatchesRaw(self):
+        stored = self.account.balance_history()
+        raw = self.account.daily_balance()
+        self.assertEqual(list(stored.index), list(raw.index))
+        self.assertEqual(list(stored), list(raw))
+
+    def stored_days(self):
+        return list(models.DailyBalance.objects.filter(account=self.account).values_list("day", flat=True))
+
+    def test_rows_written_on_insert(self):
+        self.assertEqual(self.stored_days(), [date(2024, 3, day) for day in range(1, 6)])
+        self.assertMatchesRaw()
+
+    def test_update_only_recomputes_from_affected_day(self):
+        untouched = models.DailyBalance.objects.get(account=self.account, day=date(2024, 3, 2))
+        txn = self.transactions[1]
+        txn.amount = Decimal("-5.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            txn.save()
+
+        self.assertEqual(models.DailyBalance.objects.get(account=self.account, day=date(2024, 3, 2)).pk,
+                         untouched.pk)
+        self.assertMatchesRaw()
+        self.assertEqual(self.account.balance, 15.0)
+
+    def test_moving_transaction_earlier(self):
+        txn = models.Transaction.objects.get(pk=self.transactions[2].pk)
+        txn.when = datetime(2024, 2, 27, tzinfo=pytz.utc)
+        with self.captureOnCommitCallbacks(execute=True):
+            txn.save()
+
+        self.assertEqual(self.stored_days()[0], date(2024, 2, 27))
+        self.assertMatchesRaw()
+
+    def test_category_only_save_leaves_rows(self):
+        category = models.Category.objects.create(name="Food")
+        txn = models.Transaction.objects.get(pk=self.transactions[0].pk)
+        txn.category = category
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            txn.save(update_fields=["category"])
+        self.assertEqual(callbacks, [])
+
+    def test_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.transactions[2].delete()
+        self.assertEqual(self.stored_days()[-1], date(2024, 3, 3))
+        self.assertEqual(self.account.balance, 20.0)
+
+    def test_bulk_create(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Transaction.objects.bulk_create([
+                models.Transaction(when=datetime(2024, 2, 28, tzinfo=pytz.utc), account=self.account,
+                                   amount=Decimal("-4.00"), description="txn"),
+                models.Transaction(when=datetime(2024, 3, 4, tzinfo=pytz.utc), account=self.account,
+                                   amount=Decimal("-1.00"), description="txn"),
+            ])
+        self.assertEqual(self.stored_days()[0], date(2024, 2, 28))
+        self.assertMatchesRaw()
+        self.assertEqual(self.account.balance, 25.0)
+
+    def test_bulk_update(self):
+        other = models.Account.objects.create(name="Savings")
+        transactions = list(models.Transaction.objects.order_by("when"))
+        for txn in transactions:
+            txn.amount = Decimal("-5.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Transaction.objects.bulk_update(transactions, ["amount"])
+        raw = models.Transaction.objects.filter(account=self.account).aggregate(total=Sum("amount"))["total"]
+        self.assertEqual(raw, Decimal("-15.00"))
+        self.assertEqual(self.account.balance, float(raw))
+        self.assertMatchesRaw()
+
+        # Moving a transaction refreshes the account and day it came from.
+        moved = models.Transaction.objects.get(pk=self.transactions[0].pk)
+        moved.account = other
+        moved.when = datetime(2024, 3, 6, tzinfo=pytz.utc)
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Transaction.objects.bulk_update([moved], ["account", "when"])
+        self.assertEqual(self.account.balance, -10.0)
+        self.assertEqual(other.balance, -5.0)
+        self.assertMatchesRaw()
+
+    def test_balance_point_rebuilds(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            models.BalancePoint.objects.create(
+                account=self.account, ref_date=date(2024, 3, 2), balance=Decimal("100.00"),
+            )
+        self.assertEqual(self.stored_days(), [date(2024, 3, day) for day in range(3, 6)])
+        self.assertMatchesRaw()
+        self.assertEqual(self.account.balance, 120.0)
+
+    def test_refresh_with_balance_point_after_transactions(self):
+        models.BalancePoint.objects.create(
+            account=self.account, ref_date=date(2024, 4, 1), balance=Decimal("10.00"),
+        )
+        models.DailyBalance.refresh(self.account.pk)
+        self.assertFalse(self.account.daily_balances.exists())
+
+    def test_account_delete_cascades(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.delete()
+        self.assertFalse(models.DailyBalance.objects.exists())
+
+    def test_list_endpoint_reads_stored_balance(self):
+        user = User.objects.create_user(username="u", password="p")
+        self.client.force_login(user)
+        with self.assertNumQueries(3):
+            result = self.client.get("/api/accounts/")
+        self.assertEqual(result.json()[0]["balance"], 30.0)
+
+
+class SeriesEndpointTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_login(self.user)
+        self.account = models.Account.objects.create(name="Everyday")
+        with self.captureOnCommitCallbacks(execute=True):
+            # Alternating deposits and withdrawals every day of Jan-Mar 2024.
+            for offset in range(91):
+                models.Transaction.objects.create(
+                    when=datetime(2024, 1, 1, tzinfo=pytz.utc) + timedelta(days=offset),
+                    account=self.account,
+                    amount=Decimal("100.00") if offset % 2 == 0 else Decimal("-60.00"),
+                    description="txn",
+                )
+        self.url = "/api/accounts/{}/series/".format(self.account.pk)
+
+    def get(self, **params):
+        result = self.client.get(self.url, params)
+        self.assertEqual(result.status_code, 200)
+        return result.json()
+
+    def test_default_is_daily(self):
+        data = self.get()
+        self.assertEqual(len(data), 91)
+        self.assertEqual(data[0]["label"], "2024-01-01T00:00:00Z")
+        self.assertEqual(data[-1]["value"], "1900.00")
+
+    def test_range(self):
+        data = self.get(from_date="2024-02-01", to_date="2024-02-10")
+        self.assertEqual(len(data), 10)
+        self.assertEqual(data[0]["label"], "2024-02-01T00:00:00Z")
+        self.assertEqual(data[-1]["label"], "2024-02-10T00:00:00Z")
+
+    def test_month_resolution_keeps_closing_balance(self):
+        data = self.get(resolution="month")
+        self.assertEqual([point["label"][:10] for point in data],
+                         ["2024-01-31", "2024-02-29", "2024-03-31"])
+        self.assertEqual(data[-1]["value"], "1900.00")
+
+    def test_week_resolution(self):
+        data = self.get(resolution="week", from_date="2024-01-01", to_date="2024-01-21")
+        # 2024-01-01 is a Monday, so each week closes on a Sunday.
+        self.assertEqual([point["label"][:10] for point in data],
+                         ["2024-01-07", "2024-01-14", "2024-01-21"])
+
+    def test_max_points_preserves_extremes(self):
+        daily = self.get()
+        data = self.get(max_points=10)
+        self.assertLessEqual(len(data), 10)
+        values = [float(point["value"]) for point in data]
+        self.assertEqual(max(values), max(float(point["value"]) for point in daily))
+        self.assertEqual(min(values), min(float(point["value"]) for point in daily))
+        labels = [point["label"] for point in data]
+        self.assertEqual(labels, sorted(labels))
+
+    def test_empty_account(self):
+        empty = models.Account.objects.create(name="Empty")
+        result = self.client.get("/api/accounts/{}/series/".format(empty.pk), {"to_date": "2024-02-01"})
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json(), [])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {"resolution": "hour"}).status_code, 400)
+        self.assertEqual(
+            self.client.get(self.url, {"from_date": "2024-03-01", "to_date": "2024-02-01"}).status_code,
+            400,
+        )
@@ -347,3 +347,76 @@ class CategoryGroupAPITestCase(APITestCase):
         if len(response.data) > 0:
             total = sum(float(item["value"]) for item in response.data)
             self.assertEqual(total, 50.00)
+
+    def test_weekly_summary_fills_empty_weeks(self):
+        """Weeks without transactions between active ones are reported as zero."""
+        group = models.CategoryGroup.objects.create(name="Test Group")
+        group.categories.add(self.cat1, self.cat2)
+        for day, amount, category in [(5, 10, self.cat1), (6, 5, self.cat2), (27, 7, self.cat1)]:
+            models.Transaction.objects.create(
+                when=datetime(2026, 1, day, 12, 0, tzinfo=pytz.utc),
+                account=self.account, amount=amount, category=category,
+                description="Spend",
+            )
+
+        response = self.client.get(
+            f"/api/category-groups/{group.id}/weekly_summary/",
+            {"from_date": "2026-01-01", "to_date": "2026-01-31"},
+        )
+
+        self.assertEqual(
+            [(item["label"], float(item["value"])) for item in response.data],
+            [("2026-01-07T00:00:00Z", 15.0), ("2026-01-14T00:00:00Z", 0.0),
+             ("2026-01-21T00:00:00Z", 0.0), ("2026-01-28T00:00:00Z", 7.0)],
+        )
+
+    def test_weekly_summary_several_groups(self):
+        """The list route summarises several groups with one spend query."""
+        food = models.CategoryGroup.objects.create(name="Food")
+        food.categories.add(self.cat1, self.cat2)
+        everything = models.CategoryGroup.objects.create(name="Everything")
+        everything.categories.add(self.cat1, self.cat2, self.cat3)
+        idle = models.CategoryGroup.objects.create(name="Idle")
+        for day, amount, category in [(5, 10, self.cat1), (9, 5, self.cat2), (9, 3, self.cat3)]:
+            models.Transaction.objects.create(
+                when=datetime(2026, 1, day, 12, 0, tzinfo=pytz.utc),
+                account=self.account, amount=amount, category=category,
+                description="Spend",
+            )
+        params = {
+            "ids": f"{food.id},{everything.id},{idle.id}",
+            "from_date": "2026-01-01", "to_date": "2026-01-31",
+        }
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/category-groups/weekly_summary/", params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summaries = {
+            item["name"]: [(point["label"], float(point["value"])) for point in item["series"]]
+            for item in response.data
+        }
+        self.assertEqual(summaries, {
+            "Everything": [("2026-01-07T00:00:00Z", 10.0), ("2026-01-14T00:00:00Z", 8.0)],
+            "Food": [("2026-01-07T00:00:00Z", 10.0), ("2026-01-14T00:00:00Z", 5.0)],
+            "Idle": [],
+        })
+        for group in (food, everything):
+            single = self.client.get(
+                f"/api/category-groups/{group.id}/weekly_summary/",
+                {"from_date": "2026-01-01", "to_date": "2026-01-31"},
+            )
+            self.assertEqual(
+                single.data,
+                next(item["series"] for item in response.data if item["id"] == group.id),
+            )
+
+    def test_weekly_summary_several_groups_bad_ids(self):
+        """Missing or malformed ids are rejected."""
+        dates = {"from_date": "2026-01-01", "to_date": "2026-01-31"}
+        response = self.client.get("/api/category-groups/weekly_summary/", dates)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get("/api/category-groups/weekly_summary/", dict(dates, ids="1,x"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get("/api/category-groups/weekly_summary/", {"ids": "1"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
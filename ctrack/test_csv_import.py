@@ -0,0 +1,112 @@
+"""Tests for the chunked CSV loader and ``import_csv`` command."""
+
+import io
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+
+import pytz
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ctrack import models
+from ctrack.csv_import import load_csv
+
+
+HEADER = "date,description,category,amount,accountname\n"
+
+
+def make_csv(rows):
+    return io.StringIO(HEADER + "".join(",".join(row) + "\n" for row in rows))
+
+
+class LoadCsvTestCase(TestCase):
+    def test_loads_rows(self):
+        existing = models.Category.objects.create(name="Groceries")
+        data = make_csv([
+            ("03/01/2020", "Supermarket", "Groceries", "-45.50", "Everyday"),
+            ("04/01/2020", "Power bill", "Bills - Power", "-120.00", "Everyday"),
+            ("05/01/2020", "Pay", "", "2000.00", "Savings"),
+        ])
+
+        stats = load_csv(data)
+
+        self.assertEqual(stats["rows"], 3)
+        self.assertEqual(models.Transaction.objects.count(), 3)
+        self.assertEqual(models.Category.objects.filter(name="Groceries").count(), 1)
+        self.assertEqual(
+            set(models.Account.objects.values_list("name", flat=True)),
+            {"Everyday", "Savings"},
+        )
+
+        groceries = models.Transaction.objects.get(description="Supermarket")
+        self.assertEqual(groceries.category, existing)
+        self.assertEqual(groceries.amount, Decimal("-45.50"))
+        self.assertEqual(groceries.when, datetime(2020, 1, 3, tzinfo=pytz.utc))
+        self.assertIsNone(models.Transaction.objects.get(description="Pay").category)
+
+    def test_reuses_names_across_chunks(self):
+        data = make_csv([
+            ("0{}/02/2020".format(day), "Coffee", "Eating Out", "-4.50", "Everyday")
+            for day in range(1, 8)
+        ])
+
+        stats = load_csv(data, chunk_size=2)
+
+        self.assertEqual(stats["chunks"], 4)
+        self.assertEqual(models.Transaction.objects.count(), 7)
+        self.assertEqual(models.Category.objects.count(), 1)
+        self.assertEqual(models.Account.objects.count(), 1)
+
+    def test_skips_invalid_amounts(self):
+        data = make_csv([
+            ("01/02/2020", "Coffee", "Eating Out", "-4.50", "Everyday"),
+            ("02/02/2020", "Blank", "Eating Out", "", "Everyday"),
+            ("03/02/2020", "Coffee", "Eating Out", "-4.50", "Everyday"),
+            ("04/02/2020", "Typo", "Eating Out", "4.5O", "Other"),
+            ("05/02/2020", "Coffee", "Eating Out", "-4.50", "Everyday"),
+        ])
+
+        with self.assertLogs("ctrack.csv_import", "WARNING") as logs:
+            stats = load_csv(data, chunk_size=2)
+
+        self.assertEqual((stats["rows"], stats["skipped"]), (3, 2))
+        self.assertEqual(list(models.Transaction.objects.values_list("description", flat=True)
+                              .order_by("when")), ["Coffee"] * 3)
+        self.assertFalse(models.Account.objects.filter(name="Other").exists())
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("lines 3", logs.output[0])
+        self.assertIn("lines 5", logs.output[1])
+
+    def test_query_count_flat_in_row_count(self):
+        def rows(count):
+            return make_csv([
+                ("01/03/2020", "txn {}".format(i), "Cat {}".format(i % 3), "-1.00", "Acct")
+                for i in range(count)
+            ])
+
+        with CaptureQueriesContext(connection) as small:
+            load_csv(rows(3))
+        models.Transaction.objects.all().delete()
+        models.Category.objects.all().delete()
+        models.Account.objects.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            load_csv(rows(30))
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class ImportCsvCommandTestCase(TestCase):
+    def test_command_reports_rate(self):
+        data = make_csv([("01/01/2021", "Rent", "Housing", "-400.00", "Everyday")])
+        out = io.StringIO()
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as temp_file:
+            temp_file.write(data.getvalue())
+            temp_file.flush()
+            call_command("import_csv", temp_file.name, stdout=out)
+
+        self.assertEqual(models.Transaction.objects.count(), 1)
+        self.assertIn("Loaded 1 transactions", out.getvalue())
+        self.assertIn("rows/sec", out.getvalue())
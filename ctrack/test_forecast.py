@@ -0,0 +1,101 @@
+"""Tests for ``ctrack.forecast.SpendForecaster``."""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytz
+from django.test import SimpleTestCase, TestCase
+
+from ctrack import models
+from ctrack.forecast import SpendForecaster, week_ends, weekdays
+
+
+class SpendForecasterTestCase(TestCase):
+    def setUp(self):
+        self.account = models.Account.objects.create(name="Acct")
+        self.rent = models.Category.objects.create(name="Rent")
+        self.coffee = models.Category.objects.create(name="Coffee")
+        # Wednesday 2024-05-01; history covers Feb-Apr 2024.
+        self.today = date(2024, 5, 1)
+
+    def spend(self, day, amount, category, **kwargs):
+        models.Transaction.objects.create(
+            when=datetime.combine(day, datetime.min.time()).replace(hour=12, tzinfo=pytz.utc),
+            account=self.account, amount=Decimal(amount), category=category,
+            description="spend", **kwargs
+        )
+
+    def test_loads_category_by_day_matrix(self):
+        self.spend(date(2024, 2, 1), "-10.00", self.coffee)
+        self.spend(date(2024, 2, 1), "-2.50", self.coffee)
+        self.spend(date(2024, 4, 30), "-1000.00", self.rent)
+        # Outside the history, split or uncategorised: ignored.
+        self.spend(date(2024, 1, 31), "-5.00", self.coffee)
+        self.spend(date(2024, 5, 1), "-5.00", self.coffee)
+        self.spend(date(2024, 3, 1), "-5.00", self.coffee, is_split=True)
+        self.spend(date(2024, 3, 1), "-5.00", None)
+
+        with self.assertNumQueries(1):
+            forecaster = SpendForecaster.load(self.today)
+        self.assertEqual(forecaster.start, date(2024, 2, 1))
+        self.assertEqual(forecaster.categories, [self.rent.pk, self.coffee.pk])
+        self.assertEqual(forecaster.matrix.shape, (2, 90))
+        self.assertEqual(forecaster.matrix[1, 0], -1250)
+        self.assertEqual(forecaster.matrix[0, -1], -100000)
+        self.assertEqual(forecaster.matrix.sum(), -101250)
+
+    def test_monthly_payment_lands_on_its_day(self):
+        for month in (2, 3, 4):
+            self.spend(date(2024, month, 1), "-900.00", self.rent)
+        forecaster = SpendForecaster.load(self.today)
+
+        on_the_first = forecaster.expected(date(2024, 6, 1), date(2024, 6, 1))[self.rent.pk]
+        mid_month = forecaster.expected(date(2024, 6, 15), date(2024, 6, 15))[self.rent.pk]
+        self.assertLessEqual(on_the_first, Decimal("-450"))
+        self.assertGreater(mid_month, Decimal("-50"))
+
+    def test_weekday_habit(self):
+        day = date(2024, 2, 3)  # a Saturday
+        while day < self.today:
+            self.spend(day, "-7.00", self.coffee)
+            day += timedelta(days=7)
+        forecaster = SpendForecaster.load(self.today)
+
+        saturday = forecaster.expected(date(2024, 5, 4), date(2024, 5, 4))[self.coffee.pk]
+        monday = forecaster.expected(date(2024, 5, 6), date(2024, 5, 6))[self.coffee.pk]
+        self.assertLess(saturday, monday)
+        self.assertLessEqual(saturday, Decimal("-3.50"))
+
+    def test_steady_spend_scales_with_days(self):
+        day = date(2024, 2, 1)
+        while day < self.today:
+            self.spend(day, "-3.00", self.coffee)
+            day += timedelta(days=1)
+        forecaster = SpendForecaster.load(self.today)
+        self.assertEqual(forecaster.expected(date(2024, 5, 2), date(2024, 5, 11)),
+                         {self.coffee.pk: Decimal("-30.00")})
+
+    def test_empty(self):
+        forecaster = SpendForecaster.load(self.today)
+        self.assertEqual(forecaster.expected(date(2024, 5, 2), date(2024, 5, 31)), {})
+        self.assertTrue(np.array_equal(forecaster.by_weekday, np.zeros((0, 7))))
+
+    def test_empty_range(self):
+        self.spend(date(2024, 3, 1), "-5.00", self.coffee)
+        forecaster = SpendForecaster.load(self.today)
+        self.assertEqual(forecaster.expected(date(2024, 5, 2), date(2024, 5, 1)), {})
+
+
+class WeekBucketTestCase(SimpleTestCase):
+    def test_week_ends(self):
+        # Monday 2024-01-01 to Monday 2024-01-15.
+        days = np.datetime64("2024-01-01") + np.arange(15)
+        self.assertEqual(weekdays(days)[:7].tolist(), list(range(7)))
+        self.assertEqual(
+            set(week_ends(days).astype(object)),
+            {date(2024, 1, 7), date(2024, 1, 14), date(2024, 1, 21)},
+        )
+        wednesdays = week_ends(days, 2)
+        self.assertTrue((weekdays(wednesdays) == 2).all())
+        self.assertTrue(((wednesdays >= days) & (wednesdays - days < np.timedelta64(7, "D"))).all())
@@ -0,0 +1,249 @@
+"""Tests for the ``CategoryMonthTotal`` rollup and the endpoints reading it."""
+
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytz
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Sum
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ctrack import models
+
+
+def when(year, month, day, hour=0):
+    return datetime(year, month, day, hour, tzinfo=pytz.utc)
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        self.account = models.Account.objects.create(name="Everyday")
+        self.other_account = models.Account.objects.create(name="Savings")
+        self.food = models.Category.objects.create(name="Food")
+        self.rent = models.Category.objects.create(name="Rent")
+
+    def add(self, moment, amount, category=None, account=None, **kwargs):
+        return models.Transaction.objects.create(
+            when=moment, amount=Decimal(amount), category=category,
+            account=account or self.account, description="txn", **kwargs
+        )
+
+    def stored(self):
+        return {
+            (row.account_id, row.category_id, row.month, row.is_split): (row.total, row.count)
+            for row in models.CategoryMonthTotal.objects.all()
+        }
+
+    def expected(self):
+        totals = {}
+        for trans in models.Transaction.objects.all():
+            key = (trans.account_id, trans.category_id, trans.when.date().replace(day=1), trans.is_split)
+            total, count = totals.get(key, (Decimal("0"), 0))
+            totals[key] = (total + trans.amount, count + 1)
+        return totals
+
+    def assertInSync(self):
+        self.assertEqual(self.stored(), self.expected())
+
+
+class MaintenanceTestCase(RollupTestCase):
+    def test_create(self):
+        self.add(when(2024, 1, 5), "-10.00", self.food)
+        self.add(when(2024, 1, 31, 23), "-5.00", self.food)
+        self.add(when(2024, 2, 1), "-700.00", self.rent)
+        self.add(when(2024, 2, 3), "-1.00")
+        self.assertEqual(self.stored()[(self.account.pk, self.food.pk, date(2024, 1, 1), False)],
+                         (Decimal("-15.00"), 2))
+        self.assertInSync()
+
+    def test_update_moves_between_groups(self):
+        trans = self.add(when(2024, 1, 5), "-10.00", self.food)
+        self.add(when(2024, 1, 6), "-3.00", self.food)
+        trans.when = when(2024, 3, 1)
+        trans.category = self.rent
+        trans.account = self.other_account
+        trans.save()
+        self.assertInSync()
+
+        trans.amount = Decimal("-12.00")
+        trans.save(update_fields=["amount"])
+        self.assertInSync()
+
+    def test_delete(self):
+        trans = self.add(when(2024, 1, 5), "-10.00", self.food)
+        trans.delete()
+        self.assertEqual(self.stored(), {})
+
+    def test_split(self):
+        trans = self.add(when(2024, 1, 5), "-10.00", self.food)
+        trans.split({self.food: Decimal("-4.00"), self.rent: Decimal("-6.00")})
+        self.assertInSync()
+        self.assertIn((self.account.pk, self.food.pk, date(2024, 1, 1), True), self.stored())
+
+    def test_bulk_create(self):
+        models.Transaction.objects.bulk_create([
+            models.Transaction(when=when(2024, month, 2), amount=Decimal("-1.00"),
+                               category=self.food, account=self.account)
+            for month in (1, 2, 4)
+        ])
+        self.assertInSync()
+
+    def test_bulk_update(self):
+        for day in (1, 2, 3):
+            self.add(when(2024, 1, day), "-2.00")
+        transactions = list(models.Transaction.objects.all())
+        for trans in transactions:
+            trans.category = self.food
+        models.Transaction.objects.bulk_update(transactions, ["category"])
+        self.assertInSync()
+
+        for trans in transactions:
+            trans.when = when(2024, 5, 1)
+        models.Transaction.objects.bulk_update(transactions, ["when"])
+        self.assertInSync()
+
+    def test_category_delete(self):
+        self.add(when(2024, 1, 5), "-10.00", self.food)
+        self.add(when(2024, 1, 6), "-700.00", self.rent)
+        self.rent.delete()
+        self.assertInSync()
+
+    def test_rebuild_command(self):
+        self.add(when(2024, 1, 5), "-10.00", self.food)
+        self.add(when(2024, 2, 5), "-10.00", self.rent)
+        models.CategoryMonthTotal.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_month_totals", stdout=out)
+        self.assertIn("Rebuilt 2 monthly category totals", out.getvalue())
+        self.assertInSync()
+
+
+class TotalsTestCase(RollupTestCase):
+    def setUp(self):
+        super().setUp()
+        rnd = random.Random(3)
+        categories = [self.food, self.rent, None]
+        for _ in range(200):
+            self.add(
+                when(2024, 1, 1) + timedelta(days=rnd.randint(0, 120), hours=rnd.choice([0, 0, 9, 18])),
+                str(Decimal(rnd.randint(-5000, 1000)) / 100),
+                rnd.choice(categories),
+                account=rnd.choice([self.account, self.other_account]),
+                is_split=rnd.random() < 0.1,
+            )
+
+    def raw(self, from_date, to_date, fields, **filters):
+        rows = (models.Transaction.objects
+                .filter(when__gte=from_date, when__lte=to_date, **filters)
+                .values(*fields).annotate(total=Sum("amount")).order_by())
+        return {tuple(row[field] for field in fields): row["total"] for row in rows}
+
+    def test_matches_transactions(self):
+        windows = [
+            (date(2024, 1, 1), date(2024, 1, 31)),
+            (date(2024, 2, 1), date(2024, 3, 31)),
+            (date(2024, 1, 10), date(2024, 2, 20)),
+            (date(2024, 3, 1), date(2024, 3, 1)),
+            (date(2024, 4, 1), date(2024, 4, 30)),
+        ]
+        for fields, filters in [
+            (["category"], {}),
+            (["category"], {"is_split": False, "category__isnull": False}),
+            (["category", "category__name"], {"account": self.account}),
+        ]:
+            with self.assertNumQueries(2):
+                totals = models.CategoryMonthTotal.totals(windows, fields, **filters)
+            for window, window_totals in zip(windows, totals):
+                self.assertEqual(window_totals, self.raw(*window, fields, **filters), (window, fields))
+
+    def test_unaligned_only_skips_rollup(self):
+        with self.assertNumQueries(1):
+            models.CategoryMonthTotal.totals([(date(2024, 1, 2), date(2024, 1, 30))], ["category"])
+
+    def test_correction_reads_only_last_days(self):
+        windows = [(date(2024, 1, 1), date(2024, 1, 31)), (date(2024, 3, 1), date(2024, 3, 31))]
+        with CaptureQueriesContext(connection) as queries:
+            totals = models.CategoryMonthTotal.totals(windows, ["category"])
+        for window, window_totals in zip(windows, totals):
+            self.assertEqual(window_totals, self.raw(*window, ["category"]))
+        # One range per window's last day, not one covering February too.
+        correction = queries.captured_queries[-1]["sql"]
+        self.assertIn(" OR ", correction)
+
+    def test_month_span(self):
+        self.assertEqual(models.month_span(date(2024, 1, 1), date(2024, 2, 29)),
+                         (date(2024, 1, 1), date(2024, 2, 1)))
+        self.assertIsNone(models.month_span(date(2024, 1, 1), date(2024, 2, 28)))
+        self.assertIsNone(models.month_span(date(2024, 1, 2), date(2024, 1, 31)))
+        self.assertIsNone(models.month_span(date(2024, 2, 1), date(2024, 1, 31)))
+
+
+class EndpointTestCase(RollupTestCase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user(username="u", password="p")
+        self.client.force_login(user)
+        self.add(when(2024, 1, 5), "-10.00", self.food)
+        self.add(when(2024, 1, 31, 18), "-20.00", self.food)
+        self.add(when(2024, 3, 2), "-30.00", self.food)
+        self.add(when(2024, 1, 10), "-700.00", self.rent, account=self.other_account)
+
+    def test_category_series(self):
+        result = self.client.get("/api/categories/{}/series/".format(self.food.pk))
+        self.assertEqual(result.json(), [
+            {"label": "2024-01-01T00:00:00Z", "value": "-30.00"},
+            {"label": "2024-03-01T00:00:00Z", "value": "-30.00"},
+        ])
+
+    def test_transaction_summary_whole_months(self):
+        result = self.client.get("/api/transactions/summary/",
+                                 {"from_date": "2024-01-01", "to_date": "2024-01-31"})
+        # Transactions after midnight on to_date are outside the range.
+        self.assertEqual(
+            [(row["category_name"], row["total"]) for row in result.json()],
+            [("Rent", "-700.00"), ("Food", "-10.00")],
+        )
+        result = self.client.get("/api/transactions/summary/", {
+            "from_date": "2024-01-01", "to_date": "2024-03-31", "account": self.account.pk,
+        })
+        self.assertEqual([(row["category_name"], row["total"]) for row in result.json()],
+                         [("Food", "-60.00")])
+
+    def test_category_summary(self):
+        entry = models.BudgetEntry.objects.create(
+            amount=Decimal("100.00"), valid_from=date(2024, 1, 1), valid_to=date(2024, 12, 31),
+        )
+        entry.categories.add(self.food, self.rent)
+        result = self.client.get("/api/categories/summary/20240101/20240331")
+        self.assertEqual(result.json()[0]["value"], -760.0)
+
+    def test_period_definition_summarise(self):
+        period = models.PeriodDefinition.objects.create(label="Month", frequency="MS")
+        for (start, end), from_totals, from_queryset in zip(
+            period.date_ranges, period.summarise(), period.summarise(models.Transaction.objects.all()),
+        ):
+            key = lambda row: row["category"] or 0
+            self.assertEqual(sorted(from_totals, key=key), sorted(from_queryset, key=key))
+
+    def test_period_definition_summarise_queryset_single_query(self):
+        period = models.PeriodDefinition.objects.create(label="Fortnight", frequency="2W")
+        for i, (start, end) in enumerate(period.date_ranges):
+            start, end = start.date(), end.date()
+            self.add(when(start.year, start.month, start.day), "-1.00", self.food)
+            self.add(when(end.year, end.month, end.day), "-2.00", self.rent if i % 2 else None)
+            # After midnight on the last day: in no period.
+            self.add(when(end.year, end.month, end.day, 6), "-4.00", self.food)
+        queryset = models.Transaction.objects.filter(account=self.account)
+        with self.assertNumQueries(1):
+            summaries = list(period.summarise(queryset))
+        self.assertEqual(len(summaries), len(period.date_ranges))
+        for (start, end), summary in zip(period.date_ranges, summaries):
+            expected = queryset.filter(when__gte=start.date(), when__lte=end.date()) \
+                .values('category', 'category__name').annotate(total=Sum('amount'))
+            key = lambda row: row["category"] or 0
+            self.assertEqual(sorted(summary, key=key), sorted(expected, key=key))
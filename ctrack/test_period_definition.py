@@ -0,0 +1,82 @@
+"""Tests for ``PeriodDefinition`` period caching and GET /api/periods/."""
+
+from datetime import date, timedelta
+from unittest import mock
+
+import pandas as pd
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ctrack import models
+
+
+class PeriodCacheTestCase(TestCase):
+    def setUp(self):
+        self.period = models.PeriodDefinition.objects.create(label="Month", frequency="MS")
+
+    def test_instances_share_computed_periods(self):
+        ranges = self.period.date_ranges
+        other = models.PeriodDefinition.objects.get(pk=self.period.pk)
+        with mock.patch("ctrack.models.pd.date_range") as date_range:
+            self.assertEqual(other.date_ranges, ranges)
+            self.assertEqual(other.option_specifiers, self.period.option_specifiers)
+        date_range.assert_not_called()
+
+    def test_save_forgets_periods(self):
+        monthly = self.period.current
+        self.period.frequency = "W-MON"
+        self.period.save()
+        self.assertNotEqual(self.period.current, monthly)
+        self.assertEqual(models.PeriodDefinition.objects.get(pk=self.period.pk).current,
+                         self.period.current)
+
+    def test_label_change_updates_options(self):
+        self.period.option_specifiers
+        models.PeriodDefinition.objects.filter(pk=self.period.pk).update(label="Calendar month")
+        other = models.PeriodDefinition.objects.get(pk=self.period.pk)
+        self.assertEqual(other.option_specifiers[0]["label"], "Current Calendar month")
+
+    def test_new_day_recomputes(self):
+        self.period.date_ranges
+        tomorrow = mock.Mock(wraps=date)
+        tomorrow.today.return_value = date.today() + timedelta(days=1)
+        with mock.patch("ctrack.models.date", tomorrow), \
+                mock.patch("ctrack.models.pd.date_range", wraps=pd.date_range) as date_range:
+            other = models.PeriodDefinition.objects.get(pk=self.period.pk)
+            self.assertGreaterEqual(other.current[0], self.period.current[0])
+        date_range.assert_called_once()
+        self.assertEqual(
+            {key[3] for key in models.PeriodDefinition._period_cache},
+            {tomorrow.today.return_value},
+        )
+
+
+class PeriodDefinitionAPITestCase(APITestCase):
+    url = "/api/periods/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        self.period = models.PeriodDefinition.objects.create(label="Month", frequency="MS")
+
+    def test_list(self):
+        result = self.client.get(self.url)
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual([option["label"] for option in result.data],
+                         ["Current Month", "Previous Month"])
+
+    def test_etag_not_modified(self):
+        first = self.client.get(self.url)
+        etag = first["ETag"]
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(again["ETag"], etag)
+
+        self.period.label = "Calendar month"
+        self.period.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed["ETag"], etag)
@@ -3,13 +3,18 @@
 import calendar
 from datetime import date, datetime, timedelta
 from decimal import Decimal
+from unittest import mock
 
 import pytz
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from ctrack import models
+from ctrack.api import progress
 
 
 class ProgressAPITestCase(APITestCase):
@@ -17,6 +22,7 @@ class ProgressAPITestCase(APITestCase):
 
     def setUp(self):
         """Create user, categories, group, account, budget, recurring payment, bills, and transactions."""
+        cache.clear()
         self.user = User.objects.create_user(
             username="testuser", password="testpass123"
         )
@@ -321,10 +327,9 @@ class ProgressAPITestCase(APITestCase):
         # The RecurringPayment has 3 bills with ~30-day intervals,
         # so next_due_date should exist. If it falls within the quarter
         # and is after today, we expect upcoming_bills to be populated.
-        ndd = self.recurring.next_due_date()
+        self.recurring.refresh_from_db()
+        ndd = self.recurring.next_due_date
         if ndd is not None:
-            if hasattr(ndd, "date"):
-                ndd = ndd.date()
             if quarter_start <= ndd <= quarter_end and ndd > today:
                 self.assertEqual(len(power_rows), 1)
                 upcoming = power_rows[0]["upcoming_bills"]
@@ -333,3 +338,142 @@ class ProgressAPITestCase(APITestCase):
                 self.assertEqual(bill["name"], "Electricity")
                 self.assertIn("expected_date", bill)
                 self.assertIn("expected_amount", bill)
+
+
+class ProgressCacheTestCase(APITestCase):
+    """Repeat /api/progress/ requests are served from the cache until data changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="cacheuser", password="p")
+        self.client.force_authenticate(user=self.user)
+        self.account = models.Account.objects.create(name="Acct")
+        self.groceries = models.Category.objects.create(name="Groceries")
+        self.today = date.today()
+        self.add_spend(Decimal("-10.00"))
+
+    def add_spend(self, amount, category=None):
+        return models.Transaction.objects.create(
+            when=datetime(self.today.year, self.today.month, 1, 12, 0, tzinfo=pytz.utc),
+            account=self.account,
+            amount=amount,
+            category=category or self.groceries,
+            description="spend",
+        )
+
+    def get_progress(self, **params):
+        result = self.client.get("/api/progress/", dict({"period": "month"}, **params))
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        return result.data
+
+    def test_repeat_request_skips_aggregation(self):
+        with CaptureQueriesContext(connection) as first:
+            expected = self.get_progress()
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(self.get_progress(), expected)
+        self.assertLess(len(second.captured_queries), len(first.captured_queries))
+        self.assertFalse(any("ctrack_transaction" in q["sql"] for q in second.captured_queries))
+
+    def test_transaction_write_invalidates(self):
+        self.assertEqual(self.get_progress()["totals"]["actual_spend"], "-10.00")
+        self.add_spend(Decimal("-5.00"))
+        self.assertEqual(self.get_progress()["totals"]["actual_spend"], "-15.00")
+
+    def test_bulk_writes_invalidate(self):
+        self.assertEqual(self.get_progress()["totals"]["actual_spend"], "-10.00")
+        transactions = list(models.Transaction.objects.all())
+        for txn in transactions:
+            txn.amount = Decimal("-25.00")
+        models.Transaction.objects.bulk_update(transactions, ["amount"])
+        self.assertEqual(self.get_progress()["totals"]["actual_spend"], "-25.00")
+
+        models.Transaction.objects.bulk_create([models.Transaction(
+            when=datetime(self.today.year, self.today.month, 1, 12, 0, tzinfo=pytz.utc),
+            account=self.account, amount=Decimal("-1.00"), category=self.groceries,
+        )])
+        self.assertEqual(self.get_progress()["totals"]["actual_spend"], "-26.00")
+
+    def test_budget_categories_change_invalidates(self):
+        entry = models.BudgetEntry.objects.create(
+            amount=Decimal("300.00"),
+            valid_from=date(self.today.year, 1, 1),
+            valid_to=date(self.today.year, 12, 31),
+        )
+        self.assertIsNone(self.get_progress()["totals"]["budget"])
+        entry.categories.add(self.groceries)
+        self.assertIsNotNone(self.get_progress()["totals"]["budget"])
+
+    def test_group_by_is_part_of_key(self):
+        group = models.CategoryGroup.objects.create(name="Food")
+        group.categories.add(self.groceries)
+        by_category = self.get_progress()
+        by_group = self.get_progress(group_by="category_group")
+        self.assertEqual(by_category["rows"][0]["name"], "Groceries")
+        self.assertEqual(by_group["rows"][0]["name"], "Food")
+
+
+class MultiProgressAPITestCase(APITestCase):
+    """Test GET /api/progress/periods/ endpoint."""
+
+    url = "/api/progress/periods/"
+    setUp = ProgressAPITestCase.setUp
+
+    def test_matches_single_period_responses(self):
+        result = self.client.get(self.url, {"periods": "week,month,quarter,month:2"})
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        periods = result.data["periods"]
+        self.assertEqual(
+            [p["period"]["label"] for p in periods],
+            ["This week", "This month", "This quarter", "Last month"],
+        )
+        for name, data in zip(["week", "month", "quarter"], periods):
+            single = self.client.get("/api/progress/", {"period": name})
+            self.assertEqual(data, single.data)
+
+    def test_previous_month_range(self):
+        today = date.today()
+        first = today.replace(day=1)
+        prev_last = first - timedelta(days=1)
+        result = self.client.get(self.url, {"periods": "month:2"})
+        period = result.data["periods"][0]["period"]
+        self.assertEqual(period["from_date"], str(prev_last.replace(day=1)))
+        self.assertEqual(period["to_date"], str(prev_last))
+        # The current month's spend is not counted in the previous month.
+        self.assertEqual(Decimal(result.data["periods"][0]["totals"]["actual_spend"]), Decimal("0"))
+
+    def test_period_definition_offsets(self):
+        pd_obj = models.PeriodDefinition.objects.create(label="Month", frequency="MS")
+        result = self.client.get(self.url, {"period_definition": pd_obj.pk, "offsets": "1-3"})
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        labels = [p["period"]["label"] for p in result.data["periods"]]
+        self.assertEqual(labels, ["Current Month", "Previous Month", "Month -2"])
+        current = self.client.get("/api/progress/", {"period": pd_obj.pk})
+        self.assertEqual(result.data["periods"][0], current.data)
+
+    def test_invalid_periods(self):
+        for params in [{}, {"periods": "fortnight"}, {"periods": "month:0"},
+                       {"period_definition": "999", "offsets": "1"},
+                       {"periods": ",".join(["week"] * 25)}]:
+            result = self.client.get(self.url, params)
+            self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_large_offsets(self):
+        pd_obj = models.PeriodDefinition.objects.create(label="Month", frequency="MS")
+        for params in [{"periods": "week:1000000"}, {"periods": "quarter:100000"},
+                       {"period_definition": pd_obj.pk, "offsets": "1-100000"},
+                       {"period_definition": pd_obj.pk, "offsets": "5000,5001"}]:
+            result = self.client.get(self.url, params)
+            self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST, params)
+        result = self.client.get(self.url, {"periods": "quarter:%d" % progress.MAX_OFFSET})
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+
+    def test_parse_offsets(self):
+        self.assertEqual(progress.parse_offsets("2-4"), [2, 3, 4])
+        self.assertEqual(progress.parse_offsets("1,3"), [1, 3])
+        with mock.patch("ctrack.api.progress.range", create=True) as expand:
+            with self.assertRaises(ValueError):
+                progress.parse_offsets("1-100000")
+        expand.assert_not_called()
+        for raw in ["0-2", "3-1", "1,1001", "x"]:
+            with self.assertRaises(ValueError):
+                progress.parse_offsets(raw)
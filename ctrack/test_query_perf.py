@@ -3,13 +3,15 @@
 These guard against the N+1 patterns removed in Phase 2: ``suggest_category``
 building a per-prediction ``Category`` lookup, the transaction list endpoint
 issuing a category query per row, and the recurring-payments/bills list
-endpoints issuing an ``is_paid`` aggregate per nested bill.
+endpoints issuing an ``is_paid`` aggregate per nested bill. The progress
+endpoint is also held to a constant query count.
 """
 
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
 import pytz
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db import connection
 from django.test import TestCase
 from django.test.utils import CaptureQueriesContext
@@ -129,6 +131,22 @@ class RecurringPaymentListQueryTests(APITestCase):
 
         self.assertEqual(len(small.captured_queries), len(large.captured_queries))
 
+    def test_payments_list_query_count_flat_in_payment_count(self):
+        self._add_bills(2)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get("/api/payments/").status_code, 200)
+
+        for i in range(5):
+            payment = models.RecurringPayment.objects.create(name=f"Payment {i}")
+            for month in (1, 2, 3):
+                models.Bill.objects.create(
+                    description="bill", due_date=date(2026, month, 1), due_amount=10, series=payment,
+                )
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.client.get("/api/payments/").status_code, 200)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
     def test_bills_list_query_count_flat_in_bill_count(self):
         self._add_bills(2)
         with CaptureQueriesContext(connection) as small:
@@ -139,3 +157,124 @@ class RecurringPaymentListQueryTests(APITestCase):
             self.assertEqual(self.client.get("/api/bills/").status_code, 200)
 
         self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class ProgressQueryTests(APITestCase):
+    """/api/progress/ must issue a fixed number of queries however many
+    budget entries, category groups and recurring payments exist."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+        self.account = models.Account.objects.create(name="Acct")
+        self.today = date.today()
+        self.counter = 0
+        cache.clear()
+
+    def _add_data(self, count):
+        for _ in range(count):
+            self.counter += 1
+            category = models.Category.objects.create(name=f"Cat {self.counter}")
+            group = models.CategoryGroup.objects.create(name=f"Group {self.counter}")
+            group.categories.add(category)
+            entry = models.BudgetEntry.objects.create(
+                amount=100,
+                valid_from=date(self.today.year, 1, 1),
+                valid_to=date(self.today.year, 12, 31),
+            )
+            entry.categories.add(category)
+            payment = models.RecurringPayment.objects.create(
+                name=f"Bill {self.counter}", category=category,
+            )
+            for months_ago in (3, 2, 1):
+                models.Bill.objects.create(
+                    description="bill",
+                    due_date=self.today - timedelta(days=30 * months_ago),
+                    due_amount=50,
+                    series=payment,
+                )
+            models.Transaction.objects.create(
+                when=datetime(self.today.year, self.today.month, 1, 12, 0, tzinfo=pytz.utc),
+                account=self.account,
+                amount=-10,
+                category=category,
+                description="spend",
+            )
+
+    def _assert_flat(self, params, url="/api/progress/"):
+        self._add_data(2)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+
+        self._add_data(6)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_query_count_flat_by_category(self):
+        self._assert_flat({"period": "month"})
+
+    def test_query_count_flat_by_category_group(self):
+        self._assert_flat({"period": "month", "group_by": "category_group"})
+
+    def test_multi_period_queries_match_single_period(self):
+        self._add_data(3)
+        with CaptureQueriesContext(connection) as single:
+            self.client.get("/api/progress/", {"period": "month"})
+        cache.clear()
+        with CaptureQueriesContext(connection) as multi:
+            self.client.get("/api/progress/periods/", {"periods": "week,month,month:2,quarter"})
+        self.assertEqual(len(single.captured_queries), len(multi.captured_queries))
+
+
+class CategorySummaryQueryTests(APITestCase):
+    """/api/categories/summary/ must not issue queries per budget entry."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+        self.account = models.Account.objects.create(name="Acct")
+        self.counter = 0
+
+    def _add_entries(self, count):
+        for _ in range(count):
+            self.counter += 1
+            categories = [
+                models.Category.objects.create(name=f"Group {self.counter} - {i}") for i in range(2)
+            ]
+            entry = models.BudgetEntry.objects.create(
+                amount=100, valid_from=date(2024, 1, 1), valid_to=date(2024, 12, 31),
+            )
+            entry.categories.add(*categories)
+            for category in categories:
+                models.Transaction.objects.create(
+                    when=datetime(2024, 2, 10, 12, 0, tzinfo=pytz.utc),
+                    account=self.account, amount=-10, category=category, description="spend",
+                )
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            result = self.client.get(url)
+        self.assertEqual(result.status_code, 200)
+        return result.json(), len(queries.captured_queries)
+
+    def test_query_count_flat_in_entry_count(self):
+        for url in ("/api/categories/summary/20240101/20240331",
+                    "/api/categories/summary/20240105/20240320"):
+            self._add_entries(2)
+            _, small = self._get(url)
+            self._add_entries(6)
+            _, large = self._get(url)
+            self.assertEqual(small, large, url)
+
+    def test_values_and_names(self):
+        self._add_entries(2)
+        shared = models.Category.objects.get(name="Group 1 - 0")
+        overlap = models.BudgetEntry.objects.create(
+            name="Overlap", amount=50, valid_from=date(2024, 1, 1), valid_to=date(2024, 12, 31),
+        )
+        overlap.categories.add(shared)
+        data, _ = self._get("/api/categories/summary/20240101/20240331")
+        by_name = {row["name"]: row["value"] for row in data}
+        self.assertEqual(by_name, {"Group 1": -20.0, "Group 2": -20.0, "Overlap": -10.0})
@@ -0,0 +1,81 @@
+"""Tests for the recurring detection benchmark harness."""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from ctrack.recurring_benchmark import benchmark, score, synthetic_history
+from ctrack.recurring_detection import RecurringTransactionDetector
+
+
+class SyntheticHistoryTestCase(SimpleTestCase):
+    def test_history(self):
+        rows, series = synthetic_history(800, seed=4)
+        self.assertGreaterEqual(len(rows), 800)
+        self.assertEqual([row[0] for row in rows], list(range(1, len(rows) + 1)))
+        self.assertEqual([row[1] for row in rows], sorted(row[1] for row in rows))
+        planted = set().union(*(ids for _, _, ids in series))
+        self.assertGreaterEqual(len(planted), 800 * 0.3)
+        self.assertLess(len(planted), len(rows))
+        self.assertEqual(synthetic_history(800, seed=4), (rows, series))
+
+    def test_score(self):
+        series = [("monthly", False, frozenset({1, 2, 3, 4})), ("weekly", True, frozenset({5, 6, 7}))]
+        groups = [
+            {'transaction_ids': [1, 2, 3]},
+            # Too little of the series.
+            {'transaction_ids': [5]},
+            # Mostly unplanted transactions.
+            {'transaction_ids': [6, 8, 9]},
+        ]
+        self.assertEqual(score(groups, series), (1 / 3, 1 / 2))
+        self.assertEqual(score([], []), (1.0, 1.0))
+
+    def test_benchmark(self):
+        results = benchmark([300, 600], seed=1)
+        self.assertEqual([result['transactions'] for result in results], [300, 600])
+        for result in results:
+            self.assertGreater(result['peak_mib'], 0)
+            self.assertGreaterEqual(result['seconds'], result['text_seconds'])
+            self.assertGreaterEqual(result['recall'], 0.75)
+
+    def test_no_speedup_below_parallel_threshold(self):
+        serial, = benchmark([300], measure_memory=False)
+        self.assertIsNone(serial['speedup'])
+        # 300 transactions are analysed in process even with workers.
+        small, = benchmark([300], measure_memory=False, workers=2)
+        self.assertEqual(small['workers'], 2)
+        self.assertIsNone(small['speedup'])
+
+    def test_speedup_against_serial(self):
+        rows, _ = synthetic_history(600, seed=2)
+        clusters = RecurringTransactionDetector().cluster_rows(rows)
+        serial_groups = RecurringTransactionDetector().analyze(clusters)
+        with mock.patch("ctrack.recurring_detection.PARALLEL_MIN_TRANSACTIONS", 0), \
+                mock.patch("ctrack.recurring_detection.ProcessPoolExecutor",
+                           wraps=ProcessPoolExecutor) as pool:
+            parallel_groups = RecurringTransactionDetector(workers=2).analyze(clusters)
+            self.assertEqual(pool.call_count, 1)
+            self.assertEqual(parallel_groups, serial_groups)
+
+            serial, = benchmark([600], seed=2, measure_memory=False)
+            parallel, = benchmark([600], seed=2, measure_memory=False, workers=2)
+        self.assertGreater(parallel['speedup'], 0)
+        self.assertEqual((parallel['groups'], parallel['precision'], parallel['recall']),
+                         (serial['groups'], serial['precision'], serial['recall']))
+
+    def test_command(self):
+        out = StringIO()
+        call_command("benchmark_recurring_detection", "400", "--json", "--no-memory",
+                     "--lsh-bands", "16", stdout=out)
+        result = json.loads(out.getvalue())
+        self.assertEqual(result['transactions'], 400)
+        self.assertIsNone(result['peak_mib'])
+
+        out = StringIO()
+        call_command("benchmark_recurring_detection", "400", stdout=out)
+        self.assertIn("precision", out.getvalue().splitlines()[0])
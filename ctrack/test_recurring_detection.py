@@ -3,12 +3,22 @@
 import random
 from datetime import datetime, timedelta
 from decimal import Decimal
+from unittest import mock
 
+import numpy as np
 import pytz
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
+from sklearn.cluster import DBSCAN
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_distances
 
 from ctrack import models
-from ctrack.recurring_detection import RecurringTransactionDetector
+from ctrack.recurring_detection import (
+    RecurringTransactionDetector,
+    cosine_radius_graph,
+    lsh_candidate_pairs,
+    shard_clusters,
+)
 
 
 class RecurringTransactionDetectorTestCase(TestCase):
@@ -186,6 +196,48 @@ class RecurringTransactionDetectorTestCase(TestCase):
         for txn in noise_txns:
             self.assertNotIn(txn.id, all_detected_ids)
 
+        # LSH blocking finds the same groups on well separated descriptions
+        lsh_detector = RecurringTransactionDetector(min_cluster_size=3, lsh_bands=16)
+        self.assertEqual(lsh_detector.detect(qs), groups)
+
+    def test_clusters_distinct_descriptions(self):
+        """Repeated descriptions are clustered once, weighted by their count."""
+        self._create_transactions("Netflix Subscription", lambda: Decimal("-15.99"), 30, 8)
+        self._create_transactions("NETFLIX  subscription", lambda: Decimal("-15.99"), 30, 4,
+                                  start_date=self.base_date + timedelta(days=8 * 30))
+        self._create_transactions("Spotify Premium", lambda: Decimal("-11.99"), 30, 6)
+        qs = models.Transaction.objects.all()
+
+        fit_predict = DBSCAN.fit_predict
+        with mock.patch.object(DBSCAN, "fit_predict", autospec=True,
+                               side_effect=fit_predict) as patched:
+            groups = self.detector.detect(qs)
+
+        _, features = patched.call_args_list[0].args
+        self.assertEqual(features.shape, (2, 2))
+        np.testing.assert_array_equal(patched.call_args_list[0].kwargs["sample_weight"], [12, 6])
+        self.assertEqual(sorted(g["transaction_count"] for g in groups), [6, 12])
+
+    def test_parallel_matches_serial(self):
+        """Sharding clusters across worker processes keeps groups and ids."""
+        rng = random.Random(5)
+        for i in range(12):
+            self._create_transactions(
+                f"Merchant{i} Direct Debit", lambda: Decimal(rng.choice(["-20.00", "-45.00"])),
+                rng.choice([7, 14, 30]), rng.randint(4, 12),
+            )
+        qs = models.Transaction.objects.all()
+        serial = self.detector.detect(qs)
+
+        parallel_detector = RecurringTransactionDetector(min_cluster_size=3, workers=3)
+        with mock.patch("ctrack.recurring_detection.PARALLEL_MIN_TRANSACTIONS", 0):
+            parallel = parallel_detector.detect(qs)
+
+        self.assertTrue(serial)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(parallel_detector.timings["workers"], 3)
+        self.assertGreaterEqual(parallel_detector.timings["analysis"], 0)
+
     def test_empty_queryset(self):
         """An empty queryset should return an empty list."""
         qs = models.Transaction.objects.none()
@@ -261,3 +313,99 @@ class RecurringTransactionDetectorTestCase(TestCase):
             self.assertEqual(g['frequency'], 'fortnightly',
                 f"Group with mean {g['amount_mean']} has frequency {g['frequency']}"
             )
+
+
+class CosineRadiusGraphTestCase(SimpleTestCase):
+    """The sparse neighbour graph holds exactly the dense pairs within eps."""
+
+    def test_matches_dense_distances(self):
+        rnd = random.Random(7)
+        words = ["netflix", "spotify", "gym", "card", "payment", "direct", "debit", "cafe", "ref"]
+        descriptions = [" ".join(rnd.sample(words, rnd.randint(1, 4))) for _ in range(300)]
+        descriptions += ["zzz"]  # no token shared with anything
+        tfidf = TfidfVectorizer(token_pattern=r"(?u)\b\w+\b").fit_transform(descriptions)
+        dense = cosine_distances(tfidf)
+
+        for eps in (0.1, 0.4, 0.9):
+            graph = cosine_radius_graph(tfidf, eps, chunk_size=64)
+            coo = graph.tocoo()
+            self.assertEqual(
+                set(zip(coo.row.tolist(), coo.col.tolist())),
+                set(zip(*[index.tolist() for index in np.nonzero(dense <= eps)])),
+            )
+            np.testing.assert_allclose(coo.data, dense[coo.row, coo.col], atol=1e-12)
+
+
+class LSHCandidatePairsTestCase(SimpleTestCase):
+    """MinHash LSH blocking keeps near-duplicate pairs and drops unrelated ones."""
+
+    def setUp(self):
+        descriptions = ["netflix subscription"] * 5 + ["spotify premium"] * 3 + ["rent"]
+        descriptions += ["merchant%d ref%d" % (i, i) for i in range(20)]
+        self.tfidf = TfidfVectorizer(token_pattern=r"(?u)\b\w+\b").fit_transform(descriptions)
+
+    def test_identical_descriptions_are_candidates(self):
+        first, second = lsh_candidate_pairs(self.tfidf, bands=4, rows_per_band=4)
+        pairs = set(zip(first.tolist(), second.tolist()))
+        for group in (range(0, 5), range(5, 8)):
+            for i in group:
+                for j in group:
+                    if i < j:
+                        self.assertIn((i, j), pairs)
+        self.assertTrue(all(i < j for i, j in pairs))
+        # Descriptions sharing no token are never compared
+        self.assertFalse(any(i < 8 <= j or (i >= 9 and j >= 9) for i, j in pairs))
+
+    def test_deterministic(self):
+        self.assertEqual(
+            [array.tolist() for array in lsh_candidate_pairs(self.tfidf, 8, 2)],
+            [array.tolist() for array in lsh_candidate_pairs(self.tfidf, 8, 2)],
+        )
+
+
+class GroupStatsTestCase(SimpleTestCase):
+    """Columnar per-group statistics match analysing each group on its own."""
+
+    def test_interval_stats(self):
+        rng = np.random.RandomState(3)
+        sizes = rng.randint(2, 30, size=50)
+        starts = np.cumsum(sizes) - sizes
+        micros = np.concatenate([
+            np.sort(rng.randint(0, 400 * 86400 * 10**6, size=size)) for size in sizes
+        ]).astype(np.int64)
+        detector = RecurringTransactionDetector()
+
+        means, cvs = detector._interval_stats(micros, starts)
+
+        for group, (start, size) in enumerate(zip(starts, sizes)):
+            intervals = np.diff(micros[start:start + size]) / 1e6 / 86400
+            self.assertEqual(means[group], np.mean(intervals))
+            self.assertEqual(cvs[group], np.std(intervals) / np.mean(intervals))
+
+    def test_group_stats(self):
+        rng = np.random.RandomState(4)
+        sizes = np.concatenate([rng.randint(1, 20, size=40), [200, 200, 517]])
+        starts = np.cumsum(sizes) - sizes
+        values = np.round(rng.uniform(-500, 500, size=sizes.sum()), 2)
+
+        means, stds = RecurringTransactionDetector._group_stats(values, starts)
+
+        for group, (start, size) in enumerate(zip(starts, sizes)):
+            self.assertEqual(means[group], np.mean(values[start:start + size]))
+            self.assertEqual(stds[group], np.std(values[start:start + size]))
+
+    def test_zero_mean_interval(self):
+        detector = RecurringTransactionDetector()
+        means, cvs = detector._interval_stats(np.array([5, 5, 5, 0, 10]), np.array([0, 3]))
+        self.assertEqual(means[0], 0)
+        self.assertTrue(np.isnan(cvs[0]))
+        self.assertEqual(cvs[1], 0)
+
+
+class ShardClustersTestCase(SimpleTestCase):
+    def test_whole_clusters_balanced(self):
+        labels = np.array([0, 1, -1, 0, 2, 2, 2, 3, 1, 3, 3, 3, -1])
+        shards = shard_clusters(labels, 2)
+        self.assertEqual([labels[rows].tolist() for rows in shards],
+                         [[0, 1, 0, 2, 2, 2, 1], [3, 3, 3, 3]])
+        self.assertEqual(len(shard_clusters(labels, 10)), 4)
@@ -3,13 +3,18 @@
 import random
 from datetime import datetime, timedelta
 from decimal import Decimal
+from unittest import mock
 
 import pytz
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from ctrack import models
+from ctrack.recurring_detection import RecurringTransactionDetector
 
 
 class RecurringDetectionAPITestCase(APITestCase):
@@ -17,6 +22,7 @@ class RecurringDetectionAPITestCase(APITestCase):
 
     def setUp(self):
         """Create user, authenticate, and set up test data."""
+        cache.clear()
         self.user = User.objects.create_user(
             username="testuser", password="testpass123"
         )
@@ -93,6 +99,54 @@ class RecurringDetectionAPITestCase(APITestCase):
         self.assertGreater(response.data["total_transactions"], 0)
         self.assertIsInstance(response.data["groups"], list)
 
+    def test_detect_recurring_with_lsh(self):
+        """LSH blocking parameters are accepted and validated."""
+        self._populate_sufficient_data()
+        params = {"from_date": "2025-01-01", "to_date": "2026-02-01"}
+
+        exact = self.client.post("/api/payments/detect_recurring/", params, format="json")
+        blocked = self.client.post(
+            "/api/payments/detect_recurring/",
+            dict(params, lsh_bands=16, lsh_rows=4),
+            format="json",
+        )
+        self.assertEqual(blocked.status_code, status.HTTP_200_OK)
+        self.assertEqual(blocked.data["groups"], exact.data["groups"])
+
+        invalid = self.client.post(
+            "/api/payments/detect_recurring/", dict(params, lsh_bands=0), format="json"
+        )
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detect_recurring_reuses_clusters(self):
+        """Only the text parameters and the data re-run description clustering."""
+        self._populate_sufficient_data()
+        params = {"from_date": "2025-01-01", "to_date": "2026-02-01"}
+        url = "/api/payments/detect_recurring/"
+
+        with mock.patch.object(RecurringTransactionDetector, "cluster_descriptions",
+                               autospec=True,
+                               side_effect=RecurringTransactionDetector.cluster_descriptions) as clustering:
+            first = self.client.post(url, params, format="json")
+            strict = self.client.post(url, dict(params, interval_cv_threshold=0.1,
+                                                amount_tolerance=0.05), format="json")
+            self.assertEqual(clustering.call_count, 1)
+            self.assertEqual(strict.status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.post(url, params, format="json").data, first.data)
+            self.assertEqual(clustering.call_count, 1)
+
+            self.client.post(url, dict(params, cosine_distance_threshold=0.3), format="json")
+            self.client.post(url, dict(params, account=self.account1.pk), format="json")
+            self.assertEqual(clustering.call_count, 3)
+
+            self._create_recurring_transactions(
+                description="Netflix Subscription", amount=Decimal("-15.99"),
+                interval_days=30, count=6,
+            )
+            changed = self.client.post(url, params, format="json")
+            self.assertEqual(clustering.call_count, 4)
+            self.assertEqual(changed.data["total_transactions"], first.data["total_transactions"] + 6)
+
     def test_detect_recurring_insufficient_data(self):
         """POST detect_recurring with < 20 transactions returns 400."""
         # Create only a handful of transactions
@@ -188,6 +242,41 @@ class RecurringDetectionAPITestCase(APITestCase):
         # Verify each Bill has a paying_transaction set
         for bill in bills:
             self.assertEqual(bill.paying_transactions.count(), 1)
+            self.assertTrue(bill.is_paid)
+
+    def test_create_from_detection_bulk(self):
+        """Created series get their schedule and the query count does not grow with them."""
+        def create(groups):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post("/api/payments/create_from_detection/",
+                                            {"groups": groups}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return response, len(queries.captured_queries)
+
+        def series(name, count):
+            txns = self._create_recurring_transactions(
+                description=f"{name} Direct Debit", amount=Decimal("-20.00"),
+                interval_days=14, count=count,
+            )
+            return {"name": name, "transaction_ids": [t.id for t in reversed(txns)]}
+
+        version = models.DataVersion.current()
+        small, small_queries = create([series("Gym", 3)])
+        large, large_queries = create([series(f"Club {i}", 8) for i in range(6)])
+        self.assertEqual(small_queries, large_queries)
+        self.assertGreater(models.DataVersion.current(), version)
+        self.assertEqual([payment["name"] for payment in large.data], [f"Club {i}" for i in range(6)])
+
+        for payment in models.RecurringPayment.objects.all():
+            stored = (payment.last_due_date, payment.last_amount, payment.mean_interval,
+                      payment.next_due_date)
+            models.RecurringPayment.refresh_schedule(payment.pk)
+            payment.refresh_from_db()
+            self.assertEqual(stored, (payment.last_due_date, payment.last_amount,
+                                      payment.mean_interval, payment.next_due_date))
+            self.assertEqual(payment.mean_interval, 14)
+        self.assertEqual(models.Bill.objects.count(), 51)
+        self.assertEqual(models.Bill.paying_transactions.through.objects.count(), 51)
 
     def test_create_from_detection_invalid_ids(self):
         """POST create_from_detection with non-existent IDs returns 400."""
@@ -0,0 +1,116 @@
+"""Tests for incremental matching of new transactions to recurring series."""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytz
+from django.test import TestCase
+
+from ctrack import models
+from ctrack.recurring_matching import (
+    RecurringSeriesIndex,
+    description_signature,
+    match_transactions,
+)
+
+
+class RecurringMatchingTestCase(TestCase):
+    def setUp(self):
+        self.account = models.Account.objects.create(name="Everyday")
+        self.phone = self.series("Phone", "VODAFONE PAYMENT REF {}", "-50.00", date(2024, 1, 15), 30, 4)
+
+    def transaction(self, description, amount, day):
+        return models.Transaction.objects.create(
+            when=datetime(day.year, day.month, day.day, 9, tzinfo=pytz.utc),
+            account=self.account, amount=Decimal(amount), description=description,
+        )
+
+    def series(self, name, description, amount, first, interval, count, is_income=False):
+        payment = models.RecurringPayment.objects.create(name=name, is_income=is_income)
+        for i in range(count):
+            day = first + timedelta(days=i * interval)
+            trans = self.transaction(description and description.format(1000 + i), amount, day)
+            bill = models.Bill.objects.create(description=trans.description or name, due_date=day,
+                                              due_amount=abs(trans.amount), series=payment)
+            bill.paying_transactions.add(trans)
+        payment.refresh_from_db()
+        return payment
+
+    def test_signature(self):
+        self.assertEqual(description_signature("Vodafone  PAYMENT ref 88812 AU"),
+                         "au payment ref vodafone")
+        self.assertEqual(description_signature(None), "")
+
+    def test_index_loads_in_two_queries(self):
+        with self.assertNumQueries(2):
+            index = RecurringSeriesIndex.load()
+        self.assertEqual(list(index.series), ["payment ref vodafone"])
+
+    def test_attaches_bill(self):
+        # Last bill 2024-04-14, so the next is due about 2024-05-14.
+        trans = self.transaction("Vodafone Payment Ref 2001", "-51.00", date(2024, 5, 16))
+        version = models.DataVersion.current()
+
+        bills = match_transactions([trans])
+
+        self.assertEqual(len(bills), 1)
+        bill = models.Bill.objects.get(pk=bills[0].pk)
+        self.assertEqual((bill.series, bill.due_date, bill.due_amount),
+                         (self.phone, date(2024, 5, 16), Decimal("51.00")))
+        self.assertEqual(list(bill.paying_transactions.all()), [trans])
+        self.assertTrue(bill.is_paid)
+        self.assertEqual(bill.paid_amount, Decimal("51.00"))
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.last_due_date, date(2024, 5, 16))
+        self.assertGreater(models.DataVersion.current(), version)
+
+    def test_rejects_outside_amount_band_due_window_or_sign(self):
+        transactions = [
+            self.transaction("Vodafone Payment Ref 2002", "-80.00", date(2024, 5, 14)),
+            self.transaction("Vodafone Payment Ref 2003", "-50.00", date(2024, 5, 1)),
+            self.transaction("Vodafone Payment Ref 2004", "50.00", date(2024, 5, 14)),
+            self.transaction("Vodafone Refund", "-50.00", date(2024, 5, 14)),
+            self.transaction("Vodafone Payment Ref 2005", "-50.00", date(2024, 4, 1)),
+        ]
+        self.assertEqual(match_transactions(transactions), [])
+        self.assertEqual(models.Bill.objects.count(), 4)
+
+    def test_batch_fills_each_period(self):
+        transactions = [
+            self.transaction("Vodafone Payment Ref 2007", "-50.00", date(2024, 6, 13)),
+            self.transaction("Vodafone Payment Ref 2006", "-50.00", date(2024, 5, 14)),
+            # A missed month still lands in a later due window.
+            self.transaction("Vodafone Payment Ref 2008", "-50.00", date(2024, 8, 13)),
+        ]
+        bills = match_transactions(transactions)
+        self.assertEqual([bill.due_date for bill in bills],
+                         [date(2024, 5, 14), date(2024, 6, 13), date(2024, 8, 13)])
+        self.assertEqual(self.phone.bills.count(), 7)
+
+    def test_same_description_split_by_amount(self):
+        gym_a = self.series("Gym A", "KIESER TRAINING {}", "-113.07", date(2024, 1, 1), 14, 4)
+        gym_b = self.series("Gym B", "KIESER TRAINING {}", "-100.20", date(2024, 1, 1), 14, 4)
+        transactions = [
+            self.transaction("KIESER TRAINING 77", "-100.20", date(2024, 2, 26)),
+            self.transaction("KIESER TRAINING 78", "-113.07", date(2024, 2, 26)),
+        ]
+        bills = match_transactions(transactions)
+        self.assertEqual({(bill.series_id, bill.due_amount) for bill in bills},
+                         {(gym_b.pk, Decimal("100.20")), (gym_a.pk, Decimal("113.07"))})
+
+    def test_missing_descriptions_do_not_match(self):
+        self.series("Cash", None, "-20.00", date(2024, 1, 10), 30, 4)
+        self.series("Transfer", "{}", "-20.00", date(2024, 1, 10), 30, 4)
+        self.assertNotIn("", RecurringSeriesIndex.load().series)
+
+        transactions = [
+            self.transaction(None, "-20.00", date(2024, 5, 9)),
+            self.transaction("88812", "-20.00", date(2024, 5, 9)),
+        ]
+        self.assertEqual(match_transactions(transactions), [])
+
+    def test_no_series(self):
+        models.RecurringPayment.objects.all().delete()
+        trans = self.transaction("Vodafone Payment Ref 2001", "-50.00", date(2024, 5, 14))
+        with self.assertNumQueries(1):
+            self.assertEqual(match_transactions([trans]), [])
@@ -0,0 +1,199 @@
+"""Tests for the schedule fields stored on ``RecurringPayment`` and ``Bill.paid_amount``."""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytz
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from ctrack import models
+
+
+class PaymentScheduleTestCase(TestCase):
+    def test_no_bills(self):
+        self.assertEqual(models.payment_schedule([]), {
+            "last_due_date": None, "last_amount": None,
+            "mean_interval": None, "next_due_date": None,
+        })
+
+    def test_single_bill(self):
+        schedule = models.payment_schedule([(date(2024, 1, 15), Decimal("10.00"))])
+        self.assertEqual(schedule["last_due_date"], date(2024, 1, 15))
+        self.assertEqual(schedule["last_amount"], Decimal("10.00"))
+        self.assertIsNone(schedule["mean_interval"])
+        self.assertIsNone(schedule["next_due_date"])
+
+    def test_mean_interval(self):
+        schedule = models.payment_schedule([
+            (date(2024, 1, 1), Decimal("10.00")),
+            (date(2024, 1, 31), Decimal("11.00")),
+            (date(2024, 3, 1), Decimal("12.00")),
+        ])
+        self.assertEqual(schedule["mean_interval"], 30.0)
+        self.assertEqual(schedule["next_due_date"], date(2024, 3, 31))
+        self.assertEqual(schedule["last_amount"], Decimal("12.00"))
+
+
+class StoredScheduleTestCase(TestCase):
+    def setUp(self):
+        self.payment = models.RecurringPayment.objects.create(name="Power")
+
+    def add_bill(self, due_date, amount="100.00", series=None):
+        return models.Bill.objects.create(
+            description="bill", due_date=due_date, due_amount=Decimal(amount),
+            series=series or self.payment,
+        )
+
+    def test_updated_when_bills_added(self):
+        self.add_bill(date(2024, 1, 10))
+        self.add_bill(date(2024, 3, 10), "120.00")
+        self.add_bill(date(2024, 2, 10))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.last_due_date, date(2024, 3, 10))
+        self.assertEqual(self.payment.last_amount, Decimal("120.00"))
+        self.assertEqual(self.payment.mean_interval, 30.0)
+        self.assertEqual(self.payment.next_due_date, date(2024, 4, 9))
+
+    def test_updated_when_bill_edited_or_deleted(self):
+        self.add_bill(date(2024, 1, 10))
+        last = self.add_bill(date(2024, 2, 10))
+        last.due_date = date(2024, 2, 20)
+        last.save()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.next_due_date, date(2024, 4, 1))
+
+        last.delete()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.last_due_date, date(2024, 1, 10))
+        self.assertIsNone(self.payment.next_due_date)
+
+    def test_moving_bill_updates_both_series(self):
+        other = models.RecurringPayment.objects.create(name="Gas")
+        self.add_bill(date(2024, 1, 10))
+        moved = self.add_bill(date(2024, 2, 10))
+        moved = models.Bill.objects.get(pk=moved.pk)
+        moved.series = other
+        moved.save()
+        self.payment.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.payment.last_due_date, date(2024, 1, 10))
+        self.assertEqual(other.last_due_date, date(2024, 2, 10))
+
+    def test_list_endpoint_serves_stored_schedule(self):
+        self.add_bill(date(2024, 1, 10))
+        self.add_bill(date(2024, 2, 10))
+        user = User.objects.create_user(username="u", password="p")
+        self.client.force_login(user)
+        row = self.client.get("/api/payments/").json()[0]
+        self.assertEqual(row["next_due_date"], "2024-03-12")
+        self.assertEqual(row["last_due_date"], "2024-02-10")
+        self.assertEqual(row["mean_interval"], 31.0)
+
+
+class PaidAmountTestCase(TestCase):
+    def setUp(self):
+        self.payment = models.RecurringPayment.objects.create(name="Power")
+        self.account = models.Account.objects.create(name="Everyday")
+        self.bill = models.Bill.objects.create(
+            description="bill", due_date=date(2024, 1, 10), due_amount=Decimal("100.00"),
+            series=self.payment,
+        )
+
+    def pay(self, amount):
+        return models.Transaction.objects.create(
+            when=datetime(2024, 1, 10, 9, tzinfo=pytz.utc), account=self.account,
+            amount=Decimal(amount), description="payment",
+        )
+
+    def stored(self):
+        return models.Bill.objects.get(pk=self.bill.pk).paid_amount
+
+    def test_follows_paying_transactions(self):
+        self.assertIsNone(self.bill.paid_amount)
+        self.assertFalse(self.bill.is_paid)
+        first, second = self.pay("-60.00"), self.pay("-40.00")
+
+        self.bill.paying_transactions.add(first)
+        self.assertEqual((self.bill.paid_amount, self.stored()), (Decimal("60.00"), Decimal("60.00")))
+        self.assertFalse(self.bill.is_paid)
+        self.bill.paying_transactions.add(second)
+        self.assertTrue(self.bill.is_paid)
+        self.assertTrue(models.Bill.objects.get(pk=self.bill.pk).is_paid)
+
+        self.bill.paying_transactions.remove(first)
+        self.assertEqual(self.stored(), Decimal("40.00"))
+        self.bill.paying_transactions.clear()
+        self.assertIsNone(self.stored())
+
+    def test_changes_from_transaction_side(self):
+        trans = self.pay("-100.00")
+        trans.pays_bill.add(self.bill)
+        self.assertEqual(self.stored(), Decimal("100.00"))
+        trans.pays_bill.clear()
+        self.assertIsNone(self.stored())
+        trans.pays_bill.set([self.bill])
+        self.assertEqual(self.stored(), Decimal("100.00"))
+
+    def test_transaction_update_and_delete(self):
+        trans = self.pay("-100.00")
+        other = self.pay("-5.00")
+        self.bill.paying_transactions.add(trans, other)
+        trans = models.Transaction.objects.get(pk=trans.pk)
+        trans.amount = Decimal("-95.00")
+        trans.save()
+        self.assertEqual(self.stored(), Decimal("100.00"))
+
+        trans.amount = Decimal("-90.00")
+        models.Transaction.objects.bulk_update([trans], ["amount"])
+        self.assertEqual(self.stored(), Decimal("95.00"))
+
+        other.delete()
+        self.assertEqual(self.stored(), Decimal("90.00"))
+        self.assertFalse(models.Bill.objects.get(pk=self.bill.pk).is_paid)
+
+    def test_bulk_create_paid(self):
+        debit, credit = self.pay("-30.00"), self.pay("12.00")
+        debit.description = None
+        bills = models.Bill.bulk_create_paid([(self.payment, debit), (self.payment, credit)])
+        self.assertEqual(
+            [(bill.description, bill.due_date, bill.paid_amount, bill.is_paid, bill.series_id)
+             for bill in models.Bill.objects.filter(pk__in=[bill.pk for bill in bills]).order_by("pk")],
+            [("Power", date(2024, 1, 10), Decimal("30.00"), True, self.payment.pk),
+             ("payment", date(2024, 1, 10), Decimal("-12.00"), False, self.payment.pk)],
+        )
+        self.assertEqual(list(bills[0].paying_transactions.all()), [debit])
+
+    def test_due_amount_change(self):
+        self.bill.paying_transactions.add(self.pay("-90.00"))
+        self.assertFalse(models.Bill.objects.filter(is_paid=True).exists())
+        self.bill.due_amount = Decimal("90.00")
+        self.bill.save()
+        self.assertTrue(self.bill.is_paid)
+        self.assertEqual(list(models.Bill.objects.filter(is_paid=True)), [self.bill])
+
+        # A stale copy cannot overwrite the stored state.
+        stale = models.Bill.objects.get(pk=self.bill.pk)
+        stale.paid_amount = None
+        stale.save()
+        self.assertTrue(models.Bill.objects.get(pk=self.bill.pk).is_paid)
+
+    def test_is_paid_filter(self):
+        unpaid = models.Bill.objects.create(
+            description="unpaid", due_date=date(2024, 2, 10), due_amount=Decimal("100.00"),
+            series=self.payment,
+        )
+        unpaid.paying_transactions.add(self.pay("-50.00"))
+        self.bill.paying_transactions.add(self.pay("-100.00"))
+        models.Bill.objects.create(
+            description="no payments", due_date=date(2024, 3, 10), due_amount=Decimal("100.00"),
+            series=self.payment,
+        )
+        user = User.objects.create_user(username="u", password="p")
+        self.client.force_login(user)
+
+        paid = self.client.get("/api/bills/", {"is_paid": "true"}).json()
+        self.assertEqual([(row["description"], row["is_paid"]) for row in paid], [("bill", True)])
+        self.assertEqual(paid[0]["paid_amount"], "100.00")
+        unpaid_rows = self.client.get("/api/bills/", {"is_paid": "false"}).json()
+        self.assertEqual([row["description"] for row in unpaid_rows], ["no payments", "unpaid"])
@@ -1,14 +1,21 @@
+from datetime import date, datetime
 from decimal import Decimal
 import io
 import tempfile
-from unittest import TestCase
+from unittest import TestCase, mock
 
-from ctrack.transaction_import import TransactionFileFormat, TransactionImporter
+import django.test
+import pytz
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from ctrack import models
+from ctrack.transaction_import import ImportStats, TransactionFileFormat, TransactionImporter
 
-class ImportTests(TestCase):
-    def setUp(self):
-        self.ofx_data = b"""
+
+OFX_DATA = b"""
 OFXHEADER:100
 DATA:OFXSGML
 VERSION:102
@@ -59,6 +66,11 @@ NEWFILEUID:NONE
 </BANKMSGSRSV1>
 </OFX>
         """
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.ofx_data = OFX_DATA
         self.ofx_data_obj = io.BytesIO(self.ofx_data)
         self.ofx_data_obj.seek(0)
 
@@ -174,4 +186,155 @@ LDEBIT
             self.assertIsNotNone(result)
             self.assertEqual(len(result), 2)
             self.assertEqual(result[0].amount, Decimal('-160.00'))
-            self.assertEqual(result[1].amount, Decimal('-690.00'))
\ No newline at end of file
+            self.assertEqual(result[1].amount, Decimal('-690.00'))
+
+    def test_load_from_file_records_stages(self):
+        importer = TransactionImporter()
+        result = importer.load_from_file(self.ofx_data_obj, expected_format=TransactionFileFormat.OFX,
+                                         from_date=date(2023, 8, 1))
+        self.assertEqual(len(result), 1)
+        stats = importer.stats.as_dict()
+        self.assertEqual(stats['format'], 'ofx')
+        self.assertEqual([stage['stage'] for stage in stats['stages']], ['parse', 'filter'])
+        self.assertEqual(stats['stages'][0]['rows_out'], 2)
+        self.assertEqual(stats['stages'][1]['rows_in'], 2)
+        self.assertEqual(stats['stages'][1]['rows_out'], 1)
+
+    def test_load_from_file_qif_filters_dates(self):
+        result = self.importer.load_from_file(self.qif_data_obj, expected_format=TransactionFileFormat.QIF,
+                                              from_date=date(2025, 6, 10))
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].amount, Decimal('-160.00'))
+
+    def test_load_from_file_qif_filters_to_date(self):
+        result = self.importer.load_from_file(self.qif_data_obj, expected_format=TransactionFileFormat.QIF,
+                                              to_date=date(2025, 6, 10))
+        self.assertEqual([trans.amount for trans in result], [Decimal('-690.00')])
+
+
+QIF_REPEATED = b"""
+!Type:Bank
+D05/06/2025
+T-4.50
+PCOFFEE CART
+^
+D05/06/2025
+T-4.50
+PCOFFEE CART
+^
+"""
+
+
+class FakeClassifier:
+    def __init__(self, predictions):
+        self._predictions = predictions
+
+    def predict(self, description):
+        return self._predictions.get(description, {})
+
+
+class AccountLoadTests(django.test.TestCase):
+    def setUp(self):
+        self.account = models.Account.objects.create(name='Everyday')
+        self.category = models.Category.objects.create(name='Interest')
+
+    def test_load_transactions_records_all_stages(self):
+        stats = ImportStats()
+        clf = FakeClassifier({'Interest Credit': {'Interest': 0.9}})
+        created = self.account.load_transactions(self._ofx_file(),
+                                                 clf=clf, stats=stats)
+
+        self.assertEqual(len(created), 2)
+        self.assertEqual(
+            [stage['stage'] for stage in stats.stages],
+            ['parse', 'filter', 'dedupe', 'predict', 'insert', 'match_recurring'],
+        )
+        self.assertEqual(stats.stages[-2]['rows_out'], 2)
+        self.assertEqual(stats.stages[-1]['rows_out'], 0)
+        interest = models.Transaction.objects.get(description='Interest Credit')
+        self.assertEqual(interest.category, self.category)
+
+    def test_load_transactions_skips_existing(self):
+        models.Transaction.objects.create(
+            when=datetime(2023, 8, 2, tzinfo=pytz.utc), account=self.account,
+            amount=Decimal('-0.51'), description='Internal Transfer',
+        )
+        stats = ImportStats()
+        created = self.account.load_transactions(self._ofx_file(), from_exist_latest=False, stats=stats)
+
+        self.assertEqual([t.description for t in created], ['Interest Credit'])
+        dedupe = next(stage for stage in stats.stages if stage['stage'] == 'dedupe')
+        self.assertEqual((dedupe['rows_in'], dedupe['rows_out']), (2, 1))
+        self.assertEqual(models.Transaction.objects.count(), 2)
+
+    def test_load_transactions_returns_saved_list(self):
+        created = self.account.load_transactions(self._ofx_file())
+
+        # A list of saved rows, written without needing to be iterated.
+        self.assertIsInstance(created, list)
+        self.assertTrue(all(trans.pk for trans in created))
+        self.assertEqual(models.Transaction.objects.filter(account=self.account).count(), 2)
+
+    def test_load_transactions_categorises_before_insert(self):
+        models.Category.objects.create(name='Transfers')
+        clf = FakeClassifier({
+            'Interest Credit': {'Interest': 0.9},
+            # Ambiguous suggestions leave the transaction uncategorised.
+            'Internal Transfer': {'Interest': 0.5, 'Transfers': 0.5},
+        })
+        with CaptureQueriesContext(connection) as queries:
+            self.account.load_transactions(self._ofx_file(), clf=clf)
+
+        self.assertFalse(any(query['sql'].startswith('UPDATE "ctrack_transaction"')
+                             for query in queries.captured_queries))
+        self.assertEqual(models.Transaction.objects.get(description='Interest Credit').category,
+                         self.category)
+        self.assertIsNone(models.Transaction.objects.get(description='Internal Transfer').category)
+
+    def test_load_transactions_without_classifier_leaves_uncategorised(self):
+        stats = ImportStats()
+        self.account.load_transactions(self._ofx_file(), stats=stats)
+        self.assertNotIn('predict', [stage['stage'] for stage in stats.stages])
+        self.assertFalse(models.Transaction.objects.filter(category__isnull=False).exists())
+
+    def test_load_transactions_dedupe_respects_multiplicity(self):
+        models.Transaction.objects.create(
+            when=datetime(2025, 6, 5, tzinfo=pytz.utc), account=self.account,
+            amount=Decimal('-4.50'), description='COFFEE CART',
+        )
+        created = self.account.load_transactions(self._qif_file(), from_exist_latest=False)
+        # One of the two identical purchases is already stored.
+        self.assertEqual(len(created), 1)
+        self.assertEqual(models.Transaction.objects.count(), 2)
+
+        # Rows in another account are not duplicates.
+        other = models.Account.objects.create(name='Savings')
+        self.assertEqual(len(other.load_transactions(self._qif_file(), from_exist_latest=False)), 2)
+
+    def test_load_endpoint_reports_count_and_stats(self):
+        user = User.objects.create_user(username='u', password='p')
+        models.UserSettings.objects.create(user=user)
+        self.client.force_login(user)
+        upload = SimpleUploadedFile('statement.ofx', OFX_DATA)
+        clf = FakeClassifier({'Interest Credit': {'Interest': 0.9}})
+        with mock.patch.object(models.UserSettings, 'get_clf_model', return_value=clf):
+            result = self.client.post('/api/accounts/{}/load/'.format(self.account.pk),
+                                      {'data_file': upload})
+
+        self.assertEqual(result.status_code, 200)
+        data = result.json()
+        self.assertEqual((data['status'], data['count']), ('loaded', 2))
+        self.assertEqual(data['stats']['format'], 'ofx')
+        self.assertIn('predict', [stage['stage'] for stage in data['stats']['stages']])
+
+    @staticmethod
+    def _qif_file():
+        file_obj = io.BytesIO(QIF_REPEATED)
+        file_obj.name = 'statement.qif'
+        return file_obj
+
+    @staticmethod
+    def _ofx_file():
+        file_obj = io.BytesIO(OFX_DATA)
+        file_obj.name = 'statement.ofx'
+        return file_obj
@@ -1,6 +1,8 @@
+from contextlib import contextmanager
 from enum import Enum
+import time
 from typing import BinaryIO, Generator
-from datetime import date
+from datetime import date, datetime
 
 import pytz
 import ofxparse
@@ -22,9 +24,66 @@ class TransactionFileFormat(Enum):
     QIF = 'qif'
 
 
-class TransactionImporter:
+class ImportStats:
+    """Per-stage wall time and row counts for a single import.
+
+    Each stage is recorded with the number of rows it received and produced
+    so that, for example, a slow date filter can be told apart from a slow
+    parser or a slow database insert.
+    """
+
     def __init__(self):
-        pass
+        self.stages = []
+        # Free-form details about the import (e.g. file format) that are
+        # reported alongside the stage timings.
+        self.context = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as stage ``name``.
+
+        Yields the stage record; set ``rows_in`` and ``rows_out`` on it.
+        ``rows_in`` defaults to ``rows_out`` when left unset.
+        """
+        record = {'stage': name, 'rows_in': None, 'rows_out': 0}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            if record['rows_in'] is None:
+                record['rows_in'] = record['rows_out']
+            record['seconds'] = round(seconds, 6)
+            record['rows_per_sec'] = round(record['rows_in'] / seconds, 1) if seconds > 0 else 0.0
+            self.stages.append(record)
+
+    @property
+    def total_seconds(self) -> float:
+        return round(sum(stage['seconds'] for stage in self.stages), 6)
+
+    def as_dict(self) -> dict:
+        return {
+            **self.context,
+            'stages': [dict(stage) for stage in self.stages],
+            'total_seconds': self.total_seconds,
+        }
+
+    def log(self, logger, **context):
+        """Emit one key=value line per stage, plus the raw dict via ``extra``."""
+        context = {**self.context, **context}
+        prefix = " ".join(f"{key}={value}" for key, value in context.items())
+        for stage in self.stages:
+            logger.info(
+                "import %s stage=%s rows_in=%d rows_out=%d seconds=%.4f rows_per_sec=%.1f",
+                prefix, stage['stage'], stage['rows_in'], stage['rows_out'],
+                stage['seconds'], stage['rows_per_sec'],
+                extra={'import_stats': dict(stage, **context)},
+            )
+
+
+class TransactionImporter:
+    def __init__(self, stats: ImportStats = None):
+        self.stats = stats if stats is not None else ImportStats()
 
     def load_from_file(self, file_obj: str | BinaryIO, expected_format: TransactionFileFormat=None, from_date: date=None, to_date: date=None) -> list[Transaction]:
         # If this is a file-like object, use it directly.
@@ -45,34 +104,56 @@ class TransactionImporter:
             else:
                 format_to_use = expected_format   
 
+        if isinstance(format_to_use, TransactionFileFormat):
+            self.stats.context['format'] = format_to_use.value
+
         # Go process it.
-        if format_to_use == TransactionFileFormat.OFX:
-            return self.import_ofx(file_to_use, from_date=from_date, to_date=to_date)
-        elif format_to_use == TransactionFileFormat.QIF:
-            return list(self.import_qif(file_to_use))
-        
-        raise ValueError(f"Unsupported file format: {format_to_use}")
+        with self.stats.stage('parse') as stage:
+            if format_to_use == TransactionFileFormat.OFX:
+                transactions = self.import_ofx(file_to_use)
+            elif format_to_use == TransactionFileFormat.QIF:
+                transactions = list(self.import_qif(file_to_use))
+            else:
+                raise ValueError(f"Unsupported file format: {format_to_use}")
+            stage['rows_out'] = len(transactions)
 
-    def import_ofx(self, file_obj: BinaryIO, from_date: date = None, to_date: date = None) -> list[Transaction]:
-        """Import transactions from an OFX file."""
-        ofx = ofxparse.OfxParser.parse(file_obj)
+        with self.stats.stage('filter') as stage:
+            stage['rows_in'] = len(transactions)
+            transactions = self.filter_dates(transactions, from_date=from_date, to_date=to_date)
+            stage['rows_out'] = len(transactions)
+
+        return transactions
+
+    @staticmethod
+    def filter_dates(transactions: list[Transaction], from_date: date = None, to_date: date = None) -> list[Transaction]:
+        """Drop transactions outside the inclusive ``from_date``..``to_date`` range."""
+        if from_date is None and to_date is None:
+            return transactions
 
-        transactions: list[Transaction] = []
-        for trans in ofx.account.statement.transactions:
-            tdate = pytz.utc.localize(trans.date).date()
+        result = []
+        for trans in transactions:
+            tdate = trans.when.date() if isinstance(trans.when, datetime) else trans.when
             if from_date and tdate < from_date:
                 continue
             if to_date and tdate > to_date:
                 continue
+            result.append(trans)
+        return result
 
-            transaction = Transaction(
-                when=tdate,
+    def import_ofx(self, file_obj: BinaryIO, from_date: date = None, to_date: date = None) -> list[Transaction]:
+        """Import transactions from an OFX file."""
+        ofx = ofxparse.OfxParser.parse(file_obj)
+
+        transactions: list[Transaction] = [
+            Transaction(
+                when=pytz.utc.localize(trans.date).date(),
                 description=trans.memo,
                 amount=trans.amount,
             )
-            transactions.append(transaction)
+            for trans in ofx.account.statement.transactions
+        ]
 
-        return transactions
+        return self.filter_dates(transactions, from_date=from_date, to_date=to_date)
     
     def import_qif(self, file_obj: BinaryIO) -> Generator[Transaction, None, None]:
         """Import transactions from a QIF file."""
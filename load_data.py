@@ -2,9 +2,10 @@
 """
 Script to load CSV dump of data.
 
-Run from django shell with "%run".
+Run from django shell with "%run", or prefer ``manage.py import_csv``
+which reports progress.
 
-Expects the followin columns:
+Expects the following columns:
     1. date
     2. description
     3. category
@@ -13,28 +14,12 @@ Expects the followin columns:
 """
 import argparse
 
-import pandas as pd
-
-from ctrack.models import Transaction, Category, Account
+from ctrack.csv_import import load_csv
 
 
 def load_data(data_file):
     """Load data from ``data_file``"""
-    data = pd.read_csv(data_file, index_col=0,
-                       parse_dates=True, dayfirst=True)
-    data.category = data.category.fillna('')
-
-    for idx, row in data.iterrows():
-        if row.category:
-            cat = Category.objects.get_or_create(name=row.category)[0]
-        else:
-            cat = None
-        acct = Account.objects.get_or_create(name=row.accountname)[0]
-        Transaction.objects.create(when=idx,
-                                   description=row.description,
-                                   amount=row.amount,
-                                   category=cat,
-                                   account=acct)
+    return load_csv(data_file)
 
 def get_parser():
     """Get an ArgumentParser."""